@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+
+# Thin client for the ai_provider.py daemon. It only imports the standard
+# library so it starts fast; ai_provider (and yaml) is imported only when no
+# daemon is listening and the message has to be sent in-process. Once the
+# daemon has accepted a request it is never sent again in-process.
+
+import json
+import os
+import socket
+import sys
+from typing import Dict, Optional
+
+# Client-side wait for a reply; sends can wait on agent readiness
+REQUEST_TIMEOUT = 120.0
+
+def default_socket_path() -> str:
+    """Socket path from $AI_ORCHESTRATOR_SOCKET, else a per-user runtime path"""
+    path = os.environ.get("AI_ORCHESTRATOR_SOCKET")
+    if path:
+        return path
+    runtime_dir = os.environ.get("XDG_RUNTIME_DIR")
+    if runtime_dir and os.path.isdir(runtime_dir):
+        return os.path.join(runtime_dir, "tmux-orchestrator.sock")
+    return f"/tmp/tmux-orchestrator-{os.getuid()}.sock"
+
+def request(payload: Dict, socket_path: Optional[str] = None, timeout: float = REQUEST_TIMEOUT) -> Optional[Dict]:
+    """Send one JSON request to the daemon; None if no daemon is listening
+
+    Once connected the request may already be acted on, so a timeout or a
+    missing or unreadable reply raises (OSError, ValueError) rather than
+    returning None.
+    """
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    sock.settimeout(timeout)
+    try:
+        try:
+            sock.connect(socket_path or default_socket_path())
+        except OSError:
+            return None
+        sock.sendall(json.dumps(payload).encode("utf-8") + b"\n")
+        reply = sock.makefile("rb").readline()
+    finally:
+        sock.close()
+    if not reply:
+        raise ConnectionError("daemon closed the connection without replying")
+    return json.loads(reply)
+
+def send_message(target: str, message: str, provider: Optional[str] = None,
+                 socket_path: Optional[str] = None) -> Optional[Dict]:
+    """Ask the daemon to send a message to a target (as for ai_provider.py); None if it is down"""
+    return request({"op": "send", "target": target, "message": message, "provider": provider}, socket_path)
+
+def main(argv=None):
+    if argv is None:
+        argv = sys.argv
+
+    if len(argv) < 3:
+        print("Usage: python3 ai_client.py <session:window|%pane_id|@window_id|name|role=<role>> <message> [provider]")
+        print("Example: python3 ai_client.py project:0 'Hello AI!' rovodev")
+        sys.exit(1)
+
+    provider = argv[3] if len(argv) > 3 else None
+    try:
+        reply = send_message(argv[1], argv[2], provider)
+    except (OSError, ValueError) as e:
+        # The daemon took the request and may have sent it, so don't send it again
+        print(f"Error: no reply from orchestrator daemon ({e}); the message may or may not have been sent")
+        sys.exit(1)
+
+    if reply is None:
+        # No daemon: same behaviour as running ai_provider.py directly
+        from ai_provider import main as provider_main
+        provider_main(argv)
+        return
+
+    if reply.get("ok"):
+        print(f"Message sent to {argv[1]} via orchestrator daemon ({reply.get('provider')})")
+        sys.exit(0)
+    print(f"Error: {reply.get('error', 'send failed')}")
+    sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,211 @@
+#!/usr/bin/env python3
+
+import json
+import os
+import socket
+import socketserver
+import subprocess
+import sys
+import threading
+import time
+from typing import Dict, Optional
+
+import metrics
+from ai_client import default_socket_path
+from ai_provider import AIOrchestrator, AIProvider, parse_target
+from dispatch import MessageDispatcher
+from scrollback_index import DEFAULT_LIMIT, ScrollbackIndex, hit_to_dict
+
+# Searches within this many seconds of the last scrollback index refresh reuse it
+INDEX_REFRESH_INTERVAL = 1.0
+# Seconds between background refreshes of the scrollback index
+# (settings.scrollback_index_interval); lines are timestamped when indexed,
+# so this bounds how far off --since/--until can be. 0 indexes on search only
+INDEX_INTERVAL = 10.0
+
+class _RequestHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        line = self.rfile.readline()
+        if not line:
+            return
+        try:
+            reply = self.server.daemon.handle_request(json.loads(line))
+        except (ValueError, TypeError) as e:
+            reply = {"ok": False, "error": f"Bad request: {e}"}
+        self.wfile.write(json.dumps(reply).encode("utf-8") + b"\n")
+
+class _Server(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+class OrchestratorDaemon:
+    """Keeps an AIOrchestrator resident and serves send requests on a Unix socket
+
+    Requests are single JSON lines ({"op": "send", "target": "proj:0",
+    "message": "...", "provider": null}, {"op": "search", "query": "...",
+    "since": ts, "target": "proj"}, or "ping"/"reload"/"metrics") answered
+    with one JSON line. Sends go through a MessageDispatcher, so concurrent
+    clients keep per-window ordering. Searches use a resident scrollback
+    index, refreshed from the windows with new output every
+    scrollback_index_interval seconds and before a search. ai_config.yml is
+    reloaded when its modification time changes.
+    """
+
+    def __init__(self, config_file: str = "ai_config.yml", socket_path: Optional[str] = None):
+        self.config_file = os.path.abspath(config_file)
+        self.socket_path = socket_path or default_socket_path()
+        self.orchestrator = AIOrchestrator(self.config_file)
+        self.dispatcher = MessageDispatcher(self.orchestrator)
+        self._config_mtime = self._mtime()
+        self._reload_lock = threading.Lock()
+        self._server: Optional[_Server] = None
+        self.index: Optional[ScrollbackIndex] = None
+        self._index_orchestrator = None
+        self._index_refreshed = 0.0
+        self._index_lock = threading.Lock()
+        self._index_stop = threading.Event()
+
+    def _mtime(self) -> float:
+        try:
+            return os.path.getmtime(self.config_file)
+        except OSError:
+            return 0.0
+
+    def reload(self):
+        """Re-read ai_config.yml, keeping the tmux connection"""
+        with self._reload_lock:
+            self._config_mtime = self._mtime()
+            self.orchestrator = AIOrchestrator(self.config_file, backend=self.orchestrator.backend)
+            self.dispatcher.orchestrator = self.orchestrator
+
+    def handle_request(self, payload: Dict) -> Dict:
+        op = payload.get("op")
+        if op == "ping":
+            return {"ok": True, "pid": os.getpid()}
+        if op == "reload":
+            self.reload()
+            return {"ok": True}
+        if op == "metrics":
+            return {"ok": True, "metrics": metrics.REGISTRY.snapshot()}
+        if op == "search":
+            return self.search(payload)
+        if op != "send":
+            return {"ok": False, "error": f"Unknown op '{op}'"}
+
+        if self._mtime() != self._config_mtime:
+            self.reload()
+        try:
+            session_name, window_index = parse_target(str(payload["target"]))
+            message = str(payload["message"])
+        except KeyError:
+            return {"ok": False, "error": "target and message required"}
+        provider = payload.get("provider")
+        try:
+            if provider:
+                provider = AIProvider(provider.lower())
+            elif window_index is not None:
+                provider = self.orchestrator.get_provider_for_session(session_name, window_index)
+            # Otherwise send_message takes the provider of the window the target resolves to
+        except ValueError:
+            return {"ok": False, "error": f"Unknown provider '{provider}'. Available: claude, rovodev, gemini"}
+
+        result = self.dispatcher.submit(session_name, window_index, message, provider).result()
+        reply = {"ok": result.success, "provider": provider.value if provider else None,
+                 "seconds": round(result.send_seconds, 3)}
+        if not result.success:
+            reply["error"] = result.error or f"Could not send message to {result.target}"
+        return reply
+
+    def search(self, payload: Dict) -> Dict:
+        """Search the scrollback index, first indexing output printed since the last refresh"""
+        query = payload.get("query")
+        if not query:
+            return {"ok": False, "error": "query required"}
+        self.refresh_index(INDEX_REFRESH_INTERVAL)
+        try:
+            hits = self.index.search(str(query), since=payload.get("since"), until=payload.get("until"),
+                                     target=payload.get("target"), limit=int(payload.get("limit", DEFAULT_LIMIT)))
+        except (TypeError, ValueError) as e:
+            return {"ok": False, "error": f"Bad search: {e}"}
+        return {"ok": True, "hits": [hit_to_dict(hit) for hit in hits]}
+
+    def refresh_index(self, max_age: float = 0.0):
+        """Index output printed since the last refresh, unless that was under max_age seconds ago"""
+        with self._index_lock:
+            if self.index is None:
+                from tmux_utils import TmuxOrchestrator
+                self.index = ScrollbackIndex()
+                self._index_orchestrator = TmuxOrchestrator(backend=self.orchestrator.backend,
+                                                            server_args=self.orchestrator.server_args)
+            if time.monotonic() - self._index_refreshed >= max_age:
+                self.index.refresh(self._index_orchestrator)
+                self._index_refreshed = time.monotonic()
+
+    def _index_interval(self) -> float:
+        return float(self.orchestrator._settings().get('scrollback_index_interval', INDEX_INTERVAL))
+
+    def _run_indexer(self):
+        # Timestamps are only as accurate as the refreshes are frequent, so
+        # keep indexing while nobody searches
+        while True:
+            interval = self._index_interval()
+            if interval:
+                try:
+                    self.refresh_index()
+                except (subprocess.CalledProcessError, OSError) as e:
+                    print(f"Error refreshing scrollback index: {e}", file=sys.stderr)
+            if self._index_stop.wait(interval or INDEX_INTERVAL):
+                return
+
+    def serve_forever(self):
+        """Listen on the socket until interrupted"""
+        if os.path.exists(self.socket_path):
+            probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            try:
+                probe.connect(self.socket_path)
+                raise RuntimeError(f"An orchestrator daemon is already listening on {self.socket_path}")
+            except OSError:
+                # Left behind by a daemon that didn't shut down cleanly
+                os.unlink(self.socket_path)
+            finally:
+                probe.close()
+
+        old_umask = os.umask(0o177)
+        try:
+            self._server = _Server(self.socket_path, _RequestHandler)
+        finally:
+            os.umask(old_umask)
+        self._server.daemon = self
+        print(f"Orchestrator daemon listening on {self.socket_path}", flush=True)
+        self._index_stop.clear()
+        indexer = threading.Thread(target=self._run_indexer, name="scrollback-indexer", daemon=True)
+        indexer.start()
+        try:
+            self._server.serve_forever()
+        finally:
+            self._index_stop.set()
+            indexer.join(timeout=5.0)
+            self._server.server_close()
+            if os.path.exists(self.socket_path):
+                os.unlink(self.socket_path)
+            self.dispatcher.shutdown()
+
+    def shutdown(self):
+        if self._server is not None:
+            self._server.shutdown()
+
+def main(argv=None):
+    if argv is None:
+        argv = sys.argv
+
+    socket_path = argv[1] if len(argv) > 1 else None
+    daemon = OrchestratorDaemon(socket_path=socket_path)
+    try:
+        daemon.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    except RuntimeError as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -1,41 +1,212 @@
 #!/usr/bin/env python3
 
 import subprocess
-import json
-import yaml
+import marshal
 import os
+import shlex
 import time
-from typing import Dict, List, Optional, Union
-from dataclasses import dataclass
+import zlib
+from typing import Dict, List, Optional, Sequence, Tuple
 from enum import Enum
-from pathlib import Path
+
+import event_log
+import metrics
+from tmux_control import TmuxControlClient, is_bulk, parse_server, paste_text, run_tmux, split_server
+
+# yaml, dataclasses and asyncio are imported only on the code paths that
+# need them, so a send with a warm config cache starts quickly
+
+# Seconds to let the agent's UI register typed text before pressing Enter
+SEND_SETTLE_DELAY = 0.5
+
+# Bump when the layout of the compiled config cache changes
+CONFIG_CACHE_VERSION = 1
+
+def config_cache_path(config_file: str) -> str:
+    """Where the parsed form of a YAML config is cached"""
+    return config_file + ".cache"
+
+def read_config_cache(config_file: str, raw: bytes) -> Optional[Dict]:
+    """The cached parse of raw, if the cache was written for exactly this content"""
+    try:
+        with open(config_cache_path(config_file), 'rb') as f:
+            version, checksum, size, config = marshal.load(f)
+    except (OSError, EOFError, ValueError, TypeError):
+        return None
+    if version != CONFIG_CACHE_VERSION or size != len(raw) or checksum != zlib.crc32(raw):
+        return None
+    return config
+
+def write_config_cache(config_file: str, raw: bytes, config: Dict):
+    """Cache the parse of raw; skipped if the directory isn't writable"""
+    path = config_cache_path(config_file)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(tmp_path, 'wb') as f:
+            marshal.dump((CONFIG_CACHE_VERSION, zlib.crc32(raw), len(raw), config), f)
+        os.replace(tmp_path, path)
+    except (OSError, ValueError):
+        # ValueError: the config holds something marshal can't store
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+
+def load_config_file(config_file: str) -> Optional[Dict]:
+    """Parsed YAML config, served from the marshal cache when unchanged; None if missing"""
+    if not os.path.exists(config_file):
+        return None
+    with open(config_file, 'rb') as f:
+        raw = f.read()
+    config = read_config_cache(config_file, raw)
+    if config is None:
+        config = parse_yaml(raw)
+        write_config_cache(config_file, raw, config)
+    return config
+
+def parse_yaml(raw: bytes):
+    """Parse YAML with libyaml's C loader when PyYAML was built with it"""
+    import yaml
+    return yaml.load(raw, Loader=getattr(yaml, 'CSafeLoader', yaml.SafeLoader))
 
 class AIProvider(Enum):
     CLAUDE = "claude"
     ROVODEV = "rovodev" 
     GEMINI = "gemini"
 
-@dataclass
-class AIConfig:
-    provider: AIProvider
-    session_name: str
-    window_index: int
-    provider_options: Dict = None
+def _make_ai_config():
+    from dataclasses import dataclass
     
-    def __post_init__(self):
-        if self.provider_options is None:
-            self.provider_options = {}
+    @dataclass
+    class AIConfig:
+        provider: AIProvider
+        session_name: str
+        window_index: int
+        provider_options: Dict = None
+        
+        def __post_init__(self):
+            if self.provider_options is None:
+                self.provider_options = {}
+    
+    AIConfig.__module__, AIConfig.__qualname__ = __name__, "AIConfig"
+    return AIConfig
+
+def __getattr__(name):
+    # AIConfig is built on first access so importing this module doesn't
+    # pull in dataclasses (and inspect)
+    if name == "AIConfig":
+        globals()["AIConfig"] = config_class = _make_ai_config()
+        return config_class
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 class AIOrchestrator:
-    def __init__(self, config_file: str = "ai_config.yml"):
+    def __init__(self, config_file: str = "ai_config.yml", backend: Optional[TmuxControlClient] = None,
+                 server_args: Sequence[str] = (), servers: Optional[Sequence[str]] = None):
         self.config_file = config_file
         self.config = self._load_config()
+        # tmux options selecting the server, e.g. ["-L", "bench"]; empty for the default server
+        self.server_args = list(server_args)
+        # Further servers (settings.tmux_servers) addressed as server/session:window
+        if servers is None:
+            servers = self._settings().get('tmux_servers') or []
+        self.servers: Dict[str, List[str]] = dict(parse_server(spec) for spec in servers)
+        if backend is None and self._settings().get('tmux_backend') == 'control':
+            backend = TmuxControlClient(server_args=self.server_args)
+        # Persistent control-mode connection; None runs each command as a subprocess
+        self.backend = backend
+        # session:window assignments live in SQLite instead of the YAML when configured
+        self.registry = None
+        if self._settings().get('session_registry'):
+            self.registry = self._open_registry(self._settings()['session_registry'])
+        # JSONL log of every tmux call and send when settings.log_commands is on
+        self.event_log = self._open_event_log()
+        # OpenMetrics textfile for node_exporter, rewritten every metrics_interval seconds
+        if self._settings().get('metrics_textfile'):
+            self._start_metrics_exporter(self._settings()['metrics_textfile'])
+        # Name/role -> %pane_id mapping for windows addressed without an index; created on first use
+        self._resolver = None
+        # Prompt/echo polling in place of the fixed settle delay when enabled in settings
+        self.readiness = None
+        if self._readiness_settings().get('enabled'):
+            from readiness import ReadinessDetector
+            self.readiness = ReadinessDetector.from_config(self.config, run=lambda args: self._tmux(args, capture=True))
+        
+    def _settings(self) -> Dict:
+        return (self.config or {}).get('settings') or {}
+    
+    def _open_registry(self, path: str):
+        from session_registry import SessionRegistry
+        if not os.path.isabs(path):
+            path = os.path.join(os.path.dirname(os.path.abspath(self.config_file)), path)
+        registry = SessionRegistry(path)
+        # First use: seed the registry from the YAML sessions mapping
+        if registry.count() == 0 and self.config.get('sessions'):
+            registry.import_sessions(self.config['sessions'])
+        return registry
+    
+    def _open_event_log(self):
+        return event_log.configure_from_settings(self._settings(), self.config_file)
+    
+    def _start_metrics_exporter(self, path: str):
+        if not os.path.isabs(path):
+            path = os.path.join(os.path.dirname(os.path.abspath(self.config_file)), path)
+        return metrics.start_exporter(path, self._settings().get('metrics_interval', metrics.EXPORT_INTERVAL))
+    
+    def _readiness_settings(self) -> Dict:
+        return self._settings().get('readiness') or {}
+    
+    @property
+    def resolver(self):
+        """TargetResolver over the default server"""
+        if self._resolver is None:
+            from target_resolver import TargetResolver
+            self._resolver = TargetResolver(run=lambda args: self._tmux(args, capture=True))
+        return self._resolver
+    
+    def _window_target(self, session_name: str, window_index: Optional[int]) -> str:
+        """session:index, or with no index the %pane_id/@window_id given or the one a name or role resolves to"""
+        if window_index is None:
+            return self.resolver.target(session_name)
+        return f"{session_name}:{window_index}"
+    
+    def _route(self, target: str) -> Tuple[str, List[str], Optional[TmuxControlClient]]:
+        """The target on its server, that server's tmux options and the backend to use for it
+
+        A server/session:window target goes to one of self.servers over
+        subprocess calls, since the control-mode backend is connected to
+        the default server only.
+        """
+        server, local_target = split_server(target, self.servers)
+        if server is None:
+            return target, self.server_args, self.backend
+        return local_target, self.servers[server], None
+    
+    def _tmux(self, args: List[str], capture: bool = False) -> str:
+        """Run a tmux command on the configured backend, on the server of its -t targets
+
+        Every -t of a command sequence ("capture-pane -t T ; display-message
+        -t T") is rewritten; the first one picks the server.
+        """
+        args = list(args)
+        server_args, backend = self.server_args, self.backend
+        if self.servers:
+            routed = None
+            for position in range(1, len(args)):
+                if args[position - 1] != "-t":
+                    continue
+                local_target, target_server_args, target_backend = self._route(args[position])
+                if routed is None:
+                    routed = server_args, backend = target_server_args, target_backend
+                elif target_server_args != server_args:
+                    raise ValueError(f"tmux command addresses more than one server: {args}")
+                args[position] = local_target
+        return run_tmux(args, backend=backend, capture=capture, server_args=server_args)
         
     def _load_config(self) -> Dict:
         """Load AI provider configuration"""
-        if os.path.exists(self.config_file):
-            with open(self.config_file, 'r') as f:
-                return yaml.safe_load(f)
+        config = load_config_file(self.config_file)
+        if config is not None:
+            return config
         else:
             # Default configuration
             default_config = {
@@ -74,15 +245,22 @@ class AIOrchestrator:
     
     def _save_config(self, config: Dict):
         """Save configuration to file"""
-        with open(self.config_file, 'w') as f:
-            yaml.dump(config, f, default_flow_style=False)
+        import yaml
+        raw = yaml.dump(config, default_flow_style=False).encode('utf-8')
+        with open(self.config_file, 'wb') as f:
+            f.write(raw)
+        write_config_cache(self.config_file, raw, config)
     
     def get_provider_for_session(self, session_name: str, window_index: int) -> AIProvider:
         """Determine which AI provider to use for a given session/window"""
         session_key = f"{session_name}:{window_index}"
         
         # Check if specific session has a configured provider
-        if session_key in self.config.get('sessions', {}):
+        if self.registry is not None:
+            entry = self.registry.get(session_name, window_index)
+            if entry is not None:
+                return AIProvider(entry['provider'])
+        elif session_key in (self.config.get('sessions') or {}):
             provider_name = self.config['sessions'][session_key]['provider']
             return AIProvider(provider_name)
         
@@ -90,21 +268,95 @@ class AIOrchestrator:
         default_provider = self.config.get('default_provider', 'claude')
         return AIProvider(default_provider)
     
+    def build_rovodev_command(self, message: str) -> str:
+        """Build the acli rovodev run command line for a message"""
+        provider_config = self.config['providers']['rovodev']
+        options = provider_config.get('options', {})
+        
+        # Build command
+        cmd = ["acli", "rovodev", "run"]
+        
+        # Add options
+        if options.get('shadow', False):
+            cmd.append("--shadow")
+        if options.get('verbose', False):
+            cmd.append("--verbose")
+        if options.get('yolo', False):
+            cmd.append("--yolo")
+        if options.get('restore', False):
+            cmd.append("--restore")
+        
+        # Add message
+        cmd.append(message)
+        
+        return shlex.join(cmd)
+    
+    def build_gemini_command(self, message: str) -> str:
+        """Build the gemini command line for a message"""
+        provider_config = self.config['providers']['gemini']
+        options = provider_config.get('options', {})
+        
+        # Build command
+        cmd = ["gemini"]
+        
+        # Add options
+        if 'model' in options:
+            cmd.extend(["-m", options['model']])
+        if options.get('sandbox', False):
+            cmd.append("-s")
+        if options.get('all_files', False):
+            cmd.append("-a")
+        if options.get('yolo', False):
+            cmd.append("-y")
+        
+        # Add prompt
+        cmd.extend(["-p", message])
+        
+        return shlex.join(cmd)
+    
+    def build_text(self, provider: AIProvider, message: str) -> str:
+        """The text typed into the window to deliver a message with a provider"""
+        if provider == AIProvider.ROVODEV:
+            return self.build_rovodev_command(message)
+        if provider == AIProvider.GEMINI:
+            return self.build_gemini_command(message)
+        return message
+    
+    def _deliver(self, window_target: str, provider: AIProvider, text: str) -> bool:
+        """Type text into a window and press Enter, waiting for the agent when readiness is enabled"""
+        if self.readiness is not None and not self.readiness.wait_until_ready(window_target, provider.value):
+            print(f"Warning: {window_target} not ready for input after {self.readiness.timeout}s")
+            if self._readiness_settings().get('timeout_action', 'send') == 'fail':
+                return False
+        
+        # Long or multi-line text is pasted in one go; agents like Claude
+        # show a paste placeholder instead of echoing it
+        pasted = is_bulk(text)
+        if pasted:
+            local_target, server_args, backend = self._route(window_target)
+            paste_text(local_target, text, backend=backend, server_args=server_args)
+        else:
+            self._tmux(["send-keys", "-t", window_target, "-l", text])
+        
+        # Wait for UI to register
+        if self.readiness is None:
+            time.sleep(SEND_SETTLE_DELAY)
+        elif pasted:
+            self.readiness.wait_for_settle(window_target)
+        elif not self.readiness.wait_for_echo(window_target, text):
+            print(f"Warning: input not echoed in {window_target}, pressing Enter anyway")
+        
+        self._tmux(["send-keys", "-t", window_target, "Enter"])
+        return True
+    
     def send_message_claude(self, session_name: str, window_index: int, message: str) -> bool:
         """Send message to Claude using tmux send-keys (existing behavior)"""
         try:
-            window_target = f"{session_name}:{window_index}"
-            
-            # Send the message
-            cmd = ["tmux", "send-keys", "-t", window_target, message]
-            subprocess.run(cmd, check=True)
-            
-            # Wait for UI to register
-            time.sleep(0.5)
+            window_target = self._window_target(session_name, window_index)
             
-            # Send Enter
-            cmd = ["tmux", "send-keys", "-t", window_target, "Enter"]
-            subprocess.run(cmd, check=True)
+            # Send the message and Enter
+            if not self._deliver(window_target, AIProvider.CLAUDE, message):
+                return False
             
             print(f"Message sent to Claude at {window_target}: {message}")
             return True
@@ -116,35 +368,12 @@ class AIOrchestrator:
     def send_message_rovodev(self, session_name: str, window_index: int, message: str) -> bool:
         """Send message to RovoDev using acli rovodev run"""
         try:
-            window_target = f"{session_name}:{window_index}"
-            provider_config = self.config['providers']['rovodev']
-            options = provider_config.get('options', {})
-            
-            # Build command
-            cmd = ["acli", "rovodev", "run"]
-            
-            # Add options
-            if options.get('shadow', False):
-                cmd.append("--shadow")
-            if options.get('verbose', False):
-                cmd.append("--verbose")
-            if options.get('yolo', False):
-                cmd.append("--yolo")
-            if options.get('restore', False):
-                cmd.append("--restore")
-            
-            # Add message
-            cmd.append(message)
-            
-            # Send command to tmux window
-            cmd_str = " ".join(cmd)
-            tmux_cmd = ["tmux", "send-keys", "-t", window_target, cmd_str]
-            subprocess.run(tmux_cmd, check=True)
+            window_target = self._window_target(session_name, window_index)
+            cmd_str = self.build_rovodev_command(message)
             
-            # Send Enter
-            time.sleep(0.5)
-            enter_cmd = ["tmux", "send-keys", "-t", window_target, "Enter"]
-            subprocess.run(enter_cmd, check=True)
+            # Send command to tmux window and Enter
+            if not self._deliver(window_target, AIProvider.ROVODEV, cmd_str):
+                return False
             
             print(f"RovoDev command sent to {window_target}: {cmd_str}")
             return True
@@ -156,35 +385,12 @@ class AIOrchestrator:
     def send_message_gemini(self, session_name: str, window_index: int, message: str) -> bool:
         """Send message to Gemini using gemini CLI"""
         try:
-            window_target = f"{session_name}:{window_index}"
-            provider_config = self.config['providers']['gemini']
-            options = provider_config.get('options', {})
+            window_target = self._window_target(session_name, window_index)
+            cmd_str = self.build_gemini_command(message)
             
-            # Build command
-            cmd = ["gemini"]
-            
-            # Add options
-            if 'model' in options:
-                cmd.extend(["-m", options['model']])
-            if options.get('sandbox', False):
-                cmd.append("-s")
-            if options.get('all_files', False):
-                cmd.append("-a")
-            if options.get('yolo', False):
-                cmd.append("-y")
-            
-            # Add prompt
-            cmd.extend(["-p", message])
-            
-            # Send command to tmux window
-            cmd_str = " ".join(cmd)
-            tmux_cmd = ["tmux", "send-keys", "-t", window_target, cmd_str]
-            subprocess.run(tmux_cmd, check=True)
-            
-            # Send Enter
-            time.sleep(0.5)
-            enter_cmd = ["tmux", "send-keys", "-t", window_target, "Enter"]
-            subprocess.run(enter_cmd, check=True)
+            # Send command to tmux window and Enter
+            if not self._deliver(window_target, AIProvider.GEMINI, cmd_str):
+                return False
             
             print(f"Gemini command sent to {window_target}: {cmd_str}")
             return True
@@ -193,26 +399,63 @@ class AIOrchestrator:
             print(f"Error sending message to Gemini: {e}")
             return False
     
-    def send_message(self, session_name: str, window_index: int, message: str, provider: Optional[AIProvider] = None) -> bool:
-        """Send message using the appropriate AI provider"""
-        if provider is None:
+    def send_message(self, session_name: str, window_index: Optional[int], message: str,
+                     provider: Optional[AIProvider] = None) -> bool:
+        """Send message using the appropriate AI provider
+
+        With window_index None, session_name is a %pane_id, @window_id,
+        window name, session:name or role=<role>; the message goes to the
+        window's pane by ID, so it can't land elsewhere if windows are
+        renumbered meanwhile.
+        """
+        start = time.perf_counter()
+        if window_index is None:
+            try:
+                resolved = self.resolver.resolve(session_name)
+            except (LookupError, subprocess.CalledProcessError) as e:
+                print(f"Error resolving {session_name}: {e}")
+                provider = provider or AIProvider(self.config.get('default_provider', 'claude'))
+                self._record_send(session_name, provider, message, start, False)
+                return False
+            if provider is None:
+                provider = self.get_provider_for_session(resolved.session_name, resolved.window_index)
+            session_name = resolved.pane_id
+        elif provider is None:
             provider = self.get_provider_for_session(session_name, window_index)
         
         if provider == AIProvider.CLAUDE:
-            return self.send_message_claude(session_name, window_index, message)
+            success = self.send_message_claude(session_name, window_index, message)
         elif provider == AIProvider.ROVODEV:
-            return self.send_message_rovodev(session_name, window_index, message)
+            success = self.send_message_rovodev(session_name, window_index, message)
         elif provider == AIProvider.GEMINI:
-            return self.send_message_gemini(session_name, window_index, message)
+            success = self.send_message_gemini(session_name, window_index, message)
         else:
             print(f"Unknown provider: {provider}")
-            return False
+            success = False
+        
+        if not success and window_index is None:
+            # The pane may have closed; look the target up again next time
+            self.resolver.invalidate()
+        self._record_send(self._window_target(session_name, window_index), provider, message, start, success)
+        return success
+    
+    def _record_send(self, window_target: str, provider: AIProvider, message: str, start: float, success: bool):
+        """Record a send's duration and outcome in the metrics and, when enabled, the event log"""
+        duration = time.perf_counter() - start
+        provider_name = getattr(provider, 'value', str(provider))
+        metrics.SEND_SECONDS.observe(duration, provider_name)
+        if not success:
+            metrics.SEND_FAILURES.inc(provider_name)
+        log = event_log.current()
+        if log is not None:
+            log.record("send", target=window_target, provider=provider_name,
+                       bytes=len(message.encode('utf-8')), duration=round(duration, 6), ok=success)
     
     def configure_session(self, session_name: str, window_index: int, provider: AIProvider, options: Dict = None):
         """Configure a specific session to use a particular AI provider"""
         session_key = f"{session_name}:{window_index}"
         
-        if 'sessions' not in self.config:
+        if not self.config.get('sessions'):
             self.config['sessions'] = {}
         
         self.config['sessions'][session_key] = {
@@ -220,11 +463,17 @@ class AIOrchestrator:
             'options': options or {}
         }
         
-        self._save_config(self.config)
+        if self.registry is not None:
+            # One-row upsert instead of rewriting ai_config.yml
+            self.registry.set(session_name, window_index, provider.value, options)
+        else:
+            self._save_config(self.config)
         print(f"Configured {session_key} to use {provider.value}")
     
     def list_sessions(self) -> Dict:
         """List all configured sessions and their providers"""
+        if self.registry is not None:
+            return self.registry.export_sessions()
         return self.config.get('sessions', {})
     
     def start_interactive_session(self, session_name: str, window_index: int, provider: AIProvider):
@@ -234,18 +483,15 @@ class AIOrchestrator:
         try:
             if provider == AIProvider.CLAUDE:
                 # Start Claude interactive session
-                cmd = ["tmux", "send-keys", "-t", window_target, "claude", "Enter"]
-                subprocess.run(cmd, check=True)
+                self._tmux(["send-keys", "-t", window_target, "claude", "Enter"])
                 
             elif provider == AIProvider.ROVODEV:
                 # Start RovoDev interactive session
-                cmd = ["tmux", "send-keys", "-t", window_target, "acli rovodev run", "Enter"]
-                subprocess.run(cmd, check=True)
+                self._tmux(["send-keys", "-t", window_target, "acli rovodev run", "Enter"])
                 
             elif provider == AIProvider.GEMINI:
                 # Start Gemini interactive session
-                cmd = ["tmux", "send-keys", "-t", window_target, "gemini", "Enter"]
-                subprocess.run(cmd, check=True)
+                self._tmux(["send-keys", "-t", window_target, "gemini", "Enter"])
             
             print(f"Started {provider.value} session in {window_target}")
             return True
@@ -257,12 +503,28 @@ class AIOrchestrator:
 
 import sys
 
+def parse_target(target: str) -> Tuple[str, Optional[int]]:
+    """(session, index) of a session:index target; (target, None) for %pane_id, @window_id,
+    a window name, session:name or role=<role>, which send_message resolves"""
+    try:
+        session_name, window_index = target.rsplit(':', 1)
+        return session_name, int(window_index)
+    except ValueError:
+        return target, None
+
 def main(argv=None):
     if argv is None:
         argv = sys.argv
 
-    if len(argv) < 4:
-        print("Usage: python3 ai_provider.py <session:window> <message> [provider]")
+    if len(argv) > 1 and argv[1] == "--daemon":
+        # Resident mode: serve ai_client.py requests on a Unix socket
+        from ai_daemon import main as daemon_main
+        daemon_main(argv[1:])
+        return
+
+    if len(argv) < 3:
+        print("Usage: python3 ai_provider.py <session:window|%pane_id|@window_id|name|role=<role>> <message> [provider]")
+        print("       python3 ai_provider.py --daemon [socket_path]")
         print("Example: python3 ai_provider.py project:0 'Hello AI!' rovodev")
         sys.exit(1)
     
@@ -271,12 +533,7 @@ def main(argv=None):
     message = argv[2]
     provider = argv[3] if len(argv) > 3 else None
     
-    try:
-        session_name, window_index = session_window.split(':')
-        window_index = int(window_index)
-    except ValueError:
-        print("Error: session:window format required (e.g., 'project:0')")
-        sys.exit(1)
+    session_name, window_index = parse_target(session_window)
     
     # Initialize orchestrator
     orchestrator = AIOrchestrator()
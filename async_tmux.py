@@ -0,0 +1,354 @@
+#!/usr/bin/env python3
+
+import asyncio
+import subprocess
+import time
+from datetime import datetime
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from ai_provider import SEND_SETTLE_DELAY, AIOrchestrator, AIProvider
+import event_log
+import metrics
+from tmux_control import (CONTROL_SESSION, TmuxControlClient, TmuxControlError, TmuxReplyTimeout, is_bulk,
+                          log_load_buffer, log_tmux_call, paste_buffer_args, paste_buffer_name)
+from tmux_utils import (PANE_FIELDS, TmuxOrchestrator, TmuxPane, TmuxSession, TmuxWindow, WINDOW_FIELDS,
+                        build_sessions, build_status, pane_info, parse_rows, timed_out_info, tmux_format,
+                        window_info)
+
+async def run_tmux_async(args: Sequence[str], backend: Optional[TmuxControlClient] = None,
+                         capture: bool = True, server_args: Sequence[str] = ()) -> str:
+    """Async run_tmux: control-mode backend if given, else a tmux subprocess
+
+    Control-mode replies are waited for on the default executor so the event
+    loop is never blocked. Raises subprocess.CalledProcessError like run_tmux.
+    """
+    log = event_log.current()
+    if log is None:
+        return await _run_tmux_async(args, backend, capture, server_args)
+    start = time.perf_counter()
+    try:
+        output = await _run_tmux_async(args, backend, capture, server_args)
+    except Exception as e:
+        log_tmux_call(log, args, start, error=e)
+        raise
+    log_tmux_call(log, args, start, output=output)
+    return output
+
+async def _run_tmux_async(args: Sequence[str], backend: Optional[TmuxControlClient], capture: bool,
+                          server_args: Sequence[str]) -> str:
+    if backend is not None:
+        loop = asyncio.get_running_loop()
+        try:
+            return await loop.run_in_executor(None, backend.run, list(args))
+        except TmuxReplyTimeout as e:
+            # Sent and possibly run already, so not retried (see tmux_control._run_tmux)
+            raise subprocess.CalledProcessError(1, ["tmux", *server_args, *args], stderr=str(e)) from e
+        except TmuxControlError:
+            pass
+
+    cmd = ["tmux", *server_args, *args]
+    proc = await asyncio.create_subprocess_exec(
+        *cmd,
+        stdout=subprocess.PIPE if capture else None,
+        stderr=subprocess.PIPE if capture else None,
+    )
+    stdout, stderr = await proc.communicate()
+    output = stdout.decode("utf-8", errors="replace") if stdout else ""
+    if proc.returncode != 0:
+        raise subprocess.CalledProcessError(proc.returncode, cmd, output=output,
+                                            stderr=stderr.decode("utf-8", errors="replace") if stderr else "")
+    return output
+
+async def paste_text_async(target: str, text: str, backend: Optional[TmuxControlClient] = None,
+                           server_args: Sequence[str] = ()):
+    """Async paste_text: stream text into a tmux buffer on stdin, then paste it"""
+    name = paste_buffer_name()
+    cmd = ["tmux", *server_args, "load-buffer", "-b", name, "-"]
+    data = text.encode("utf-8")
+    start = time.perf_counter()
+    proc = await asyncio.create_subprocess_exec(*cmd, stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                                                stderr=subprocess.PIPE)
+    _, stderr = await proc.communicate(data)
+    if proc.returncode != 0:
+        error = subprocess.CalledProcessError(proc.returncode, cmd, stderr=stderr.decode("utf-8", errors="replace"))
+        log_load_buffer(name, target, data, start, error=error)
+        raise error
+    log_load_buffer(name, target, data, start)
+    try:
+        await run_tmux_async(paste_buffer_args(name, target), backend=backend, capture=False,
+                             server_args=server_args)
+    except subprocess.CalledProcessError:
+        # paste-buffer -d only deletes the buffer once it has pasted it
+        try:
+            await run_tmux_async(["delete-buffer", "-b", name], server_args=server_args)
+        except subprocess.CalledProcessError:
+            pass
+        raise
+
+class AsyncTmuxOrchestrator:
+    """asyncio counterpart of TmuxOrchestrator
+
+    Wraps a TmuxOrchestrator and shares its settings, capture cache and
+    recorder, so both APIs can be used side by side in one process:
+
+        orchestrator = AsyncTmuxOrchestrator()
+        status = await orchestrator.get_all_windows_status()
+    """
+
+    def __init__(self, orchestrator: Optional[TmuxOrchestrator] = None):
+        self.orchestrator = orchestrator or TmuxOrchestrator()
+
+    async def _tmux(self, args: List[str], capture: bool = True) -> str:
+        return await run_tmux_async(args, backend=self.orchestrator.backend, capture=capture,
+                                    server_args=self.orchestrator.server_args)
+
+    async def query_windows(self) -> List[Dict[str, str]]:
+        """Get every window on the server as WINDOW_FIELDS rows in one tmux call"""
+        output = await self._tmux(["list-windows", "-a", "-F", tmux_format(WINDOW_FIELDS)])
+        return [row for row in parse_rows(output, WINDOW_FIELDS)
+                if row["session_name"] != CONTROL_SESSION]
+
+    async def query_panes(self) -> List[Dict[str, str]]:
+        """Get every pane on the server as PANE_FIELDS rows in one tmux call"""
+        output = await self._tmux(["list-panes", "-a", "-F", tmux_format(PANE_FIELDS)])
+        return [row for row in parse_rows(output, PANE_FIELDS)
+                if row["session_name"] != CONTROL_SESSION]
+
+    @metrics.timed_async("get_tmux_sessions")
+    async def get_tmux_sessions(self, include_panes: bool = False) -> List[TmuxSession]:
+        """Get all tmux sessions and their windows, and with include_panes their panes"""
+        try:
+            rows = await (self.query_panes() if include_panes else self.query_windows())
+        except subprocess.CalledProcessError as e:
+            print(f"Error getting tmux sessions: {e}")
+            metrics.OPERATION_FAILURES.inc("get_tmux_sessions")
+            return []
+
+        sessions = build_sessions(rows)
+        metrics.SESSIONS.set(len(sessions))
+        metrics.WINDOWS.set(sum(len(session.windows) for session in sessions))
+        return sessions
+
+    @metrics.timed_async("capture_window_content")
+    async def capture_window_content(self, session_name: str, window_index: int, num_lines: int = 50,
+                                     window: Optional[TmuxWindow] = None) -> str:
+        """Safely capture the last N lines from a tmux window"""
+        sync = self.orchestrator
+        if num_lines > sync.max_lines_capture:
+            num_lines = sync.max_lines_capture
+
+        recorded = sync.tail_recorded(session_name, window_index, num_lines)
+        if recorded is not None:
+            return recorded
+
+        key, validator, cached = sync._cached_capture(num_lines, window)
+        if cached is not None:
+            return cached
+
+        try:
+            content = await self._tmux(["capture-pane", "-t", f"{session_name}:{window_index}", "-p",
+                                        "-S", f"-{num_lines}"])
+        except subprocess.CalledProcessError as e:
+            metrics.OPERATION_FAILURES.inc("capture_window_content")
+            return f"Error capturing window content: {e}"
+
+        sync._cache_capture(key, validator, window, content)
+        return content
+
+    async def capture_window_bytes(self, session_name: str, window_index: int, num_lines: int = 50,
+                                   window: Optional[TmuxWindow] = None) -> bytes:
+        """capture_window_content encoded as UTF-8, for callers that want bytes"""
+        return (await self.capture_window_content(session_name, window_index, num_lines, window)).encode()
+
+    @metrics.timed_async("capture_pane_content")
+    async def capture_pane_content(self, pane: TmuxPane, num_lines: int = 50) -> str:
+        """Capture the last N lines of one pane by ID, reusing cached content while it is idle"""
+        sync = self.orchestrator
+        num_lines = min(num_lines, sync.max_lines_capture)
+        key, validator, cached = sync._cached_capture(num_lines, pane)
+        if cached is not None:
+            return cached
+
+        try:
+            content = await self._tmux(["capture-pane", "-t", pane.pane_id, "-p", "-S", f"-{num_lines}"])
+        except subprocess.CalledProcessError as e:
+            metrics.OPERATION_FAILURES.inc("capture_pane_content")
+            return f"Error capturing pane content: {e}"
+
+        sync._cache_capture(key, validator, pane, content)
+        return content
+
+    async def capture_pane_bytes(self, pane: TmuxPane, num_lines: int = 50) -> bytes:
+        """capture_pane_content encoded as UTF-8, for callers that want bytes"""
+        return (await self.capture_pane_content(pane, num_lines)).encode()
+
+    async def get_window_info(self, session_name: str, window_index: int, window: Optional[TmuxWindow] = None,
+                              num_lines: int = 50) -> Dict:
+        """Get detailed information about a specific window
+
+        As TmuxOrchestrator.get_window_info: a window listed with several
+        panes gets "pane_details", its other panes captured concurrently.
+        """
+        try:
+            if window is None:
+                output = await self._tmux(["display-message", "-t", f"{session_name}:{window_index}", "-p",
+                                           tmux_format(WINDOW_FIELDS)])
+                rows = parse_rows(output.strip(), WINDOW_FIELDS)
+                if not rows:
+                    return None
+                window = TmuxWindow.from_row(rows[0])
+
+            content = await self.capture_window_content(session_name, window_index, num_lines, window)
+            info = window_info(window, content)
+            if len(window.panes) > 1:
+                contents = await asyncio.gather(*(self.capture_pane_content(pane, num_lines)
+                                                  for pane in window.panes if not pane.active))
+                contents = iter(contents)
+                info["pane_details"] = [pane_info(pane, content if pane.active else next(contents))
+                                        for pane in window.panes]
+            return info
+        except subprocess.CalledProcessError as e:
+            return {"error": f"Could not get window info: {e}"}
+
+    @metrics.timed_async("get_all_windows_status")
+    async def get_all_windows_status(self, max_workers: Optional[int] = None, timeout: Optional[float] = None,
+                                     num_lines: int = 50, include_panes: bool = False) -> Dict:
+        """Get status of all windows across all sessions
+
+        At most max_workers captures (default capture_workers) are in flight
+        at once; a window whose capture runs longer than timeout seconds
+        (default capture_timeout) is reported with a timeout error. With
+        include_panes, windows split into several panes get "pane_details".
+        """
+        sync = self.orchestrator
+        timestamp = datetime.now().isoformat()
+        sessions = await self.get_tmux_sessions(include_panes=include_panes)
+        windows = [(session, window) for session in sessions for window in session.windows]
+        timeout = sync.capture_timeout if timeout is None else timeout
+        limit = asyncio.Semaphore(max(max_workers or sync.capture_workers, 1))
+
+        async def collect(session: TmuxSession, window: TmuxWindow) -> Dict:
+            async with limit:
+                try:
+                    return await asyncio.wait_for(
+                        self.get_window_info(session.name, window.window_index, window, num_lines), timeout)
+                except asyncio.TimeoutError:
+                    metrics.CAPTURE_TIMEOUTS.inc()
+                    return timed_out_info(window, timeout)
+
+        infos = await asyncio.gather(*(collect(session, window) for session, window in windows))
+        return build_status(sessions, infos, timestamp)
+
+    async def send_keys_to_window(self, session_name: str, window_index: int, keys: str, confirm: bool = True) -> bool:
+        """Safely send keys to a tmux window with confirmation"""
+        if self.orchestrator.safety_mode and confirm:
+            print(f"SAFETY CHECK: About to send '{keys}' to {session_name}:{window_index}")
+            response = await asyncio.get_running_loop().run_in_executor(None, input, "Confirm? (yes/no): ")
+            if response.lower() != 'yes':
+                print("Operation cancelled")
+                return False
+
+        try:
+            if is_bulk(keys):
+                await paste_text_async(f"{session_name}:{window_index}", keys, backend=self.orchestrator.backend,
+                                       server_args=self.orchestrator.server_args)
+            else:
+                await self._tmux(["send-keys", "-t", f"{session_name}:{window_index}", keys], capture=False)
+            return True
+        except subprocess.CalledProcessError as e:
+            print(f"Error sending keys: {e}")
+            return False
+
+class AsyncAIOrchestrator:
+    """asyncio counterpart of AIOrchestrator.send_message
+
+    The settle delay between typing a message and pressing Enter, and the
+    readiness polls when readiness detection is enabled, are asyncio
+    sleeps, so messages to many windows go out concurrently. Messages to
+    the same window go out one after another in the order they were sent,
+    like MessageDispatcher's per-window queues.
+    """
+
+    PROVIDER_LABELS = {
+        AIProvider.CLAUDE: "Message sent to Claude at",
+        AIProvider.ROVODEV: "RovoDev command sent to",
+        AIProvider.GEMINI: "Gemini command sent to",
+    }
+
+    def __init__(self, config_file: str = "ai_config.yml", backend: Optional[TmuxControlClient] = None,
+                 orchestrator: Optional[AIOrchestrator] = None):
+        self.orchestrator = orchestrator or AIOrchestrator(config_file, backend=backend)
+        # Per-target locks; asyncio.Lock wakes its waiters in FIFO order
+        self._target_locks: Dict[str, asyncio.Lock] = {}
+
+    async def send_message(self, session_name: str, window_index: Optional[int], message: str,
+                           provider: Optional[AIProvider] = None) -> bool:
+        """Send message using the appropriate AI provider, after earlier sends to the same target"""
+        target = session_name if window_index is None else f"{session_name}:{window_index}"
+        lock = self._target_locks.setdefault(target, asyncio.Lock())
+        async with lock:
+            return await self._send_message(session_name, window_index, message, provider)
+
+    async def _send_message(self, session_name: str, window_index: Optional[int], message: str,
+                            provider: Optional[AIProvider]) -> bool:
+        sync = self.orchestrator
+        if window_index is None:
+            # Resolving names and roles may list windows; leave that and the send to a thread
+            return await asyncio.get_running_loop().run_in_executor(
+                None, sync.send_message, session_name, window_index, message, provider)
+        if provider is None:
+            provider = sync.get_provider_for_session(session_name, window_index)
+        if provider not in self.PROVIDER_LABELS:
+            print(f"Unknown provider: {provider}")
+            return False
+
+        window_target = f"{session_name}:{window_index}"
+        local_target, server_args, backend = sync._route(window_target)
+        text = sync.build_text(provider, message)
+        start = time.perf_counter()
+        try:
+            sent = await self._deliver(local_target, provider, text, backend, server_args)
+        except subprocess.CalledProcessError as e:
+            print(f"Error sending message to {provider.value}: {e}")
+            sent = False
+
+        if sent:
+            print(f"{self.PROVIDER_LABELS[provider]} {window_target}: {text}")
+        sync._record_send(window_target, provider, message, start, sent)
+        return sent
+
+    async def _deliver(self, target: str, provider: AIProvider, text: str,
+                       backend: Optional[TmuxControlClient], server_args: Sequence[str]) -> bool:
+        """Async AIOrchestrator._deliver for a target already routed to its server"""
+        readiness = self.orchestrator.readiness
+
+        async def run(args: List[str]) -> str:
+            return await run_tmux_async(args, backend=backend, server_args=server_args)
+
+        if readiness is not None and not await readiness.wait_until_ready_async(target, provider.value, run):
+            print(f"Warning: {target} not ready for input after {readiness.timeout}s")
+            if self.orchestrator._readiness_settings().get('timeout_action', 'send') == 'fail':
+                return False
+
+        pasted = is_bulk(text)
+        if pasted:
+            await paste_text_async(target, text, backend=backend, server_args=server_args)
+        else:
+            await run_tmux_async(["send-keys", "-t", target, "-l", text], backend=backend, capture=False,
+                                 server_args=server_args)
+
+        if readiness is None:
+            await asyncio.sleep(SEND_SETTLE_DELAY)
+        elif pasted:
+            await readiness.wait_for_settle_async(target, run)
+        elif not await readiness.wait_for_echo_async(target, text, run):
+            print(f"Warning: input not echoed in {target}, pressing Enter anyway")
+
+        await run_tmux_async(["send-keys", "-t", target, "Enter"], backend=backend, capture=False,
+                             server_args=server_args)
+        return True
+
+    async def send_messages(self, messages: Sequence[Tuple[str, int, str]]) -> List[bool]:
+        """Send (session_name, window_index, message) tuples concurrently, in order per target"""
+        return list(await asyncio.gather(*(self.send_message(session_name, window_index, message)
+                                           for session_name, window_index, message in messages)))
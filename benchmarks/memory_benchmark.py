@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+"""Memory used by the status model for a large fleet
+
+Feeds TmuxOrchestrator synthetic list-windows/list-panes and capture-pane
+output (no tmux server involved) and measures with tracemalloc what the
+results keep alive, per window:
+
+    model    the sessions/windows of get_tmux_sessions()
+    panes    the same with include_panes=True (2 panes per window)
+    status   a get_all_windows_status() result plus the capture cache
+             entries it left behind, for plain-ASCII captures and for
+             mixed ones
+
+    python3 benchmarks/memory_benchmark.py --windows 300 --lines 1000
+    python3 benchmarks/memory_benchmark.py --windows 1000 --lines 200 --output memory.json
+
+Mixed captures look like an agent's terminal: mostly ASCII with the odd
+box-drawing line, which makes a Python str of them 2 bytes per character
+where a plain-ASCII one takes 1.
+"""
+
+import gc
+import json
+import os
+import sys
+import tracemalloc
+from datetime import datetime
+from typing import Callable, Dict, List
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+
+from tmux_utils import FIELD_SEP, PANE_FIELDS, WINDOW_FIELDS, TmuxOrchestrator
+
+DEFAULT_WINDOWS = 300
+DEFAULT_LINES = 1000
+WINDOWS_PER_SESSION = 10
+
+def fleet_row(fields, window: int, pane: int = 0, panes: int = 1) -> str:
+    """One list-windows/list-panes -a output line for window number window"""
+    values = {
+        "session_name": f"team-{window // WINDOWS_PER_SESSION}",
+        "session_attached": "0",
+        "window_index": str(window % WINDOWS_PER_SESSION),
+        "window_id": f"@{window}",
+        "window_active": "1" if window % WINDOWS_PER_SESSION == 0 else "0",
+        "window_panes": str(panes),
+        "window_layout": "b25d,200x50,0,0,%d" % window,
+        "window_activity": "1700000000",
+        "pane_id": f"%{window * panes + pane}",
+        "history_size": "1000",
+        "history_limit": "2000",
+        "cursor_y": "10",
+        "pane_index": str(pane),
+        "pane_active": "1" if pane == 0 else "0",
+        "pane_pid": str(10000 + window * panes + pane),
+        "pane_width": "200",
+        "pane_height": "50",
+        "pane_current_command": "claude" if pane == 0 else "bash",
+        "window_name": "claude" if window % 2 else "tests",
+    }
+    return FIELD_SEP.join(values[field] for field in fields)
+
+def capture_text(pane_id: str, lines: int, mixed: bool = True) -> str:
+    """Synthetic scrollback of an agent window, with box-drawing lines if mixed"""
+    out = []
+    for line in range(lines):
+        if line % 25 == 0:
+            out.append("╭" + "─" * 78 + "╮" if mixed else "+" + "-" * 78 + "+")
+        else:
+            out.append(f"{pane_id} {line:>5} PASS tests/test_module_{line % 37}.py::test_case_{line} [ {line % 100}%]")
+    return "\n".join(out) + "\n"
+
+class SyntheticOrchestrator(TmuxOrchestrator):
+    """TmuxOrchestrator answering tmux commands from a synthetic fleet"""
+
+    def __init__(self, windows: int, lines: int, mixed: bool = True):
+        super().__init__()
+        self.capture_cache.max_entries = windows * 2
+        self.windows = windows
+        self.lines = lines
+        self.mixed = mixed
+
+    def _tmux(self, args: List[str], capture: bool = True) -> str:
+        if args[0] == "list-windows":
+            return "\n".join(fleet_row(WINDOW_FIELDS, window) for window in range(self.windows)) + "\n"
+        if args[0] == "list-panes":
+            return "\n".join(fleet_row(PANE_FIELDS, window, pane, panes=2)
+                             for window in range(self.windows) for pane in range(2)) + "\n"
+        if args[0] == "capture-pane":
+            return capture_text(args[2], self.lines, self.mixed)
+        return ""
+
+def retained(build: Callable[[], object]) -> int:
+    """Bytes still allocated after build() while its result is alive"""
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    result = build()
+    gc.collect()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del result
+    return after - before
+
+def run(windows: int, lines: int) -> Dict:
+    model = retained(lambda: SyntheticOrchestrator(windows, lines).get_tmux_sessions())
+    panes = retained(lambda: SyntheticOrchestrator(windows, lines).get_tmux_sessions(include_panes=True))
+
+    results = {
+        "windows": windows,
+        "lines": lines,
+        "model_bytes_per_window": model / windows,
+        "model_with_panes_bytes_per_window": panes / windows,
+    }
+    for kind, mixed in (("ascii", False), ("mixed", True)):
+        def status():
+            orchestrator = SyntheticOrchestrator(windows, lines, mixed)
+            return orchestrator, orchestrator.get_all_windows_status(max_workers=1)
+
+        total = retained(status)
+        captures = [capture_text(f"%{window}", lines, mixed) for window in range(windows)]
+        results[f"{kind}_capture_utf8_bytes_per_window"] = sum(len(text.encode()) for text in captures) / windows
+        results[f"{kind}_capture_str_bytes_per_window"] = sum(sys.getsizeof(text) for text in captures) / windows
+        results[f"{kind}_status_bytes_per_window"] = total / windows
+        # What a status keeps per window beyond the one str of its capture
+        # shared by the capture cache and the status dict
+        results[f"{kind}_status_overhead_per_window"] = \
+            total / windows - results[f"{kind}_capture_str_bytes_per_window"]
+    return results
+
+def main(argv=None):
+    if argv is None:
+        argv = sys.argv
+
+    usage = "Usage: python3 benchmarks/memory_benchmark.py [--windows N] [--lines N] [--output FILE]"
+    windows, lines, output = DEFAULT_WINDOWS, DEFAULT_LINES, None
+    args = argv[1:]
+    try:
+        while args:
+            option = args.pop(0)
+            if option == "--windows":
+                windows = int(args.pop(0))
+            elif option == "--lines":
+                lines = int(args.pop(0))
+            elif option == "--output":
+                output = args.pop(0)
+            else:
+                raise ValueError(option)
+    except (IndexError, ValueError):
+        print(usage)
+        sys.exit(1)
+
+    results = {"timestamp": datetime.now().isoformat(), "python": sys.version.split()[0], **run(windows, lines)}
+    for key, value in results.items():
+        print(f"{key:<36} {value:,.0f}" if isinstance(value, float) else f"{key:<36} {value}")
+    if output:
+        with open(output, "w") as f:
+            json.dump(results, f, indent=2)
+
+if __name__ == "__main__":
+    main()
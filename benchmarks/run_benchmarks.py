@@ -0,0 +1,338 @@
+#!/usr/bin/env python3
+"""Benchmarks against a private tmux server
+
+Starts `tmux -L bench` (never the default server), fills it with sessions
+of windows whose panes print synthetic output and then sit at a shell
+prompt, and times the orchestrator's main operations:
+
+    python3 benchmarks/run_benchmarks.py --scale 10x5 --scale 100x10
+    python3 benchmarks/run_benchmarks.py --scale 500x20 --iterations 5 --output results.json
+
+Results are JSON with per-operation percentiles, compared against
+benchmarks/baseline.json; the exit status is 1 when an operation's p50 is
+more than --tolerance slower than the baseline. --save-baseline records
+the run as the new baseline. Numbers depend on the machine, so refresh
+the baseline when moving to different hardware.
+"""
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+
+from ai_provider import AIOrchestrator, AIProvider
+from dispatch import MessageDispatcher
+from tmux_utils import TmuxOrchestrator
+
+DEFAULT_SCALES = ("10x5", "100x10")
+DEFAULT_BASELINE = os.path.join(BENCH_DIR, "baseline.json")
+# An operation regresses when its p50 is this fraction slower than the baseline...
+DEFAULT_TOLERANCE = 0.25
+# ...and at least this many seconds slower, so sub-millisecond jitter doesn't count
+MIN_REGRESSION_SECONDS = 0.002
+# tmux commands sent per client invocation when building the bench server
+COMMAND_BATCH = 50
+OPERATIONS = ("get_tmux_sessions", "get_all_windows_status", "get_all_windows_status_uncached",
+              "create_monitoring_snapshot", "find_window_by_name", "send_message", "send_message_dispatch")
+
+def parse_scale(scale: str) -> Tuple[int, int]:
+    """'100x10' -> (100 sessions, 10 windows each)"""
+    sessions, _, windows = scale.lower().partition("x")
+    return int(sessions), int(windows or 1)
+
+def percentile(sorted_samples: Sequence[float], fraction: float) -> float:
+    """Linearly interpolated percentile of already sorted samples"""
+    if not sorted_samples:
+        return 0.0
+    position = (len(sorted_samples) - 1) * fraction
+    lower = int(position)
+    upper = min(lower + 1, len(sorted_samples) - 1)
+    return sorted_samples[lower] + (sorted_samples[upper] - sorted_samples[lower]) * (position - lower)
+
+def summarize(samples: Sequence[float]) -> Dict[str, float]:
+    """Latency summary in seconds, plus throughput from the mean"""
+    ordered = sorted(samples)
+    mean = sum(ordered) / len(ordered) if ordered else 0.0
+    return {
+        "iterations": len(ordered),
+        "mean": mean,
+        "min": ordered[0] if ordered else 0.0,
+        "p50": percentile(ordered, 0.50),
+        "p90": percentile(ordered, 0.90),
+        "p99": percentile(ordered, 0.99),
+        "max": ordered[-1] if ordered else 0.0,
+        "ops_per_sec": 1 / mean if mean else 0.0,
+    }
+
+def measure(func: Callable[[], object], iterations: int, warmup: int = 1) -> Dict[str, float]:
+    for _ in range(warmup):
+        func()
+    samples = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        func()
+        samples.append(time.perf_counter() - start)
+    return summarize(samples)
+
+class BenchServer:
+    """A private tmux server populated with synthetic agent windows
+
+    Each pane prints `lines` numbered lines, optionally keeps printing one
+    every stream_interval seconds in the background, and then runs a shell
+    with a plain "$ " prompt, so sends are typed into something that
+    echoes input and shows a prompt like an agent CLI does.
+    """
+
+    def __init__(self, socket_name: str = "bench", sessions: int = 10, windows: int = 5, lines: int = 200,
+                 stream_interval: float = 0.0):
+        self.socket_name = socket_name
+        self.sessions = sessions
+        self.windows = windows
+        self.lines = lines
+        self.stream_interval = stream_interval
+
+    @property
+    def server_args(self) -> List[str]:
+        return ["-L", self.socket_name]
+
+    def tmux(self, args: Sequence[str], check: bool = True) -> subprocess.CompletedProcess:
+        # -f /dev/null keeps the user's tmux.conf out of the measurements
+        return subprocess.run(["tmux", "-f", "/dev/null", *self.server_args, *args],
+                              capture_output=True, text=True, check=check)
+
+    def session_names(self) -> List[str]:
+        return [f"bench-{index:03d}" for index in range(self.sessions)]
+
+    def generator(self, session_name: str, window_index: int) -> str:
+        command = f"seq -f 'synthetic output line %g of {session_name}:{window_index}' 1 {self.lines}; "
+        if self.stream_interval > 0:
+            command += f"(while :; do echo \"tick $(date +%s)\"; sleep {self.stream_interval}; done) & "
+        return command + "PS1='$ ' exec sh"
+
+    def start(self, timeout: float = 120.0):
+        if self.tmux(["list-sessions"], check=False).returncode == 0:
+            raise RuntimeError(f"tmux server '{self.socket_name}' is already running; "
+                               f"stop it or pick another --socket")
+        commands = []
+        for session_name in self.session_names():
+            commands.append(["new-session", "-d", "-s", session_name, "-n", "agent-0", "-x", "160", "-y", "48",
+                             self.generator(session_name, 0)])
+            for window_index in range(1, self.windows):
+                commands.append(["new-window", "-d", "-t", f"{session_name}:{window_index}",
+                                 "-n", f"agent-{window_index}", self.generator(session_name, window_index)])
+        # Several commands per tmux invocation, separated by ';', kept under
+        # the client's message size limit ("command too long")
+        for offset in range(0, len(commands), COMMAND_BATCH):
+            batch = []
+            for command in commands[offset:offset + COMMAND_BATCH]:
+                batch.extend(command + [";"])
+            result = self.tmux(batch[:-1], check=False)
+            if result.returncode != 0:
+                raise RuntimeError(f"Creating bench windows failed: {result.stderr.strip()}")
+        self.wait_ready(timeout)
+
+    def wait_ready(self, timeout: float):
+        """Wait until every pane has printed its output and shows a prompt"""
+        deadline = time.monotonic() + timeout
+        expected = self.sessions * self.windows
+        while True:
+            output = self.tmux(["list-panes", "-a", "-F", "#{cursor_y}"], check=False).stdout.split()
+            if len(output) == expected and all(int(y) > 0 for y in output):
+                last = f"{self.session_names()[-1]}:{self.windows - 1}"
+                if self.tmux(["capture-pane", "-p", "-t", last]).stdout.rstrip().endswith("$"):
+                    return
+            if time.monotonic() > deadline:
+                raise RuntimeError(f"Bench server not ready after {timeout}s")
+            time.sleep(0.1)
+
+    def stop(self):
+        self.tmux(["kill-server"], check=False)
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
+
+def write_bench_config(path: str):
+    """ai_config.yml for the bench server: readiness on (shell prompt), logging off"""
+    import yaml
+    config = {
+        "default_provider": "claude",
+        "providers": {"claude": {"type": "interactive", "options": {},
+                                 "readiness": {"prompt_patterns": [r"[$#%>]\s*$"]}}},
+        "sessions": {},
+        "settings": {"readiness": {"enabled": True, "timeout": 10, "echo_timeout": 5,
+                                   "poll_initial": 0.005, "poll_max": 0.1, "timeout_action": "send"},
+                     "log_commands": False},
+    }
+    with open(path, "w") as f:
+        yaml.dump(config, f)
+
+def run_scale(server: BenchServer, iterations: int, operations: Sequence[str]) -> Dict[str, Dict]:
+    """Time each operation against a started server"""
+    results = {}
+    orchestrator = TmuxOrchestrator(server_args=server.server_args)
+    uncached = TmuxOrchestrator(server_args=server.server_args)
+    uncached.capture_cache = None
+    targets = [(session_name, window_index) for session_name in server.session_names()
+               for window_index in range(server.windows)]
+
+    if "get_tmux_sessions" in operations:
+        results["get_tmux_sessions"] = measure(orchestrator.get_tmux_sessions, iterations)
+    if "get_all_windows_status" in operations:
+        results["get_all_windows_status"] = measure(orchestrator.get_all_windows_status, iterations)
+    if "get_all_windows_status_uncached" in operations:
+        results["get_all_windows_status_uncached"] = measure(uncached.get_all_windows_status, iterations)
+    if "create_monitoring_snapshot" in operations:
+        results["create_monitoring_snapshot"] = measure(orchestrator.create_monitoring_snapshot, iterations)
+    if "find_window_by_name" in operations:
+        name = f"agent-{server.windows - 1}"
+        results["find_window_by_name"] = measure(lambda: orchestrator.find_window_by_name(name), iterations)
+
+    if "send_message" in operations or "send_message_dispatch" in operations:
+        with tempfile.TemporaryDirectory() as tmpdir:
+            config_file = os.path.join(tmpdir, "ai_config.yml")
+            write_bench_config(config_file)
+            sender = AIOrchestrator(config_file, server_args=server.server_args)
+            if "send_message" in operations:
+                sends = iter(range(10 ** 9))
+
+                def send_one():
+                    count = next(sends)
+                    session_name, window_index = targets[count % len(targets)]
+                    if not sender.send_message(session_name, window_index, f"echo bench {count}", AIProvider.CLAUDE):
+                        raise RuntimeError(f"Send to {session_name}:{window_index} failed")
+
+                results["send_message"] = _quietly(lambda: measure(send_one, iterations))
+            if "send_message_dispatch" in operations:
+                results["send_message_dispatch"] = _quietly(lambda: measure_dispatch(sender, targets))
+    return results
+
+def measure_dispatch(orchestrator: AIOrchestrator, targets: List[Tuple[str, int]]) -> Dict[str, float]:
+    """One message to every window through MessageDispatcher: per-send latency and overall throughput"""
+    with MessageDispatcher(orchestrator) as dispatcher:
+        start = time.perf_counter()
+        futures = dispatcher.broadcast(targets, "echo bench broadcast", AIProvider.CLAUDE)
+        results = [future.result() for future in futures]
+        elapsed = time.perf_counter() - start
+    summary = summarize([result.send_seconds for result in results])
+    summary["failures"] = sum(not result.success for result in results)
+    summary["wall_seconds"] = elapsed
+    summary["ops_per_sec"] = len(results) / elapsed if elapsed else 0.0
+    return summary
+
+def _quietly(func: Callable[[], Dict]) -> Dict:
+    """Run func with the orchestrator's per-send prints silenced"""
+    stdout = sys.stdout
+    with open(os.devnull, "w") as devnull:
+        sys.stdout = devnull
+        try:
+            return func()
+        finally:
+            sys.stdout = stdout
+
+def tmux_version() -> str:
+    try:
+        return subprocess.run(["tmux", "-V"], capture_output=True, text=True).stdout.strip()
+    except OSError:
+        return "unknown"
+
+def compare(results: Dict, baseline: Dict, tolerance: float) -> List[str]:
+    """Regressions of results against baseline: p50 slower by more than tolerance"""
+    regressions = []
+    for scale, scale_results in results.get("results", {}).items():
+        base_scale = baseline.get("results", {}).get(scale, {})
+        for operation, summary in scale_results.get("operations", {}).items():
+            base = base_scale.get("operations", {}).get(operation)
+            if base is None:
+                continue
+            current_p50, base_p50 = summary["p50"], base["p50"]
+            if current_p50 > base_p50 * (1 + tolerance) and current_p50 - base_p50 > MIN_REGRESSION_SECONDS:
+                regressions.append(f"{scale} {operation}: p50 {current_p50 * 1000:.1f}ms vs baseline "
+                                   f"{base_p50 * 1000:.1f}ms (+{(current_p50 / base_p50 - 1) * 100:.0f}%)")
+    return regressions
+
+def format_table(results: Dict) -> str:
+    lines = [f"{'scale':<10} {'operation':<32} {'p50 ms':>9} {'p90 ms':>9} {'p99 ms':>9} {'ops/s':>9}"]
+    for scale, scale_results in results["results"].items():
+        for operation, summary in scale_results["operations"].items():
+            lines.append(f"{scale:<10} {operation:<32} {summary['p50'] * 1000:>9.2f} {summary['p90'] * 1000:>9.2f} "
+                         f"{summary['p99'] * 1000:>9.2f} {summary['ops_per_sec']:>9.1f}")
+    return "\n".join(lines)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the orchestrator against a private tmux server")
+    parser.add_argument("--scale", action="append", help="SESSIONSxWINDOWS, repeatable (default: 10x5 and 100x10)")
+    parser.add_argument("--iterations", type=int, default=10, help="timed runs per operation (default: 10)")
+    parser.add_argument("--lines", type=int, default=200, help="synthetic output lines per pane (default: 200)")
+    parser.add_argument("--stream-interval", type=float, default=0.0,
+                        help="keep printing a line every N seconds in every pane (default: off)")
+    parser.add_argument("--socket", default="bench", help="tmux -L socket name (default: bench)")
+    parser.add_argument("--operation", action="append", choices=OPERATIONS, help="only run these operations")
+    parser.add_argument("--output", help="write the JSON results here instead of stdout")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="baseline JSON to compare against")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE,
+                        help="allowed p50 slowdown as a fraction (default: 0.25)")
+    parser.add_argument("--save-baseline", action="store_true", help="write the results to --baseline")
+    args = parser.parse_args(argv)
+
+    operations = args.operation or OPERATIONS
+    results = {
+        "meta": {
+            "timestamp": datetime.now().isoformat(),
+            "tmux": tmux_version(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "iterations": args.iterations,
+            "lines": args.lines,
+            "stream_interval": args.stream_interval,
+        },
+        "results": {},
+    }
+    for scale in args.scale or DEFAULT_SCALES:
+        sessions, windows = parse_scale(scale)
+        server = BenchServer(args.socket, sessions, windows, args.lines, args.stream_interval)
+        print(f"Starting {sessions} sessions x {windows} windows on tmux -L {args.socket}...", file=sys.stderr)
+        setup_start = time.perf_counter()
+        with server:
+            setup_seconds = time.perf_counter() - setup_start
+            operations_results = run_scale(server, args.iterations, operations)
+        results["results"][scale] = {"sessions": sessions, "windows_per_session": windows,
+                                     "setup_seconds": setup_seconds, "operations": operations_results}
+
+    output = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+    print(format_table(results), file=sys.stderr)
+
+    if args.save_baseline:
+        with open(args.baseline, "w") as f:
+            f.write(output + "\n")
+        print(f"Baseline written to {args.baseline}", file=sys.stderr)
+        return
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}", file=sys.stderr)
+        if regressions:
+            sys.exit(1)
+        print(f"No regressions against {args.baseline}", file=sys.stderr)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional, Tuple
+
+class CaptureCache:
+    """Bounded LRU cache of captured pane content
+
+    Each entry carries a validator (for panes: the window's activity time and
+    the pane's scroll position). A lookup only hits when the caller's current
+    validator matches the one stored with the content.
+    """
+
+    def __init__(self, max_entries: int = 512):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries: "OrderedDict[Hashable, Tuple[Any, str]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: Hashable, validator: Any) -> Optional[str]:
+        """Cached content for key if it was stored with the same validator"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] != validator:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key: Hashable, validator: Any, content: str):
+        """Store content, evicting the least recently used entries over max_entries"""
+        with self._lock:
+            self._entries[key] = (validator, content)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, key: Optional[Hashable] = None):
+        """Drop one entry, or everything when no key is given"""
+        with self._lock:
+            if key is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(key, None)
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+
+import sys
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Deque, Dict, List, Optional, Sequence, Tuple
+
+from ai_provider import AIOrchestrator, AIProvider
+
+@dataclass
+class DispatchResult:
+    """Outcome and timing of one dispatched message"""
+    target: str
+    message: str
+    success: bool
+    queued_at: float
+    started_at: float
+    finished_at: float
+    error: Optional[str] = None
+
+    @property
+    def wait_seconds(self) -> float:
+        """Time spent queued behind earlier messages to the same target"""
+        return self.started_at - self.queued_at
+
+    @property
+    def send_seconds(self) -> float:
+        """Time spent sending, including the settle delay"""
+        return self.finished_at - self.started_at
+
+class _Pending:
+    __slots__ = ("session_name", "window_index", "message", "provider", "future", "queued_at")
+
+    def __init__(self, session_name: str, window_index: Optional[int], message: str,
+                 provider: Optional[AIProvider], future: Future):
+        self.session_name = session_name
+        self.window_index = window_index
+        self.message = message
+        self.provider = provider
+        self.future = future
+        self.queued_at = time.monotonic()
+
+class MessageDispatcher:
+    """Sends messages through AIOrchestrator with one FIFO queue per window
+
+    Messages to the same session:window go out strictly in submission order;
+    queues for different windows drain concurrently on a thread pool, so
+    their settle delays overlap:
+
+        with MessageDispatcher(AIOrchestrator()) as dispatcher:
+            futures = dispatcher.broadcast([("proj", 0), ("proj", 1)], "status?")
+            for future in futures:
+                print(future.result().success)
+
+    Each future resolves to a DispatchResult.
+    """
+
+    def __init__(self, orchestrator: Optional[AIOrchestrator] = None, max_workers: int = 32):
+        self.orchestrator = orchestrator or AIOrchestrator()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="dispatch")
+        self._lock = threading.Lock()
+        # Pending messages per target; a target is present while a worker drains it
+        self._queues: Dict[str, Deque[_Pending]] = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.shutdown()
+
+    def submit(self, session_name: str, window_index: Optional[int], message: str,
+               provider: Optional[AIProvider] = None) -> Future:
+        """Queue a message for a window and return a future for its DispatchResult
+
+        With window_index None, session_name is any target send_message
+        resolves (%pane_id, name, role=<role>, ...) and is queued under that
+        target as given.
+        """
+        target = session_name if window_index is None else f"{session_name}:{window_index}"
+        pending = _Pending(session_name, window_index, message, provider, Future())
+        with self._lock:
+            queue = self._queues.get(target)
+            if queue is not None:
+                queue.append(pending)
+                return pending.future
+            self._queues[target] = deque([pending])
+        self._executor.submit(self._drain, target)
+        return pending.future
+
+    def broadcast(self, targets: Sequence[Tuple[str, int]], message: str,
+                  provider: Optional[AIProvider] = None) -> List[Future]:
+        """Queue the same message for several windows"""
+        return [self.submit(session_name, window_index, message, provider)
+                for session_name, window_index in targets]
+
+    def pending(self) -> Dict[str, int]:
+        """Number of messages queued or in flight per target"""
+        with self._lock:
+            return {target: len(queue) for target, queue in self._queues.items()}
+
+    def shutdown(self, wait: bool = True):
+        """Stop accepting work; with wait, block until every queue has drained"""
+        self._executor.shutdown(wait=wait)
+
+    def _drain(self, target: str):
+        while True:
+            with self._lock:
+                queue = self._queues[target]
+                if not queue:
+                    del self._queues[target]
+                    return
+                pending = queue[0]
+            self._send(target, pending)
+            with self._lock:
+                queue.popleft()
+
+    def _send(self, target: str, pending: _Pending):
+        if not pending.future.set_running_or_notify_cancel():
+            return
+        started_at = time.monotonic()
+        error = None
+        try:
+            success = self.orchestrator.send_message(pending.session_name, pending.window_index,
+                                                     pending.message, pending.provider)
+        except Exception as e:
+            success, error = False, str(e)
+        pending.future.set_result(DispatchResult(
+            target=target,
+            message=pending.message,
+            success=bool(success),
+            queued_at=pending.queued_at,
+            started_at=started_at,
+            finished_at=time.monotonic(),
+            error=error,
+        ))
+
+def main(argv=None):
+    if argv is None:
+        argv = sys.argv
+
+    if len(argv) < 3:
+        print("Usage: python3 dispatch.py <message> <session:window> [session:window ...]")
+        print("Example: python3 dispatch.py 'Status update please' proj:0 proj:1 proj:2")
+        sys.exit(1)
+
+    message = argv[1]
+    targets = []
+    for session_window in argv[2:]:
+        try:
+            session_name, window_index = session_window.rsplit(':', 1)
+            targets.append((session_name, int(window_index)))
+        except ValueError:
+            print(f"Error: session:window format required (got '{session_window}')")
+            sys.exit(1)
+
+    with MessageDispatcher() as dispatcher:
+        results = [future.result() for future in dispatcher.broadcast(targets, message)]
+    for result in results:
+        status = "ok" if result.success else f"failed{': ' + result.error if result.error else ''}"
+        print(f"{result.target}: {status} ({result.send_seconds:.2f}s)")
+    sys.exit(0 if all(result.success for result in results) else 1)
+
+if __name__ == "__main__":
+    main()
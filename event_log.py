@@ -0,0 +1,295 @@
+#!/usr/bin/env python3
+
+import atexit
+import glob
+import json
+import os
+import sys
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional
+
+# Rotate the log once it grows past this many bytes...
+DEFAULT_MAX_BYTES = 10 * 1024 * 1024
+# ...or its first event is older than this many seconds
+DEFAULT_MAX_AGE = 24 * 3600
+# Rotated files kept as <log>.1 (newest) .. <log>.N
+DEFAULT_BACKUPS = 5
+# Seconds between background flushes
+FLUSH_INTERVAL = 0.5
+# Events held in memory before new ones are dropped (counted in EventLog.dropped)
+MAX_PENDING = 10000
+
+class EventLog:
+    """Append-only JSONL event log written by a background thread
+
+    record() only appends a dict to an in-memory queue, so callers on the
+    send path never wait for the disk; the writer thread serialises and
+    writes the queue in batches every flush_interval seconds. The file is
+    rotated when it exceeds max_bytes or its first event is older than
+    max_age seconds. Each line is one event:
+
+        {"ts": 1718000000.123, "event": "send", "target": "proj:0", "provider": "claude",
+         "bytes": 42, "duration": 0.0361, "ok": true}
+    """
+
+    def __init__(self, path: str, max_bytes: int = DEFAULT_MAX_BYTES, max_age: float = DEFAULT_MAX_AGE,
+                 backups: int = DEFAULT_BACKUPS, flush_interval: float = FLUSH_INTERVAL,
+                 max_pending: int = MAX_PENDING):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.backups = backups
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self.dropped = 0
+        self._pending: deque = deque()
+        self._wake = threading.Event()
+        self._closed = False
+        self._file = None
+        self._size = 0
+        self._started: Optional[float] = None
+        self._thread = threading.Thread(target=self._run, name="event-log", daemon=True)
+        self._thread.start()
+
+    def record(self, event: str, **fields):
+        """Queue an event; never blocks on I/O"""
+        if self._closed or len(self._pending) >= self.max_pending:
+            self.dropped += 1
+            return
+        fields["ts"] = time.time()
+        fields["event"] = event
+        self._pending.append(fields)
+
+    def flush(self, timeout: float = 5.0) -> bool:
+        """Wait until everything recorded so far is on disk"""
+        if self._closed:
+            return True
+        written = threading.Event()
+        self._pending.append(written)
+        self._wake.set()
+        return written.wait(timeout)
+
+    def close(self):
+        if self._closed:
+            return
+        self._closed = True
+        self._wake.set()
+        self._thread.join(timeout=5.0)
+
+    def _run(self):
+        while True:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            closing = self._closed
+            self._write_pending()
+            if closing:
+                break
+        if self._file is not None:
+            self._file.close()
+
+    def _write_pending(self):
+        lines, markers = [], []
+        first_ts = None
+        while self._pending:
+            entry = self._pending.popleft()
+            if isinstance(entry, threading.Event):
+                markers.append(entry)
+                continue
+            if first_ts is None:
+                first_ts = entry["ts"]
+            lines.append(json.dumps(entry, separators=(",", ":"), default=str))
+        try:
+            if lines:
+                self._write(("\n".join(lines) + "\n").encode("utf-8"), first_ts)
+        except OSError as e:
+            print(f"Error writing event log {self.path}: {e}", file=sys.stderr)
+            self._file = None
+        for marker in markers:
+            marker.set()
+
+    def _write(self, data: bytes, first_ts: float):
+        # Another process may have rotated the file from under this one
+        if self._file is not None and not _is_same_file(self._file, self.path):
+            self._file.close()
+            self._file = None
+        self._open(first_ts)
+        if self._should_rotate(first_ts):
+            self._rotate()
+            self._open(first_ts)
+        self._file.write(data)
+        self._file.flush()
+        self._size += len(data)
+
+    def _open(self, first_ts: float):
+        if self._file is not None:
+            return
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        self._file = open(self.path, "ab")
+        self._size = self._file.tell()
+        self._started = _first_timestamp(self.path) if self._size else first_ts
+
+    def _should_rotate(self, now: float) -> bool:
+        if self._size == 0:
+            return False
+        if self.max_bytes and self._size >= self.max_bytes:
+            return True
+        return bool(self.max_age) and self._started is not None and now - self._started >= self.max_age
+
+    def _rotate(self):
+        self._file.close()
+        self._file = None
+        for index in range(self.backups - 1, 0, -1):
+            source = f"{self.path}.{index}"
+            if os.path.exists(source):
+                os.replace(source, f"{self.path}.{index + 1}")
+        if self.backups > 0:
+            os.replace(self.path, f"{self.path}.1")
+        else:
+            os.remove(self.path)
+
+def _is_same_file(f, path: str) -> bool:
+    try:
+        return os.path.samestat(os.fstat(f.fileno()), os.stat(path))
+    except OSError:
+        return False
+
+def _first_timestamp(path: str) -> Optional[float]:
+    try:
+        with open(path, "rb") as f:
+            return json.loads(f.readline()).get("ts")
+    except (OSError, ValueError, AttributeError):
+        return None
+
+# The process-wide log that run_tmux and the orchestrators record to; None disables logging
+_active: Optional[EventLog] = None
+_active_lock = threading.Lock()
+
+def configure(path: str, **options) -> EventLog:
+    """Make the log at path the active one, reusing it if it already is"""
+    global _active
+    with _active_lock:
+        if _active is not None and _active.path == os.path.abspath(path):
+            return _active
+        if _active is not None:
+            _active.close()
+        _active = EventLog(os.path.abspath(path), **options)
+        return _active
+
+def configure_from_settings(settings: Dict, config_file: str) -> Optional[EventLog]:
+    """Turn on the log named by settings.log_file when settings.log_commands is set
+
+    A relative log_file is taken from the directory of config_file.
+    """
+    path = settings.get("log_file")
+    if not settings.get("log_commands") or not path:
+        return None
+    if not os.path.isabs(path):
+        path = os.path.join(os.path.dirname(os.path.abspath(config_file)), path)
+    return configure(path,
+                     max_bytes=settings.get("log_max_bytes", DEFAULT_MAX_BYTES),
+                     max_age=settings.get("log_max_age", DEFAULT_MAX_AGE),
+                     backups=settings.get("log_backups", DEFAULT_BACKUPS))
+
+def current() -> Optional[EventLog]:
+    return _active
+
+def close():
+    """Flush and close the active log"""
+    global _active
+    with _active_lock:
+        if _active is not None:
+            _active.close()
+            _active = None
+
+atexit.register(close)
+
+def log_files(path: str) -> List[str]:
+    """The log and its rotated files, oldest first"""
+    rotated = [name for name in glob.glob(glob.escape(path) + ".*") if name.rsplit(".", 1)[1].isdigit()]
+    rotated.sort(key=lambda name: int(name.rsplit(".", 1)[1]), reverse=True)
+    return rotated + ([path] if os.path.exists(path) else [])
+
+def read_events(path: str, target: Optional[str] = None, since: Optional[float] = None,
+                until: Optional[float] = None, event: Optional[str] = None) -> Iterator[Dict]:
+    """Events from the log and its rotated files matching every given filter
+
+    target matches the whole target or its session ("proj" matches "proj:0").
+    Files last written before since are skipped without being read.
+    """
+    for name in log_files(path):
+        if since is not None and os.path.getmtime(name) < since:
+            continue
+        with open(name, "rb") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue
+                ts = entry.get("ts", 0)
+                if since is not None and ts < since:
+                    continue
+                if until is not None and ts > until:
+                    continue
+                if event is not None and entry.get("event") != event:
+                    continue
+                if target is not None:
+                    entry_target = str(entry.get("target") or "")
+                    if entry_target != target and not entry_target.startswith(target + ":"):
+                        continue
+                yield entry
+
+_UNITS = {"s": 1, "m": 60, "h": 3600, "d": 86400}
+
+def parse_time(value: str, now: Optional[float] = None) -> float:
+    """'30m', '2h', '45s', '1d' ago, or an ISO date/time, as a timestamp"""
+    now = time.time() if now is None else now
+    if value and value[-1] in _UNITS:
+        try:
+            return now - float(value[:-1]) * _UNITS[value[-1]]
+        except ValueError:
+            pass
+    return datetime.fromisoformat(value).timestamp()
+
+def _format_event(entry: Dict) -> str:
+    when = datetime.fromtimestamp(entry.get("ts", 0)).strftime("%Y-%m-%d %H:%M:%S.%f")[:-3]
+    outcome = "ok" if entry.get("ok", True) else f"FAILED {entry.get('error', '')}".rstrip()
+    details = " ".join(f"{key}={entry[key]}" for key in ("command", "provider", "bytes") if key in entry)
+    duration = f"{entry['duration'] * 1000:.1f}ms" if "duration" in entry else ""
+    return f"{when}  {entry.get('event', ''):<5} {entry.get('target') or '-':<20} {details} {duration} {outcome}"
+
+def main(argv=None):
+    if argv is None:
+        argv = sys.argv
+
+    usage = ("Usage: python3 event_log.py <log_file> [--target session[:window]] [--since 30m|ISO] "
+             "[--until 5m|ISO] [--event send|tmux] [--json]")
+    if len(argv) < 2 or argv[1].startswith("-"):
+        print(usage)
+        sys.exit(1)
+
+    filters = {}
+    as_json = False
+    args = argv[2:]
+    try:
+        while args:
+            option = args.pop(0)
+            if option == "--json":
+                as_json = True
+            elif option in ("--target", "--event"):
+                filters[option[2:]] = args.pop(0)
+            elif option in ("--since", "--until"):
+                filters[option[2:]] = parse_time(args.pop(0))
+            else:
+                raise ValueError(option)
+    except (IndexError, ValueError):
+        print(usage)
+        sys.exit(1)
+
+    for entry in read_events(argv[1], **filters):
+        print(json.dumps(entry) if as_json else _format_event(entry))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,320 @@
+#!/usr/bin/env python3
+
+import atexit
+import bisect
+import functools
+import os
+import sys
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+# Upper bounds in seconds: tmux round trips are around a millisecond, sends
+# with readiness polling tens of milliseconds, and captures of a busy server
+# can take seconds
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+# Seconds between textfile exports
+EXPORT_INTERVAL = 15.0
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _format_labels(names: Sequence[str], values: Tuple, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _labels(self, labels: Tuple) -> Dict[str, str]:
+        return dict(zip(self.labelnames, (str(value) for value in labels)))
+
+class Counter(_Metric):
+    """Monotonic count per label set, exported as <name>_total"""
+
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, help, labelnames)
+        self._values: Dict[Tuple, float] = {}
+
+    def inc(self, *labels, amount: float = 1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def value(self, *labels) -> float:
+        return self._values.get(labels, 0)
+
+    def samples(self) -> List[Dict]:
+        with self._lock:
+            return [{"labels": self._labels(labels), "value": value} for labels, value in self._values.items()]
+
+    def render(self) -> List[str]:
+        with self._lock:
+            return [f"{self.name}_total{_format_labels(self.labelnames, labels)} {_format_value(value)}"
+                    for labels, value in self._values.items()]
+
+class Gauge(_Metric):
+    """Last set value per label set"""
+
+    kind = "gauge"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, help, labelnames)
+        self._values: Dict[Tuple, float] = {}
+
+    def set(self, value: float, *labels):
+        self._values[labels] = value
+
+    def value(self, *labels) -> Optional[float]:
+        return self._values.get(labels)
+
+    def samples(self) -> List[Dict]:
+        with self._lock:
+            return [{"labels": self._labels(labels), "value": value} for labels, value in self._values.items()]
+
+    def render(self) -> List[str]:
+        with self._lock:
+            return [f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}"
+                    for labels, value in list(self._values.items())]
+
+class Histogram(_Metric):
+    """Observations per label set in fixed buckets
+
+    observe() is a bisect and three additions under a lock; cumulative
+    bucket counts are only worked out when exporting.
+    """
+
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # labels -> [per-bucket counts (last one is +Inf), sum, count]
+        self._values: Dict[Tuple, list] = {}
+
+    def observe(self, value: float, *labels):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(labels)
+            if state is None:
+                state = self._values[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            state[0][index] += 1
+            state[1] += value
+            state[2] += 1
+
+    def count(self, *labels) -> int:
+        state = self._values.get(labels)
+        return state[2] if state else 0
+
+    def _cumulative(self, counts: List[int]) -> List[Tuple[float, int]]:
+        total, result = 0, []
+        for bound, count in zip(self.buckets + (float("inf"),), counts):
+            total += count
+            result.append((bound, total))
+        return result
+
+    def samples(self) -> List[Dict]:
+        with self._lock:
+            values = [(labels, list(state[0]), state[1], state[2]) for labels, state in self._values.items()]
+        return [{"labels": self._labels(labels), "count": count, "sum": total,
+                 "buckets": {_format_value(bound): cumulative for bound, cumulative in self._cumulative(counts)}}
+                for labels, counts, total, count in values]
+
+    def render(self) -> List[str]:
+        with self._lock:
+            values = [(labels, list(state[0]), state[1], state[2]) for labels, state in self._values.items()]
+        lines = []
+        for labels, counts, total, count in values:
+            for bound, cumulative in self._cumulative(counts):
+                le = f'le="{_format_value(bound)}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, labels, le)} {cumulative}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, labels)} {count}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, labels)} {_format_value(total)}")
+        return lines
+
+class MetricsRegistry:
+    """Named metrics of one process, with snapshot and OpenMetrics export"""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def _register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                if type(existing) is not type(metric) or existing.labelnames != metric.labelnames:
+                    raise ValueError(f"Metric '{metric.name}' already registered differently")
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+    def counter(self, name: str, help: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(name, help, labelnames))
+
+    def gauge(self, name: str, help: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self._register(Gauge(name, help, labelnames))
+
+    def histogram(self, name: str, help: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, help, labelnames, buckets))
+
+    def snapshot(self) -> Dict[str, Dict]:
+        """Current values of every metric as plain, JSON-serialisable data"""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return {metric.name: {"type": metric.kind, "help": metric.help, "samples": metric.samples()}
+                for metric in metrics}
+
+    def render(self) -> str:
+        """OpenMetrics text exposition, terminated by # EOF"""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.append(f"# HELP {metric.name} {_escape(metric.help)}")
+            lines.extend(metric.render())
+        lines.append("# EOF")
+        return "\n".join(lines) + "\n"
+
+    def write_textfile(self, path: str):
+        """Write the exposition atomically, as node_exporter's textfile collector requires"""
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w") as f:
+            f.write(self.render())
+        os.replace(tmp_path, path)
+
+# Metrics recorded by the orchestrator modules
+REGISTRY = MetricsRegistry()
+OPERATION_SECONDS = REGISTRY.histogram(
+    "orchestrator_operation_seconds", "Duration of TmuxOrchestrator operations", ("operation",))
+OPERATION_FAILURES = REGISTRY.counter(
+    "orchestrator_operation_failures", "TmuxOrchestrator operations that failed", ("operation",))
+CAPTURE_TIMEOUTS = REGISTRY.counter(
+    "orchestrator_capture_timeouts", "Window captures abandoned by get_all_windows_status")
+SEND_SECONDS = REGISTRY.histogram(
+    "orchestrator_send_seconds", "Duration of AIOrchestrator.send_message", ("provider",))
+SEND_FAILURES = REGISTRY.counter(
+    "orchestrator_send_failures", "Messages that could not be sent", ("provider",))
+SESSIONS = REGISTRY.gauge("orchestrator_sessions", "tmux sessions seen by the last get_tmux_sessions")
+WINDOWS = REGISTRY.gauge("orchestrator_windows", "tmux windows seen by the last get_tmux_sessions")
+
+def timed(operation: str) -> Callable:
+    """Decorator recording a call's duration in OPERATION_SECONDS and exceptions in OPERATION_FAILURES"""
+    def decorate(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            except Exception:
+                OPERATION_FAILURES.inc(operation)
+                raise
+            finally:
+                OPERATION_SECONDS.observe(time.perf_counter() - start, operation)
+        return wrapper
+    return decorate
+
+def timed_async(operation: str) -> Callable:
+    """timed() for coroutine functions"""
+    def decorate(func):
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return await func(*args, **kwargs)
+            except Exception:
+                OPERATION_FAILURES.inc(operation)
+                raise
+            finally:
+                OPERATION_SECONDS.observe(time.perf_counter() - start, operation)
+        return wrapper
+    return decorate
+
+class TextfileExporter:
+    """Rewrites a registry's textfile every interval seconds on a daemon thread, and once more on stop"""
+
+    def __init__(self, path: str, registry: MetricsRegistry = REGISTRY, interval: float = EXPORT_INTERVAL):
+        self.path = path
+        self.registry = registry
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="metrics-exporter", daemon=True)
+        self._thread.start()
+
+    def _export(self):
+        try:
+            self.registry.write_textfile(self.path)
+        except OSError as e:
+            print(f"Error writing metrics to {self.path}: {e}", file=sys.stderr)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self._export()
+
+    def stop(self):
+        if not self._stop.is_set():
+            self._stop.set()
+            self._thread.join(timeout=5.0)
+            self._export()
+
+# The process's exporter, so reloading a config doesn't start a second one
+_exporter: Optional[TextfileExporter] = None
+_exporter_lock = threading.Lock()
+
+def start_exporter(path: str, interval: float = EXPORT_INTERVAL) -> TextfileExporter:
+    """Export REGISTRY to path, reusing the running exporter if it already writes there"""
+    global _exporter
+    path = os.path.abspath(path)
+    with _exporter_lock:
+        if _exporter is not None and _exporter.path == path:
+            _exporter.interval = interval
+            return _exporter
+        if _exporter is not None:
+            _exporter.stop()
+        _exporter = TextfileExporter(path, interval=interval)
+        return _exporter
+
+def stop_exporter():
+    """Write the textfile a last time and stop exporting"""
+    global _exporter
+    with _exporter_lock:
+        if _exporter is not None:
+            _exporter.stop()
+            _exporter = None
+
+atexit.register(stop_exporter)
+
+def main(argv=None):
+    if argv is None:
+        argv = sys.argv
+
+    # Collect one status report and print the resulting metrics. Run as a
+    # script this file is __main__, so read the registry tmux_utils records to
+    import metrics
+    from tmux_utils import TmuxOrchestrator
+    TmuxOrchestrator().get_all_windows_status()
+    if len(argv) > 1:
+        metrics.REGISTRY.write_textfile(argv[1])
+        print(f"Metrics written to {argv[1]}")
+    else:
+        print(metrics.REGISTRY.render(), end="")
+
+if __name__ == "__main__":
+    main()
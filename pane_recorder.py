@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+
+import mmap
+import os
+import re
+import shlex
+from array import array
+from typing import Callable, Dict, List, Optional
+
+from tmux_control import run_tmux
+
+# Every INDEX_STRIDE-th line start is kept in the offset index
+INDEX_STRIDE = 256
+
+DEFAULT_LOG_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "pane_logs")
+
+# CSI, OSC and two-character escape sequences in raw terminal output
+_ESCAPE_RE = re.compile(rb"\x1b\[[0-?]*[ -/]*[@-~]|\x1b\][^\x07\x1b]*(?:\x07|\x1b\\)|\x1b[@-Z\\-_]")
+
+def render_text(data) -> str:
+    """Turn raw pane output into plain text lines
+
+    Escape sequences are dropped and, as on a terminal, a carriage return
+    lets the text after it overwrite the start of the line.
+    """
+    lines = []
+    for line in _ESCAPE_RE.sub(b"", bytes(data)).split(b"\n"):
+        line = line.rstrip(b"\r")
+        if b"\r" in line:
+            parts = line.split(b"\r")
+            line = parts[0]
+            for part in parts[1:]:
+                line = part + line[len(part):]
+        lines.append(line.decode("utf-8", errors="replace"))
+    return "\n".join(lines)
+
+class PaneLog:
+    """Read-only mmap view of one append-only pane log
+
+    The index file next to the log holds how far the log has been scanned,
+    how many lines it had, and the byte offset of every INDEX_STRIDE-th line,
+    so slicing by line number only scans a bounded stretch of the log.
+    Returned memoryviews point into the mapping; nothing is copied.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.index_path = path + ".idx"
+        self._mmap: Optional[mmap.mmap] = None
+        self._size = 0
+        self._scanned = 0
+        self._lines = 0
+        self._checkpoints = array("Q", [0])
+        self._load_index()
+
+    def _load_index(self):
+        try:
+            with open(self.index_path, "rb") as f:
+                data = array("Q")
+                data.frombytes(f.read())
+        except (OSError, ValueError):
+            return
+        if len(data) >= 3:
+            self._scanned, self._lines = data[0], data[1]
+            self._checkpoints = data[2:]
+
+    def _save_index(self):
+        data = array("Q", [self._scanned, self._lines]) + self._checkpoints
+        tmp_path = self.index_path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            data.tofile(f)
+        os.replace(tmp_path, self.index_path)
+
+    def refresh(self) -> int:
+        """Map any bytes appended since the last call and index them; returns the log size"""
+        try:
+            size = os.path.getsize(self.path)
+        except OSError:
+            size = 0
+        if size < self._scanned:
+            # The log was truncated or replaced, so the index is stale
+            self._scanned, self._lines = 0, 0
+            self._checkpoints = array("Q", [0])
+        if size != self._size:
+            self._size = size
+            self._mmap = None
+            if size:
+                with open(self.path, "rb") as f:
+                    self._mmap = mmap.mmap(f.fileno(), size, access=mmap.ACCESS_READ)
+        if self._mmap is not None and self._scanned < size:
+            self._index_from(self._scanned)
+            self._save_index()
+        return size
+
+    def _index_from(self, pos: int):
+        mm = self._mmap
+        while True:
+            newline = mm.find(b"\n", pos, self._size)
+            if newline < 0:
+                break
+            pos = newline + 1
+            self._lines += 1
+            if self._lines % INDEX_STRIDE == 0:
+                self._checkpoints.append(pos)
+        # Only complete lines count as scanned; a partial tail is rescanned
+        self._scanned = pos
+
+    def line_count(self) -> int:
+        """Number of complete lines in the log"""
+        self.refresh()
+        return self._lines
+
+    def _line_offset(self, line: int) -> int:
+        """Byte offset where complete line `line` starts (0-based)"""
+        if line >= self._lines:
+            return self._scanned
+        pos = self._checkpoints[line // INDEX_STRIDE]
+        for _ in range(line % INDEX_STRIDE):
+            pos = self._mmap.find(b"\n", pos, self._size) + 1
+        return pos
+
+    def slice(self, start: int, stop: Optional[int] = None) -> memoryview:
+        """Raw bytes of complete lines [start, stop), like a list slice"""
+        self.refresh()
+        if self._mmap is None:
+            return memoryview(b"")
+        start, stop, _ = slice(start, stop).indices(self._lines)
+        if stop <= start:
+            return memoryview(b"")
+        return memoryview(self._mmap)[self._line_offset(start):self._line_offset(stop)]
+
+    def tail(self, num_lines: int) -> memoryview:
+        """Raw bytes of the last num_lines lines, including a trailing partial line"""
+        self.refresh()
+        if self._mmap is None or num_lines <= 0:
+            return memoryview(b"")
+        mm = self._mmap
+        end = self._size
+        pos = end - 1 if mm[end - 1:end] == b"\n" else end
+        for _ in range(num_lines):
+            pos = mm.rfind(b"\n", 0, pos)
+            if pos < 0:
+                break
+        return memoryview(mm)[pos + 1:end]
+
+class PaneRecorder:
+    """Streams pane output into append-only logs with `tmux pipe-pane`
+
+    Logs are named after the tmux server pid and pane id, since pane ids are
+    reused when the server restarts.
+    """
+
+    def __init__(self, log_dir: str = DEFAULT_LOG_DIR, run: Optional[Callable[[List[str]], str]] = None):
+        self.log_dir = log_dir
+        self._run = run or run_tmux
+        # Recorded logs by target and by pane id
+        self._targets: Dict[str, str] = {}
+        self._logs: Dict[str, PaneLog] = {}
+
+    def _resolve(self, target: str) -> List[str]:
+        output = self._run(["display-message", "-t", target, "-p", "#{pid} #{pane_id}"])
+        return output.strip().split(" ")
+
+    def log_path(self, server_pid: str, pane_id: str) -> str:
+        return os.path.join(self.log_dir, f"pane-{server_pid}-{pane_id.lstrip('%')}.log")
+
+    def start(self, target: str) -> PaneLog:
+        """Start appending everything target's pane prints to its log"""
+        server_pid, pane_id = self._resolve(target)
+        path = self.log_path(server_pid, pane_id)
+        os.makedirs(self.log_dir, exist_ok=True)
+        # Replaces any pipe already attached to the pane
+        self._run(["pipe-pane", "-t", pane_id, f"exec cat >> {shlex.quote(path)}"])
+        log = self._logs.get(pane_id) or PaneLog(path)
+        self._logs[pane_id] = log
+        self._targets[target] = pane_id
+        return log
+
+    def stop(self, target: str):
+        """Detach the pipe from target's pane; its log is kept"""
+        pane_id = self._targets.pop(target, target)
+        self._run(["pipe-pane", "-t", pane_id])
+        self._logs.pop(pane_id, None)
+
+    def log_for(self, target: str) -> Optional[PaneLog]:
+        """The log being recorded for a target or pane id, if any"""
+        return self._logs.get(self._targets.get(target, target))
+
+    def recorded_targets(self) -> List[str]:
+        return list(self._targets)
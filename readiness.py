@@ -0,0 +1,234 @@
+#!/usr/bin/env python3
+
+import hashlib
+import re
+import subprocess
+import sys
+import time
+from typing import Awaitable, Callable, Dict, Iterator, List, Optional, Pattern
+
+from tmux_control import run_tmux
+
+# Lines above the cursor searched for a prompt or for echoed input
+PROMPT_CONTEXT_LINES = 3
+ECHO_CONTEXT_LINES = 12
+# Characters from the end of the typed text looked for in the echo
+ECHO_TAIL_CHARS = 32
+
+# Plain classes rather than dataclasses, and asyncio imported only by the
+# async polls, keep this module cheap to import on the send path
+
+class ReadinessPatterns:
+    """Regexes that tell whether an agent's pane is waiting for input"""
+
+    __slots__ = ("prompt", "busy")
+
+    def __init__(self, prompt: Optional[List[Pattern]] = None, busy: Optional[List[Pattern]] = None):
+        self.prompt = prompt or []
+        self.busy = busy or []
+
+    @classmethod
+    def from_config(cls, config: Optional[Dict]) -> "ReadinessPatterns":
+        config = config or {}
+        return cls(
+            prompt=[re.compile(p) for p in config.get('prompt_patterns') or []],
+            busy=[re.compile(p) for p in config.get('busy_patterns') or []],
+        )
+
+class PaneState:
+    """The visible screen of a pane and where its cursor is"""
+
+    __slots__ = ("lines", "cursor_y")
+
+    def __init__(self, lines: List[str], cursor_y: int):
+        self.lines = lines
+        self.cursor_y = cursor_y
+
+    @property
+    def digest(self) -> str:
+        return hashlib.sha1("\n".join(self.lines).encode("utf-8")).hexdigest()
+
+    def near_cursor(self, above: int) -> List[str]:
+        """The cursor line and up to `above` lines before it"""
+        return self.lines[max(self.cursor_y - above, 0):self.cursor_y + 1]
+
+class ReadinessDetector:
+    """Polls a pane until the agent in it is ready, instead of sleeping blindly
+
+    A pane is ready when a prompt pattern matches at the cursor, no busy
+    pattern is on screen, and the screen is unchanged since the previous
+    poll. With no prompt patterns, a stable screen without busy patterns is
+    enough. Polls start every poll_initial seconds and back off by
+    poll_backoff up to poll_max.
+    """
+
+    def __init__(self, patterns: Optional[Dict[str, ReadinessPatterns]] = None,
+                 run: Optional[Callable[[List[str]], str]] = None, timeout: float = 30.0,
+                 echo_timeout: float = 5.0, poll_initial: float = 0.02, poll_max: float = 0.5,
+                 poll_backoff: float = 1.5):
+        self.patterns = patterns or {}
+        self._run = run or run_tmux
+        self.timeout = timeout
+        self.echo_timeout = echo_timeout
+        self.poll_initial = poll_initial
+        self.poll_max = poll_max
+        self.poll_backoff = poll_backoff
+
+    @classmethod
+    def from_config(cls, config: Dict, run: Optional[Callable[[List[str]], str]] = None) -> "ReadinessDetector":
+        """Build a detector from ai_config.yml (settings.readiness and providers.*.readiness)"""
+        settings = ((config.get('settings') or {}).get('readiness')) or {}
+        patterns = {name: ReadinessPatterns.from_config(provider.get('readiness'))
+                    for name, provider in (config.get('providers') or {}).items()}
+        return cls(patterns, run=run,
+                   timeout=float(settings.get('timeout', 30.0)),
+                   echo_timeout=float(settings.get('echo_timeout', 5.0)),
+                   poll_initial=float(settings.get('poll_initial', 0.02)),
+                   poll_max=float(settings.get('poll_max', 0.5)))
+
+    def read_state(self, target: str) -> PaneState:
+        """Capture the visible screen and cursor row in one tmux call
+
+        Output without the cursor row at the end raises CalledProcessError,
+        like a failed capture, so send paths report it instead of crashing.
+        """
+        args = self._state_args(target)
+        return self._parse_state(args, target, self._run(args))
+
+    async def read_state_async(self, target: str, run: Callable[[List[str]], Awaitable[str]]) -> PaneState:
+        """read_state through an async tmux runner such as async_tmux.run_tmux_async"""
+        args = self._state_args(target)
+        return self._parse_state(args, target, await run(args))
+
+    @staticmethod
+    def _state_args(target: str) -> List[str]:
+        return ["capture-pane", "-p", "-t", target, ";", "display-message", "-p", "-t", target, "#{cursor_y}"]
+
+    @staticmethod
+    def _parse_state(args: List[str], target: str, output: str) -> PaneState:
+        lines = output.rstrip("\n").split("\n")
+        try:
+            cursor_y = int(lines.pop())
+        except ValueError:
+            raise subprocess.CalledProcessError(1, ["tmux", *args], output=output,
+                                                stderr=f"Unexpected capture output for {target}")
+        return PaneState(lines, cursor_y)
+
+    def is_ready(self, state: PaneState, provider: str) -> bool:
+        """Whether the screen shows a prompt and nothing marking the agent busy"""
+        patterns = self.patterns.get(provider) or ReadinessPatterns()
+        if any(p.search(line) for p in patterns.busy for line in state.lines):
+            return False
+        if not patterns.prompt:
+            return True
+        return any(p.search(line) for p in patterns.prompt
+                   for line in state.near_cursor(PROMPT_CONTEXT_LINES))
+
+    def wait_until_ready(self, target: str, provider: str, timeout: Optional[float] = None) -> bool:
+        """Poll until target is ready for input; False if timeout passed first"""
+        return self._poll(target, self._ready_check(provider), self.timeout if timeout is None else timeout)
+
+    def wait_for_echo(self, target: str, text: str, timeout: Optional[float] = None) -> bool:
+        """Poll until the end of typed text shows up near the cursor
+
+        Whitespace is ignored so text wrapped across screen lines still
+        matches. Returns False if it didn't appear before the timeout.
+        """
+        check = self._echo_check(text)
+        return check is None or self._poll(target, check, self.echo_timeout if timeout is None else timeout)
+
+    def wait_for_settle(self, target: str, timeout: Optional[float] = None) -> bool:
+        """Poll until the screen stops changing, e.g. after a paste that isn't echoed verbatim"""
+        return self._poll(target, self._settle_check(), self.echo_timeout if timeout is None else timeout)
+
+    async def wait_until_ready_async(self, target: str, provider: str, run: Callable[[List[str]], Awaitable[str]],
+                                     timeout: Optional[float] = None) -> bool:
+        """wait_until_ready polling with asyncio.sleep and an async tmux runner"""
+        return await self._poll_async(target, run, self._ready_check(provider),
+                                      self.timeout if timeout is None else timeout)
+
+    async def wait_for_echo_async(self, target: str, text: str, run: Callable[[List[str]], Awaitable[str]],
+                                  timeout: Optional[float] = None) -> bool:
+        """wait_for_echo polling with asyncio.sleep and an async tmux runner"""
+        check = self._echo_check(text)
+        return check is None or await self._poll_async(target, run, check,
+                                                       self.echo_timeout if timeout is None else timeout)
+
+    async def wait_for_settle_async(self, target: str, run: Callable[[List[str]], Awaitable[str]],
+                                    timeout: Optional[float] = None) -> bool:
+        """wait_for_settle polling with asyncio.sleep and an async tmux runner"""
+        return await self._poll_async(target, run, self._settle_check(),
+                                      self.echo_timeout if timeout is None else timeout)
+
+    def _ready_check(self, provider: str) -> Callable[[PaneState], bool]:
+        previous = [None]
+
+        def ready(state: PaneState) -> bool:
+            digest, previous[0] = previous[0], state.digest
+            return digest == state.digest and self.is_ready(state, provider)
+
+        return ready
+
+    @staticmethod
+    def _echo_check(text: str) -> Optional[Callable[[PaneState], bool]]:
+        needle = re.sub(r"\s+", "", text)[-ECHO_TAIL_CHARS:]
+        if not needle:
+            return None
+        return lambda state: needle in re.sub(r"\s+", "", "".join(state.near_cursor(ECHO_CONTEXT_LINES)))
+
+    @staticmethod
+    def _settle_check() -> Callable[[PaneState], bool]:
+        previous = [None]
+
+        def settled(state: PaneState) -> bool:
+            digest, previous[0] = previous[0], state.digest
+            return digest == previous[0]
+
+        return settled
+
+    def _delays(self, deadline: float) -> Iterator[float]:
+        """Sleeps between polls, ending once the monotonic deadline has passed"""
+        delay = self.poll_initial
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return
+            yield min(delay, remaining)
+            delay = min(delay * self.poll_backoff, self.poll_max)
+
+    def _poll(self, target: str, check: Callable[[PaneState], bool], timeout: float) -> bool:
+        delays = self._delays(time.monotonic() + timeout)
+        while not check(self.read_state(target)):
+            delay = next(delays, None)
+            if delay is None:
+                return False
+            time.sleep(delay)
+        return True
+
+    async def _poll_async(self, target: str, run: Callable[[List[str]], Awaitable[str]],
+                          check: Callable[[PaneState], bool], timeout: float) -> bool:
+        import asyncio
+        delays = self._delays(time.monotonic() + timeout)
+        while not check(await self.read_state_async(target, run)):
+            delay = next(delays, None)
+            if delay is None:
+                return False
+            await asyncio.sleep(delay)
+        return True
+
+def main(argv=None):
+    if argv is None:
+        argv = sys.argv
+
+    if len(argv) < 3:
+        print("Usage: python3 readiness.py <session:window> <provider> [timeout_seconds]")
+        print("Waits until the agent in the window is ready for input; exits 1 on timeout")
+        sys.exit(1)
+
+    from ai_provider import AIOrchestrator
+    detector = ReadinessDetector.from_config(AIOrchestrator().config)
+    timeout = float(argv[3]) if len(argv) > 3 else None
+    sys.exit(0 if detector.wait_until_ready(argv[1], argv[2], timeout) else 1)
+
+if __name__ == "__main__":
+    main()
@@ -2,6 +2,9 @@
 # Dynamic scheduler with note for next check (Multi-Provider AI Support)
 # Usage: ./schedule-ai-check.sh <minutes> "<note>" [target_window] [ai_provider]
 # Providers: claude (default), rovodev, gemini
+#
+# Checks are queued with scheduler.py and fired by one resident scheduler
+# process; see schedule_with_note.sh.
 
 MINUTES=${1:-3}
 NOTE=${2:-"Standard check-in"}
@@ -11,13 +14,6 @@ AI_PROVIDER=${4:-"claude"}
 # Get script directory
 SCRIPT_DIR="$(cd "$(dirname "${BASH_SOURCE[0]}")" && pwd)"
 
-# Create a note file for the next check
-echo "=== Next Check Note ($(date)) ===" > "$SCRIPT_DIR/next_check_note.txt"
-echo "Scheduled for: $MINUTES minutes" >> "$SCRIPT_DIR/next_check_note.txt"
-echo "AI Provider: $AI_PROVIDER" >> "$SCRIPT_DIR/next_check_note.txt"
-echo "" >> "$SCRIPT_DIR/next_check_note.txt"
-echo "$NOTE" >> "$SCRIPT_DIR/next_check_note.txt"
-
 echo "Scheduling AI check in $MINUTES minutes with note: $NOTE"
 echo "Using AI provider: $AI_PROVIDER"
 
@@ -25,25 +21,10 @@ echo "Using AI provider: $AI_PROVIDER"
 CURRENT_TIME=$(date +"%H:%M:%S")
 RUN_TIME=$(date -v +${MINUTES}M +"%H:%M:%S" 2>/dev/null || date -d "+${MINUTES} minutes" +"%H:%M:%S" 2>/dev/null)
 
-# Use nohup to completely detach the sleep process
-# Use bc for floating point calculation
-SECONDS=$(echo "$MINUTES * 60" | bc)
-
-# Choose the appropriate message script based on provider
-if [ "$AI_PROVIDER" = "claude" ]; then
-    MESSAGE_SCRIPT="send-claude-message.sh"
-else
-    MESSAGE_SCRIPT="send-ai-message.sh"
-fi
-
-# Create the check command
-CHECK_CMD="Time for orchestrator check! cat $SCRIPT_DIR/next_check_note.txt && python3 $SCRIPT_DIR/tmux_utils.py"
-
-nohup bash -c "sleep $SECONDS && $SCRIPT_DIR/$MESSAGE_SCRIPT $TARGET '$CHECK_CMD' $AI_PROVIDER" > /dev/null 2>&1 &
+python3 "$SCRIPT_DIR/scheduler.py" add "$MINUTES" "$NOTE" "$TARGET" "$AI_PROVIDER" || exit 1
 
-# Get the PID of the background process
-SCHEDULE_PID=$!
+# Start the scheduler if it isn't running yet (a second instance exits at once)
+(cd "$SCRIPT_DIR" && nohup python3 "$SCRIPT_DIR/scheduler.py" run > /dev/null 2>&1 &)
 
-echo "Scheduled successfully - process detached (PID: $SCHEDULE_PID)"
 echo "SCHEDULED TO RUN AT: $RUN_TIME (in $MINUTES minutes from $CURRENT_TIME)"
-echo "Will use: $MESSAGE_SCRIPT with provider: $AI_PROVIDER"
\ No newline at end of file
+echo "Will use provider: $AI_PROVIDER"
@@ -0,0 +1,311 @@
+#!/usr/bin/env python3
+
+import heapq
+import os
+import re
+import shlex
+import sqlite3
+import sys
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Tuple
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_DB = os.path.join(SCRIPT_DIR, "scheduler.db")
+NOTES_DIR = os.path.join(SCRIPT_DIR, "check_notes")
+
+# Checks to the same window due within this many seconds of each other are merged
+COALESCE_SECONDS = 60.0
+# How often the running scheduler looks for checks added by other processes
+POLL_INTERVAL = 1.0
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS checks (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    target TEXT NOT NULL,
+    due REAL NOT NULL,
+    note TEXT NOT NULL DEFAULT '',
+    provider TEXT,
+    status TEXT NOT NULL DEFAULT 'pending',
+    created_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS checks_status_due ON checks (status, due);
+CREATE INDEX IF NOT EXISTS checks_target ON checks (target, status);
+"""
+
+_COLUMNS = "id, target, due, note, provider, status, created_at"
+
+@dataclass
+class ScheduledCheck:
+    id: int
+    target: str
+    due: float
+    note: str
+    provider: Optional[str]
+    status: str
+    created_at: float
+
+class CheckStore:
+    """Scheduled checks persisted in SQLite, so they survive restarts"""
+
+    def __init__(self, path: str = DEFAULT_DB):
+        self.path = path
+        self._conn = sqlite3.connect(path, timeout=10.0, check_same_thread=False,
+                                     isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(_SCHEMA)
+        self._lock = threading.Lock()
+
+    def close(self):
+        self._conn.close()
+
+    def _rows(self, sql: str, params: Tuple = ()) -> List[ScheduledCheck]:
+        with self._lock:
+            return [ScheduledCheck(*row) for row in self._conn.execute(sql, params).fetchall()]
+
+    def add(self, target: str, due: float, note: str = "", provider: Optional[str] = None,
+            coalesce: float = COALESCE_SECONDS) -> Tuple[ScheduledCheck, bool]:
+        """Schedule a check, merging it into a pending one for the same target due within coalesce seconds
+
+        Returns the check and whether it was merged. A merged check keeps
+        the earlier due time and gains the new note unless it already has it.
+        """
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._conn.execute(
+                    f"SELECT {_COLUMNS} FROM checks WHERE target = ? AND status = 'pending' "
+                    "AND due BETWEEN ? AND ? AND provider IS ? ORDER BY ABS(due - ?) LIMIT 1",
+                    (target, due - coalesce, due + coalesce, provider, due)).fetchone()
+                if row is None:
+                    cursor = self._conn.execute(
+                        "INSERT INTO checks (target, due, note, provider, created_at) VALUES (?, ?, ?, ?, ?)",
+                        (target, due, note, provider, time.time()))
+                    check_id, merged = cursor.lastrowid, False
+                else:
+                    existing = ScheduledCheck(*row)
+                    notes = existing.note.split("\n\n") if existing.note else []
+                    if note and note not in notes:
+                        notes.append(note)
+                    self._conn.execute("UPDATE checks SET due = ?, note = ? WHERE id = ?",
+                                       (min(existing.due, due), "\n\n".join(notes), existing.id))
+                    check_id, merged = existing.id, True
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+        return self.get(check_id), merged
+
+    def get(self, check_id: int) -> Optional[ScheduledCheck]:
+        rows = self._rows(f"SELECT {_COLUMNS} FROM checks WHERE id = ?", (check_id,))
+        return rows[0] if rows else None
+
+    def pending(self, target: Optional[str] = None) -> List[ScheduledCheck]:
+        """Pending checks in due order, optionally for one target"""
+        if target is None:
+            return self._rows(f"SELECT {_COLUMNS} FROM checks WHERE status = 'pending' ORDER BY due")
+        return self._rows(f"SELECT {_COLUMNS} FROM checks WHERE status = 'pending' AND target = ? ORDER BY due",
+                          (target,))
+
+    def _update(self, sql: str, params: Tuple) -> bool:
+        with self._lock:
+            return self._conn.execute(sql, params).rowcount > 0
+
+    def cancel(self, check_id: int) -> bool:
+        return self._update("UPDATE checks SET status = 'cancelled' WHERE id = ? AND status = 'pending'",
+                            (check_id,))
+
+    def reschedule(self, check_id: int, due: float) -> bool:
+        return self._update("UPDATE checks SET due = ? WHERE id = ? AND status = 'pending'", (due, check_id))
+
+    def mark(self, check_id: int, status: str):
+        self._update("UPDATE checks SET status = ? WHERE id = ?", (status, check_id))
+
+    def data_version(self) -> int:
+        """Changes whenever another connection commits to the database"""
+        with self._lock:
+            return self._conn.execute("PRAGMA data_version").fetchone()[0]
+
+def note_path(target: str) -> str:
+    """Per-target note file handed to the agent when its check fires"""
+    return os.path.join(NOTES_DIR, re.sub(r"[^A-Za-z0-9._-]", "_", target) + ".txt")
+
+def check_message(check: ScheduledCheck) -> str:
+    """Write the check's note file and return the message sent to its window"""
+    path = note_path(check.target)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    minutes = max(round((check.due - check.created_at) / 60), 0)
+    with open(path, "w") as f:
+        f.write(f"=== Next Check Note ({datetime.now().strftime('%c')}) ===\n")
+        f.write(f"Scheduled for: {minutes} minutes\n")
+        if check.provider:
+            f.write(f"AI Provider: {check.provider}\n")
+        f.write("\n")
+        f.write(check.note + "\n")
+    return (f"Time for orchestrator check! cat {shlex.quote(path)} && "
+            f"python3 {shlex.quote(os.path.join(SCRIPT_DIR, 'tmux_utils.py'))}")
+
+# Created on the first check the default sender fires
+_orchestrator = None
+
+def _orchestrator_send(target: str, message: str, provider: Optional[str]) -> bool:
+    from ai_provider import AIOrchestrator, AIProvider
+    global _orchestrator
+    if _orchestrator is None:
+        _orchestrator = AIOrchestrator(os.path.join(SCRIPT_DIR, "ai_config.yml"))
+    session_name, window_index = target.rsplit(":", 1)
+    return _orchestrator.send_message(session_name, int(window_index), message,
+                                      AIProvider(provider) if provider else None)
+
+class Scheduler:
+    """Fires pending checks from one process using an in-memory heap
+
+    The heap holds (due, id) for every pending check and is rebuilt from
+    the store only when another process has changed it, so thousands of
+    pending checks cost one sleep per POLL_INTERVAL. Rescheduled or
+    cancelled entries are skipped lazily when they reach the top. Checks
+    that came due while nothing was running fire on startup.
+    """
+
+    def __init__(self, store: CheckStore, send: Optional[Callable[[str, str, Optional[str]], bool]] = None,
+                 poll_interval: float = POLL_INTERVAL):
+        self.store = store
+        self.send = send or _orchestrator_send
+        self.poll_interval = poll_interval
+        self._heap: List[Tuple[float, int]] = []
+        self._due: Dict[int, float] = {}
+        self._version: Optional[int] = None
+        self._stop = threading.Event()
+
+    def sync(self):
+        """Reload pending checks from the store"""
+        self._version = self.store.data_version()
+        self._due = {check.id: check.due for check in self.store.pending()}
+        self._heap = [(due, check_id) for check_id, due in self._due.items()]
+        heapq.heapify(self._heap)
+
+    def run_due(self, now: Optional[float] = None) -> int:
+        """Fire every check due by now; returns how many fired"""
+        if self._version is None or self.store.data_version() != self._version:
+            self.sync()
+        now = time.time() if now is None else now
+        fired = 0
+        while self._heap and self._heap[0][0] <= now:
+            due, check_id = heapq.heappop(self._heap)
+            if self._due.get(check_id) != due:
+                continue
+            del self._due[check_id]
+            check = self.store.get(check_id)
+            if check is None or check.status != "pending":
+                continue
+            if check.due != due:
+                # Rescheduled through this process's own connection
+                self._due[check_id] = check.due
+                heapq.heappush(self._heap, (check.due, check_id))
+                continue
+            self._fire(check)
+            fired += 1
+        return fired
+
+    def _fire(self, check: ScheduledCheck):
+        try:
+            ok = self.send(check.target, check_message(check), check.provider)
+        except Exception as e:
+            print(f"Error running check {check.id} for {check.target}: {e}", file=sys.stderr)
+            ok = False
+        self.store.mark(check.id, "done" if ok else "failed")
+
+    def seconds_until_next(self, now: Optional[float] = None) -> Optional[float]:
+        if not self._heap:
+            return None
+        return max(self._heap[0][0] - (time.time() if now is None else now), 0.0)
+
+    def run_forever(self):
+        while not self._stop.is_set():
+            self.run_due()
+            wait = self.seconds_until_next()
+            self._stop.wait(self.poll_interval if wait is None else min(wait, self.poll_interval))
+
+    def stop(self):
+        self._stop.set()
+
+def _acquire_run_lock(db_path: str):
+    """Hold an exclusive lock for the scheduler's lifetime; None if another one runs"""
+    import fcntl
+    lock_file = open(db_path + ".lock", "w")
+    try:
+        fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        lock_file.close()
+        return None
+    return lock_file
+
+def _format_check(check: ScheduledCheck) -> str:
+    when = datetime.fromtimestamp(check.due).strftime("%Y-%m-%d %H:%M:%S")
+    provider = f" [{check.provider}]" if check.provider else ""
+    note = check.note.replace("\n\n", " | ")
+    return f"{check.id:>6}  {when}  {check.target}{provider}  {note}"
+
+def main(argv=None):
+    if argv is None:
+        argv = sys.argv
+
+    commands = ("add", "list", "cancel", "reschedule", "run")
+    if len(argv) < 2 or argv[1] not in commands:
+        print("Usage: python3 scheduler.py add <minutes> <note> [target_window] [provider]")
+        print("       python3 scheduler.py list")
+        print("       python3 scheduler.py cancel <id>")
+        print("       python3 scheduler.py reschedule <id> <minutes>")
+        print("       python3 scheduler.py run")
+        sys.exit(1)
+
+    db_path = os.environ.get("ORCHESTRATOR_SCHEDULER_DB", DEFAULT_DB)
+    command = argv[1]
+
+    if command == "run":
+        lock = _acquire_run_lock(db_path)
+        if lock is None:
+            print("Scheduler already running")
+            return
+        scheduler = Scheduler(CheckStore(db_path))
+        try:
+            scheduler.run_forever()
+        except KeyboardInterrupt:
+            pass
+        return
+
+    store = CheckStore(db_path)
+    try:
+        if command == "add":
+            minutes = float(argv[2]) if len(argv) > 2 else 3
+            note = argv[3] if len(argv) > 3 else "Standard check-in"
+            target = argv[4] if len(argv) > 4 else "tmux-orc:0"
+            provider = argv[5] if len(argv) > 5 else None
+            check, merged = store.add(target, time.time() + minutes * 60, note, provider)
+            action = "Merged into existing check" if merged else "Scheduled check"
+            print(f"{action} {check.id} for {check.target} at "
+                  f"{datetime.fromtimestamp(check.due).strftime('%H:%M:%S')}")
+        elif command == "list":
+            for check in store.pending():
+                print(_format_check(check))
+        elif command == "cancel":
+            if not store.cancel(int(argv[2])):
+                print(f"No pending check {argv[2]}")
+                sys.exit(1)
+            print(f"Cancelled check {argv[2]}")
+        elif command == "reschedule":
+            due = time.time() + float(argv[3]) * 60
+            if not store.reschedule(int(argv[2]), due):
+                print(f"No pending check {argv[2]}")
+                sys.exit(1)
+            print(f"Rescheduled check {argv[2]} to {datetime.fromtimestamp(due).strftime('%H:%M:%S')}")
+    except (IndexError, ValueError):
+        print(f"Error: invalid arguments for '{command}'")
+        sys.exit(1)
+    finally:
+        store.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,280 @@
+#!/usr/bin/env python3
+
+import heapq
+import json
+import re
+import subprocess
+import sys
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass
+from datetime import datetime
+from typing import Deque, Dict, List, Optional, Set, Tuple
+
+# Lines kept per window; older ones drop out of the index
+MAX_LINES_PER_PANE = 5000
+# Seconds a line stays searchable; 0 keeps lines until MAX_LINES_PER_PANE pushes them out
+MAX_AGE = 24 * 3600
+# Results returned by a search unless a limit is given
+DEFAULT_LIMIT = 100
+
+# Words are indexed lowercased; ECONNREFUSED, exit_code and 127 are tokens of
+# "connect ECONNREFUSED 127.0.0.1 (exit_code=1)"
+_TOKEN_RE = re.compile(r"[0-9A-Za-z_]+")
+
+def tokenize(text: str) -> Set[str]:
+    return {token.lower() for token in _TOKEN_RE.findall(text)}
+
+@dataclass
+class SearchHit:
+    target: str
+    # Position of the line in everything indexed for the target, counting from 0
+    line: int
+    # When the line was indexed
+    timestamp: float
+    text: str
+
+class ScrollbackIndex:
+    """Inverted index (token -> window -> line offsets) over captured window output
+
+    Output is added as it is captured, each line stamped with the time it
+    was indexed. A search for "connect ECONNREFUSED" looks up its rarest
+    token, intersects the line offsets of the others and checks the phrase
+    against the few lines left, so it doesn't scan scrollback. Each window
+    keeps at most max_lines_per_pane lines, and lines older than max_age
+    seconds are dropped, which bounds memory.
+
+        index = ScrollbackIndex()
+        index.refresh(TmuxOrchestrator())   # again later: only windows with new output
+        index.search("ECONNREFUSED", since=time.time() - 3600)
+    """
+
+    def __init__(self, max_lines_per_pane: int = MAX_LINES_PER_PANE, max_age: float = MAX_AGE):
+        self.max_lines_per_pane = max_lines_per_pane
+        self.max_age = max_age
+        # token -> target -> offsets of the lines containing it
+        self._postings: Dict[str, Dict[str, Set[int]]] = {}
+        # target -> (offset, timestamp, text) of the lines kept, oldest first
+        self._lines: Dict[str, Deque[Tuple[int, float, str]]] = {}
+        self._next_offset: Dict[str, int] = {}
+        # Activity/scroll position of each window when it was last captured
+        self._captured: Dict[str, Tuple] = {}
+        self._lock = threading.RLock()
+
+    def add(self, target: str, text: str, timestamp: Optional[float] = None) -> int:
+        """Index the lines of text as output of target; returns the number of lines added"""
+        timestamp = time.time() if timestamp is None else timestamp
+        added = 0
+        with self._lock:
+            lines = self._lines.setdefault(target, deque())
+            offset = self._next_offset.get(target, 0)
+            for line in text.splitlines():
+                tokens = tokenize(line)
+                if not tokens:
+                    continue
+                for token in tokens:
+                    self._postings.setdefault(token, {}).setdefault(target, set()).add(offset)
+                lines.append((offset, timestamp, line))
+                offset += 1
+                added += 1
+            self._next_offset[target] = offset
+            while len(lines) > self.max_lines_per_pane:
+                self._drop_oldest(target, lines)
+        return added
+
+    def _drop_oldest(self, target: str, lines: Deque[Tuple[int, float, str]]):
+        offset, _, line = lines.popleft()
+        for token in tokenize(line):
+            targets = self._postings.get(token)
+            if targets is None or target not in targets:
+                continue
+            targets[target].discard(offset)
+            if not targets[target]:
+                del targets[target]
+                if not targets:
+                    del self._postings[token]
+
+    def remove(self, target: str):
+        """Forget everything indexed for a window, e.g. once it has closed"""
+        with self._lock:
+            lines = self._lines.pop(target, deque())
+            while lines:
+                self._drop_oldest(target, lines)
+            self._next_offset.pop(target, None)
+            self._captured.pop(target, None)
+
+    def expire(self, now: Optional[float] = None):
+        """Drop lines older than max_age"""
+        if not self.max_age:
+            return
+        cutoff = (time.time() if now is None else now) - self.max_age
+        with self._lock:
+            for target, lines in self._lines.items():
+                while lines and lines[0][1] < cutoff:
+                    self._drop_oldest(target, lines)
+
+    def search(self, query: str, since: Optional[float] = None, until: Optional[float] = None,
+               target: Optional[str] = None, limit: Optional[int] = DEFAULT_LIMIT) -> List[SearchHit]:
+        """Lines containing every word of query as a (case-insensitive) phrase, newest first
+
+        Words match whole tokens, so "ECONNREFUSED" finds "connect
+        ECONNREFUSED 127.0.0.1" but "ECONN" doesn't. target limits the
+        search to one window ("proj:0") or session ("proj").
+        """
+        tokens = tokenize(query)
+        if not tokens:
+            return []
+        phrase = query.strip().lower()
+        hits = []
+        with self._lock:
+            postings = [self._postings.get(token, {}) for token in tokens]
+            postings.sort(key=len)
+            for hit_target, offsets in postings[0].items():
+                if target is not None and hit_target != target and not hit_target.startswith(target + ":"):
+                    continue
+                candidates = set(offsets)
+                for other in postings[1:]:
+                    candidates &= other.get(hit_target, set())
+                    if not candidates:
+                        break
+                if not candidates:
+                    continue
+                lines = self._lines[hit_target]
+                first = lines[0][0]
+                for offset in candidates:
+                    _, timestamp, text = lines[offset - first]
+                    if since is not None and timestamp < since:
+                        continue
+                    if until is not None and timestamp > until:
+                        continue
+                    if phrase in text.lower():
+                        hits.append(SearchHit(hit_target, offset, timestamp, text))
+        key = lambda hit: (hit.timestamp, hit.line)
+        if limit is None:
+            return sorted(hits, key=key, reverse=True)
+        return heapq.nlargest(limit, hits, key=key)
+
+    def refresh(self, orchestrator, max_workers: Optional[int] = None) -> int:
+        """Index what each window printed since the last refresh; returns the number of lines added
+
+        One list-windows call finds the windows whose activity or scroll
+        position changed; only those are captured, each from its delta
+        watermark (capture_window_delta), on up to max_workers threads.
+        Windows that no longer exist are removed from the index.
+        """
+        sessions = orchestrator.get_tmux_sessions()
+        changed = []
+        live = set()
+        for session in sessions:
+            for window in session.windows:
+                target = f"{session.name}:{window.window_index}"
+                live.add(target)
+                position = window.position
+                state = (window.window_id, window.activity,
+                         position.pane_id if position else "", position.watermark if position else None)
+                if position is None or self._captured.get(target) != state:
+                    changed.append((target, session.name, window, state))
+
+        def capture(entry) -> Tuple[str, Tuple, Optional[str]]:
+            target, session_name, window, state = entry
+            try:
+                return target, state, orchestrator.capture_window_delta(session_name, window.window_index, window)
+            except (subprocess.CalledProcessError, IndexError):
+                return target, state, None
+
+        workers = max_workers or getattr(orchestrator, "capture_workers", 8)
+        if len(changed) > 1 and workers > 1:
+            with ThreadPoolExecutor(max_workers=min(workers, len(changed)), thread_name_prefix="index-capture") as pool:
+                captured = list(pool.map(capture, changed))
+        else:
+            captured = [capture(entry) for entry in changed]
+
+        added = 0
+        with self._lock:
+            # An empty listing is more likely a failed one than every window closing
+            for target in list(self._lines) if live else ():
+                if target not in live:
+                    self.remove(target)
+            for target, state, content in captured:
+                if content is None:
+                    continue
+                self._captured[target] = state
+                added += self.add(target, content)
+            self.expire()
+        return added
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"windows": len(self._lines), "lines": sum(len(lines) for lines in self._lines.values()),
+                    "tokens": len(self._postings)}
+
+def hit_to_dict(hit: SearchHit) -> Dict:
+    return asdict(hit)
+
+def format_hit(hit: Dict) -> str:
+    when = datetime.fromtimestamp(hit["timestamp"]).strftime("%Y-%m-%d %H:%M:%S")
+    return f"{when}  {hit['target']:<20} {hit['line']:>6}  {hit['text']}"
+
+def main(argv=None):
+    if argv is None:
+        argv = sys.argv
+
+    usage = ("Usage: python3 scrollback_index.py <query> [--since 1h|ISO] [--until 5m|ISO] "
+             "[--target session[:window]] [--limit N] [--json]\n"
+             "Lines are timestamped when indexed, not when printed: the resident daemon\n"
+             "(python3 ai_provider.py --daemon) indexes every scrollback_index_interval seconds, so\n"
+             "--since/--until need it, and output from before it started counts as printed then")
+    if len(argv) < 2 or argv[1].startswith("-"):
+        print(usage)
+        sys.exit(1)
+
+    from event_log import parse_time
+    request = {"op": "search", "query": argv[1], "limit": DEFAULT_LIMIT}
+    as_json = False
+    args = argv[2:]
+    try:
+        while args:
+            option = args.pop(0)
+            if option == "--json":
+                as_json = True
+            elif option in ("--since", "--until"):
+                request[option[2:]] = parse_time(args.pop(0))
+            elif option == "--target":
+                request["target"] = args.pop(0)
+            elif option == "--limit":
+                request["limit"] = int(args.pop(0))
+            else:
+                raise ValueError(option)
+    except (IndexError, ValueError):
+        print(usage)
+        sys.exit(1)
+
+    # The daemon keeps its index between searches; without one, index the
+    # windows' recent output in-process first
+    from ai_client import request as daemon_request
+    try:
+        reply = daemon_request(request)
+    except (OSError, ValueError):
+        reply = None
+    if reply is not None and reply.get("ok"):
+        hits = reply["hits"]
+    elif "since" in request or "until" in request:
+        # An in-process index would stamp the whole scrollback with the current time
+        print("Error: --since/--until need the daemon's index; start python3 ai_provider.py --daemon")
+        sys.exit(1)
+    else:
+        from tmux_utils import TmuxOrchestrator
+        index = ScrollbackIndex()
+        index.refresh(TmuxOrchestrator())
+        options = {key: request[key] for key in ("since", "until", "target", "limit") if key in request}
+        hits = [hit_to_dict(hit) for hit in index.search(request["query"], **options)]
+
+    for hit in hits:
+        print(json.dumps(hit) if as_json else format_hit(hit))
+    if not hits:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -22,9 +22,9 @@ SCRIPT_DIR="$(cd "$(dirname "${BASH_SOURCE[0]}")" && pwd)"
 
 # Use Python orchestrator for multi-provider support
 if [ -n "$PROVIDER" ]; then
-    python3 "$SCRIPT_DIR/ai_provider.py" "$WINDOW" "$MESSAGE" "$PROVIDER"
+    python3 "$SCRIPT_DIR/ai_client.py" "$WINDOW" "$MESSAGE" "$PROVIDER"
 else
-    python3 "$SCRIPT_DIR/ai_provider.py" "$WINDOW" "$MESSAGE"
+    python3 "$SCRIPT_DIR/ai_client.py" "$WINDOW" "$MESSAGE"
 fi
 
 # Check exit status
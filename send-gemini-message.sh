@@ -24,7 +24,7 @@ SCRIPT_DIR="$(cd "$(dirname "${BASH_SOURCE[0]}")" && pwd)"
 # Check if ai_provider.py exists for enhanced functionality
 if [ -f "$SCRIPT_DIR/ai_provider.py" ]; then
     echo "Using enhanced AI provider (Gemini mode for backward compatibility)"
-    python3 "$SCRIPT_DIR/ai_provider.py" "$WINDOW" "$MESSAGE" "gemini"
+    python3 "$SCRIPT_DIR/ai_client.py" "$WINDOW" "$MESSAGE" "gemini"
     exit $?
 fi
 
@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+
+import json
+import sqlite3
+import sys
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    session_name TEXT NOT NULL,
+    window_index INTEGER NOT NULL,
+    provider TEXT NOT NULL,
+    options TEXT NOT NULL DEFAULT '{}',
+    updated_at REAL NOT NULL,
+    PRIMARY KEY (session_name, window_index)
+);
+CREATE INDEX IF NOT EXISTS sessions_window ON sessions (window_index);
+CREATE INDEX IF NOT EXISTS sessions_provider ON sessions (provider);
+"""
+
+_UPSERT = """
+INSERT INTO sessions (session_name, window_index, provider, options, updated_at)
+VALUES (?, ?, ?, ?, ?)
+ON CONFLICT (session_name, window_index)
+DO UPDATE SET provider = excluded.provider, options = excluded.options, updated_at = excluded.updated_at
+"""
+
+def split_session_key(session_key: str) -> Tuple[str, int]:
+    """'session:window' -> (session, window); session names may contain ':'"""
+    session_name, window_index = session_key.rsplit(":", 1)
+    return session_name, int(window_index)
+
+class SessionRegistry:
+    """session:window -> provider assignments in SQLite (WAL mode)
+
+    Each assignment is one row, so an update is a single-row upsert rather
+    than a rewrite of ai_config.yml. In WAL mode readers never wait for a
+    writer, and writers from several processes are serialised by SQLite.
+    Every thread gets its own connection. The YAML `sessions` mapping
+    format is used for import and export:
+
+        {"proj:0": {"provider": "claude", "options": {}}}
+    """
+
+    def __init__(self, path: str, timeout: float = 5.0):
+        self.path = path
+        self.timeout = timeout
+        self._local = threading.local()
+        with self._connect() as conn:
+            conn.executescript(_SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=self.timeout)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def close(self):
+        """Close this thread's connection"""
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+    def get(self, session_name: str, window_index: int) -> Optional[Dict]:
+        """The {"provider", "options"} entry for a window, or None"""
+        row = self._connect().execute(
+            "SELECT provider, options FROM sessions WHERE session_name = ? AND window_index = ?",
+            (session_name, window_index)).fetchone()
+        if row is None:
+            return None
+        return {"provider": row[0], "options": json.loads(row[1])}
+
+    def set(self, session_name: str, window_index: int, provider: str, options: Optional[Dict] = None):
+        """Insert or replace one assignment atomically"""
+        with self._connect() as conn:
+            conn.execute(_UPSERT, (session_name, window_index, provider, json.dumps(options or {}), time.time()))
+
+    def remove(self, session_name: str, window_index: int) -> bool:
+        with self._connect() as conn:
+            cursor = conn.execute("DELETE FROM sessions WHERE session_name = ? AND window_index = ?",
+                                  (session_name, window_index))
+        return cursor.rowcount > 0
+
+    def windows_for_session(self, session_name: str) -> Dict[int, Dict]:
+        """Assignments of one session by window index"""
+        rows = self._connect().execute(
+            "SELECT window_index, provider, options FROM sessions WHERE session_name = ? ORDER BY window_index",
+            (session_name,)).fetchall()
+        return {index: {"provider": provider, "options": json.loads(options)} for index, provider, options in rows}
+
+    def targets_for_provider(self, provider: str) -> List[str]:
+        """session:window keys assigned to a provider"""
+        rows = self._connect().execute(
+            "SELECT session_name, window_index FROM sessions WHERE provider = ? ORDER BY session_name, window_index",
+            (provider,)).fetchall()
+        return [f"{session_name}:{window_index}" for session_name, window_index in rows]
+
+    def count(self) -> int:
+        return self._connect().execute("SELECT COUNT(*) FROM sessions").fetchone()[0]
+
+    def import_sessions(self, sessions: Optional[Dict[str, Dict]], replace: bool = False) -> int:
+        """Load a YAML-format sessions mapping in one transaction; returns the rows written"""
+        now = time.time()
+        rows = []
+        for session_key, entry in (sessions or {}).items():
+            session_name, window_index = split_session_key(str(session_key))
+            rows.append((session_name, window_index, entry["provider"], json.dumps(entry.get("options") or {}), now))
+        with self._connect() as conn:
+            if replace:
+                conn.execute("DELETE FROM sessions")
+            conn.executemany(_UPSERT, rows)
+        return len(rows)
+
+    def export_sessions(self) -> Dict[str, Dict]:
+        """All assignments as a YAML-format sessions mapping"""
+        rows = self._connect().execute(
+            "SELECT session_name, window_index, provider, options FROM sessions "
+            "ORDER BY session_name, window_index").fetchall()
+        return {f"{session_name}:{window_index}": {"provider": provider, "options": json.loads(options)}
+                for session_name, window_index, provider, options in rows}
+
+def main(argv=None):
+    if argv is None:
+        argv = sys.argv
+
+    if len(argv) < 3 or argv[1] not in ("import", "export", "list"):
+        print("Usage: python3 session_registry.py import <registry.db> [ai_config.yml]")
+        print("       python3 session_registry.py export <registry.db> [ai_config.yml]")
+        print("       python3 session_registry.py list <registry.db> [provider]")
+        sys.exit(1)
+
+    command, path = argv[1], argv[2]
+    registry = SessionRegistry(path)
+    if command == "list":
+        sessions = registry.export_sessions()
+        for session_key, entry in sessions.items():
+            if len(argv) < 4 or entry["provider"] == argv[3]:
+                print(f"{session_key}: {entry['provider']}")
+        return
+
+    import yaml
+    config_file = argv[3] if len(argv) > 3 else "ai_config.yml"
+    with open(config_file) as f:
+        config = yaml.safe_load(f) or {}
+    if command == "import":
+        count = registry.import_sessions(config.get("sessions"))
+        print(f"Imported {count} session assignments from {config_file}")
+    else:
+        config["sessions"] = registry.export_sessions()
+        with open(config_file, "w") as f:
+            yaml.dump(config, f, default_flow_style=False)
+        print(f"Exported {len(config['sessions'])} session assignments to {config_file}")
+
+if __name__ == "__main__":
+    main()
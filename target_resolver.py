@@ -0,0 +1,238 @@
+#!/usr/bin/env python3
+
+import subprocess
+import sys
+import threading
+import time
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional
+
+from tmux_control import CONTROL_SESSION, run_tmux
+from tmux_utils import parse_rows, tmux_format
+
+# Window option naming an agent's role ("reviewer", "builder", ...), addressed as role=<name>
+ROLE_OPTION = "@orchestrator_role"
+# Server option bumped by tmux hooks whenever windows are created, closed,
+# moved or renamed, so a cached mapping can be validated with one tiny query
+GENERATION_OPTION = "@orchestrator_generation"
+# move-window fires window-unlinked/window-linked; window-pane-changed
+# catches a new active pane. swap-window has no hook, so a swap is only
+# noticed through invalidate(). Hooks the server doesn't know are skipped.
+GENERATION_HOOKS = ("window-linked", "window-unlinked", "window-renamed", "session-renamed",
+                    "window-pane-changed")
+# Hook array index used for the generation hooks, leaving the user's own hooks alone
+HOOK_INDEX = 77
+# Seconds a validated mapping is used before the generation is checked again
+CHECK_INTERVAL = 1.0
+
+# The window name goes last, like in tmux_utils.WINDOW_FIELDS
+RESOLVE_FIELDS = (
+    "session_name",
+    "window_index",
+    "window_id",
+    "pane_id",
+    ROLE_OPTION,
+    "window_name",
+)
+
+class UnknownTargetError(LookupError):
+    """A name, role or session:window that doesn't match exactly one window"""
+
+@dataclass
+class ResolvedTarget:
+    session_name: str
+    window_index: int
+    window_id: str
+    # Active pane of the window when it was resolved
+    pane_id: str
+    window_name: str
+    role: str = ""
+
+    @property
+    def session_window(self) -> str:
+        return f"{self.session_name}:{self.window_index}"
+
+def is_id(target: str) -> bool:
+    """Whether target is a tmux %pane_id or @window_id, which never change while the pane/window exists"""
+    return target[:1] in ("%", "@") and target[1:].isdigit()
+
+class TargetResolver:
+    """Cached mapping of window names, session:window targets and roles to tmux IDs
+
+    Window indexes shift when windows are closed, moved or renumbered, so a
+    message addressed to "proj:2" can land in whichever agent has index 2
+    by then. Resolving the target to its %pane_id once and addressing that
+    avoids this. Targets can be:
+
+        %12 / @4          IDs, returned as they are without a lookup
+        proj:2            session:window index
+        proj:reviewer     session:window name
+        reviewer          window name, if only one window on the server has it
+        role=reviewer     the window whose @orchestrator_role option is "reviewer"
+
+    The mapping is built from one list-windows -a call and looked up in
+    dicts. It is dropped by invalidate() (on a failed send, or wired to a
+    TmuxWatcher with watch()) and when the server's generation counter,
+    bumped by hooks installed on first use, has moved. The counter is
+    checked at most every check_interval seconds.
+    """
+
+    def __init__(self, run: Optional[Callable[[List[str]], str]] = None, check_interval: float = CHECK_INTERVAL,
+                 install_hooks: bool = True):
+        self.run = run or run_tmux
+        self.check_interval = check_interval
+        self.install_hooks = install_hooks
+        self._hooks_installed = False
+        self._hooks_tried = False
+        self._lock = threading.Lock()
+        self._valid = False
+        self._generation: Optional[str] = None
+        self._checked = 0.0
+        self._by_target: Dict[str, ResolvedTarget] = {}
+        self._by_id: Dict[str, ResolvedTarget] = {}
+        self._by_name: Dict[str, List[ResolvedTarget]] = {}
+        self._by_role: Dict[str, List[ResolvedTarget]] = {}
+
+    def invalidate(self):
+        """Drop the cached mapping; the next lookup lists the windows again"""
+        self._valid = False
+
+    def watch(self, watcher):
+        """Invalidate whenever a TmuxWatcher sees windows or sessions change"""
+        for kind in ("window-add", "window-close", "window-renamed", "sessions-changed"):
+            watcher.on(kind, lambda event: self.invalidate())
+
+    def _read_generation(self) -> str:
+        return self.run(["show-options", "-gqv", GENERATION_OPTION]).strip()
+
+    def _install_hooks(self):
+        """Make tmux bump GENERATION_OPTION on every change that can make the mapping stale
+
+        Each hook is set on its own so one this tmux doesn't have is
+        skipped. Any other failure removes the hooks already set and leaves
+        the resolver validating by listing windows, without trying again.
+        """
+        self.run(["set-option", "-gq", GENERATION_OPTION, self._read_generation() or "0"])
+        # The server answered; whatever happens below isn't retried
+        self._hooks_tried = True
+        bump = f'set-option -gF {GENERATION_OPTION} "#{{e|+:#{{{GENERATION_OPTION}}},1}}"'
+        installed = []
+        for hook in GENERATION_HOOKS:
+            try:
+                self.run(["set-hook", "-g", f"{hook}[{HOOK_INDEX}]", bump])
+            except subprocess.CalledProcessError as e:
+                if "invalid option" in (e.stderr or e.output or ""):
+                    continue
+                for name in installed:
+                    try:
+                        self.run(["set-hook", "-gu", f"{name}[{HOOK_INDEX}]"])
+                    except subprocess.CalledProcessError:
+                        pass
+                return
+            installed.append(hook)
+        self._hooks_installed = bool(installed)
+
+    def _current(self) -> bool:
+        """Whether the cached mapping can still be used, checking the generation if due"""
+        if not self._valid:
+            return False
+        if time.monotonic() - self._checked < self.check_interval:
+            return True
+        generation = self._read_generation() if self._hooks_installed else None
+        self._checked = time.monotonic()
+        return generation is not None and generation == self._generation
+
+    def refresh(self):
+        """List the windows and rebuild the mapping"""
+        with self._lock:
+            if self.install_hooks and not self._hooks_tried:
+                try:
+                    self._install_hooks()
+                except subprocess.CalledProcessError:
+                    # No server yet; tried again on the next refresh
+                    pass
+            generation = self._read_generation() if self._hooks_installed else None
+            output = self.run(["list-windows", "-a", "-F", tmux_format(RESOLVE_FIELDS)])
+            by_target, by_id, by_name, by_role = {}, {}, {}, {}
+            for row in parse_rows(output, RESOLVE_FIELDS):
+                if row["session_name"] == CONTROL_SESSION:
+                    continue
+                target = ResolvedTarget(session_name=row["session_name"], window_index=int(row["window_index"]),
+                                        window_id=row["window_id"], pane_id=row["pane_id"],
+                                        window_name=row["window_name"], role=row[ROLE_OPTION])
+                # An index wins over a window whose name looks like one
+                by_target[target.session_window] = target
+                by_target.setdefault(f"{target.session_name}:{target.window_name}", target)
+                by_id[target.window_id] = by_id[target.pane_id] = target
+                by_name.setdefault(target.window_name, []).append(target)
+                if target.role:
+                    by_role.setdefault(target.role, []).append(target)
+            self._by_target, self._by_id, self._by_name, self._by_role = by_target, by_id, by_name, by_role
+            self._generation = generation
+            self._checked = time.monotonic()
+            self._valid = True
+
+    def _lookup(self, target: str) -> Optional[ResolvedTarget]:
+        if is_id(target):
+            return self._by_id.get(target)
+        if target.startswith("role="):
+            matches = self._by_role.get(target[5:], [])
+        elif ":" in target:
+            return self._by_target.get(target)
+        else:
+            matches = self._by_name.get(target, [])
+        if len(matches) > 1:
+            raise UnknownTargetError(f"'{target}' matches {len(matches)} windows: "
+                                     f"{', '.join(match.session_window for match in matches)}")
+        return matches[0] if matches else None
+
+    def resolve(self, target: str) -> ResolvedTarget:
+        """The window a target refers to, listing windows only when the cache is stale or misses"""
+        refreshed = not self._current()
+        if refreshed:
+            self.refresh()
+        resolved = self._lookup(target)
+        if resolved is None and not refreshed:
+            # Possibly created since the mapping was built
+            self.refresh()
+            resolved = self._lookup(target)
+        if resolved is None:
+            raise UnknownTargetError(f"No window matches '{target}'")
+        return resolved
+
+    def target(self, target: str) -> str:
+        """The -t argument for a target: IDs as given, anything else as its %pane_id"""
+        if is_id(target):
+            return target
+        return self.resolve(target).pane_id
+
+    def set_role(self, target: str, role: str):
+        """Tag a window with a role, so it can be addressed as role=<role>"""
+        self.run(["set-option", "-w", "-t", self.target(target), ROLE_OPTION, role])
+        self.invalidate()
+
+def main(argv=None):
+    if argv is None:
+        argv = sys.argv
+
+    if len(argv) < 2:
+        print("Usage: python3 target_resolver.py <target>... | --set-role <target> <role>")
+        print("Targets: %pane_id, @window_id, session:index, session:name, name, role=<role>")
+        sys.exit(1)
+
+    resolver = TargetResolver()
+    try:
+        if argv[1] == "--set-role" and len(argv) == 4:
+            resolver.set_role(argv[2], argv[3])
+            print(f"{argv[2]} is now role={argv[3]}")
+            return
+        for target in argv[1:]:
+            resolved = resolver.resolve(target)
+            print(f"{target}\t{resolved.pane_id}\t{resolved.window_id}\t{resolved.session_window}\t"
+                  f"{resolved.window_name}\t{resolved.role}")
+    except (UnknownTargetError, subprocess.CalledProcessError) as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
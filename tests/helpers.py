@@ -0,0 +1,44 @@
+"""tmux output rows shared by the tests"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from tmux_utils import FIELD_SEP, PANE_FIELDS, WINDOW_FIELDS
+
+
+def window_row(session_name, attached, index, name, active, panes=1, layout='layout'):
+    """Build one list-windows -a output line in WINDOW_FIELDS order"""
+    values = {
+        'session_name': session_name,
+        'session_attached': attached,
+        'window_index': str(index),
+        'window_id': f'@{index}',
+        'window_active': active,
+        'window_panes': str(panes),
+        'window_layout': layout,
+        'window_activity': '1700000000',
+        'pane_id': f'%{index}',
+        'history_size': '0',
+        'history_limit': '2000',
+        'cursor_y': '0',
+        'window_name': name,
+    }
+    return FIELD_SEP.join(values[field] for field in WINDOW_FIELDS)
+
+
+def pane_row(session_name, window_index, pane_index, active, command, panes=2):
+    """Build one list-panes -a output line in PANE_FIELDS order"""
+    values = dict(zip(WINDOW_FIELDS, window_row(session_name, '1', window_index, 'claude', '1', panes=panes).split(FIELD_SEP)))
+    values.update({
+        'pane_id': f'%{window_index * 10 + pane_index}',
+        'history_size': str(100 * pane_index),
+        'pane_index': str(pane_index),
+        'pane_active': active,
+        'pane_pid': str(4000 + pane_index),
+        'pane_width': '80',
+        'pane_height': '24',
+        'pane_current_command': command,
+    })
+    return FIELD_SEP.join(values[field] for field in PANE_FIELDS)
@@ -0,0 +1,201 @@
+
+import unittest
+from unittest.mock import patch, MagicMock
+import socket
+import subprocess
+import tempfile
+import threading
+import sys
+import os
+
+import yaml
+
+# Add the parent directory to the Python path to allow importing ai_daemon
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import ai_client
+from ai_daemon import OrchestratorDaemon
+from target_resolver import RESOLVE_FIELDS, ROLE_OPTION, TargetResolver
+from tmux_utils import FIELD_SEP
+
+
+class TestOrchestratorDaemon(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.config_file = os.path.join(self.tmpdir.name, 'ai_config.yml')
+        with open(self.config_file, 'w') as f:
+            yaml.dump({
+                'default_provider': 'claude',
+                'providers': {'gemini': {'options': {}}},
+                'sessions': {'proj:1': {'provider': 'gemini'}},
+                'settings': {'scrollback_index_interval': 0},
+            }, f)
+        self.socket_path = os.path.join(self.tmpdir.name, 'orchestrator.sock')
+        self.daemon = OrchestratorDaemon(self.config_file, self.socket_path)
+
+    def tearDown(self):
+        self.daemon.dispatcher.shutdown()
+        self.tmpdir.cleanup()
+
+    @patch('subprocess.run')
+    @patch('time.sleep')
+    def test_send_request(self, mock_sleep, mock_subprocess_run):
+        reply = self.daemon.handle_request({'op': 'send', 'target': 'proj:0', 'message': 'hello'})
+
+        self.assertTrue(reply['ok'])
+        self.assertEqual(reply['provider'], 'claude')
+        self.assertEqual(mock_subprocess_run.call_args_list[0].args[0][-1], 'hello')
+
+    @patch('subprocess.run')
+    @patch('time.sleep')
+    def test_send_uses_session_provider_and_reports_failure(self, mock_sleep, mock_subprocess_run):
+        mock_subprocess_run.side_effect = subprocess.CalledProcessError(1, 'tmux')
+        reply = self.daemon.handle_request({'op': 'send', 'target': 'proj:1', 'message': 'hi'})
+
+        self.assertFalse(reply['ok'])
+        self.assertEqual(reply['provider'], 'gemini')
+        self.assertIn('proj:1', reply['error'])
+
+    @patch('subprocess.run')
+    @patch('time.sleep')
+    def test_send_to_role_and_pane_id(self, mock_sleep, mock_subprocess_run):
+        row = FIELD_SEP.join({'session_name': 'proj', 'window_index': '1', 'window_id': '@1', 'pane_id': '%7',
+                              ROLE_OPTION: 'reviewer', 'window_name': 'agent'}[field] for field in RESOLVE_FIELDS)
+        self.daemon.orchestrator._resolver = TargetResolver(
+            run=lambda args: row + '\n' if args[0] == 'list-windows' else '', install_hooks=False)
+
+        for target in ('role=reviewer', '%7', 'proj:agent'):
+            reply = self.daemon.handle_request({'op': 'send', 'target': target, 'message': 'hi'})
+            self.assertTrue(reply['ok'], reply)
+        commands = [call.args[0] for call in mock_subprocess_run.call_args_list]
+        self.assertEqual({command[3] for command in commands}, {'%7'})
+        # The provider configured for proj:1
+        self.assertIn('gemini', commands[0][-1])
+
+    def test_bad_requests(self):
+        self.assertFalse(self.daemon.handle_request({'op': 'send', 'target': 'proj:0'})['ok'])
+        self.assertFalse(self.daemon.handle_request({'op': 'send', 'target': 'p:0', 'message': 'x',
+                                                     'provider': 'nope'})['ok'])
+        self.assertFalse(self.daemon.handle_request({'op': 'explode'})['ok'])
+
+    def test_metrics_request(self):
+        reply = self.daemon.handle_request({'op': 'metrics'})
+        self.assertTrue(reply['ok'])
+        self.assertEqual(reply['metrics']['orchestrator_send_seconds']['type'], 'histogram')
+
+    def test_search_request(self):
+        self.daemon.index = MagicMock()
+        self.daemon.index.search.return_value = []
+        self.daemon._index_refreshed = float('inf')
+
+        reply = self.daemon.handle_request({'op': 'search', 'query': 'ECONNREFUSED', 'target': 'proj',
+                                            'since': 100.0})
+
+        self.assertEqual(reply, {'ok': True, 'hits': []})
+        self.daemon.index.search.assert_called_once_with('ECONNREFUSED', since=100.0, until=None,
+                                                         target='proj', limit=100)
+        self.assertFalse(self.daemon.handle_request({'op': 'search'})['ok'])
+
+    def test_index_refreshed_in_background(self):
+        self.daemon.index = MagicMock()
+        refreshed = threading.Event()
+        self.daemon.index.refresh.side_effect = lambda orchestrator: refreshed.set()
+
+        with patch.object(self.daemon, '_index_interval', return_value=0.01):
+            indexer = threading.Thread(target=self.daemon._run_indexer, daemon=True)
+            indexer.start()
+            try:
+                # Refreshes come without any search request
+                self.assertTrue(refreshed.wait(5))
+                refreshed.clear()
+                self.assertTrue(refreshed.wait(5))
+            finally:
+                self.daemon._index_stop.set()
+                indexer.join(timeout=5)
+        self.assertFalse(indexer.is_alive())
+
+    def test_reloads_changed_config(self):
+        with open(self.config_file, 'w') as f:
+            yaml.dump({'default_provider': 'gemini', 'providers': {}, 'sessions': {}}, f)
+        os.utime(self.config_file, (0, 1))
+        self.daemon.dispatcher = MagicMock()
+        self.daemon.dispatcher.submit.return_value.result.return_value = MagicMock(success=True, send_seconds=0.1)
+
+        reply = self.daemon.handle_request({'op': 'send', 'target': 'other:0', 'message': 'hi'})
+
+        self.assertEqual(reply['provider'], 'gemini')
+        self.assertEqual(self.daemon.dispatcher.orchestrator, self.daemon.orchestrator)
+
+    def test_socket_round_trip(self):
+        server = threading.Thread(target=self.daemon.serve_forever, daemon=True)
+        server.start()
+        try:
+            for _ in range(100):
+                if os.path.exists(self.socket_path):
+                    break
+                threading.Event().wait(0.01)
+            reply = ai_client.request({'op': 'ping'}, self.socket_path)
+            self.assertEqual(reply, {'ok': True, 'pid': os.getpid()})
+            self.assertEqual(os.stat(self.socket_path).st_mode & 0o777, 0o600)
+        finally:
+            self.daemon.shutdown()
+            server.join(timeout=5)
+        self.assertFalse(os.path.exists(self.socket_path))
+
+
+class TestAIClient(unittest.TestCase):
+
+    def test_no_daemon_returns_none(self):
+        self.assertIsNone(ai_client.send_message('proj:0', 'hi', socket_path='/nonexistent/orchestrator.sock'))
+
+    @patch('ai_client.send_message', return_value=None)
+    def test_falls_back_to_in_process_send(self, mock_send):
+        with patch('ai_provider.main') as mock_provider_main:
+            ai_client.main(['ai_client.py', 'proj:0', 'hi'])
+        mock_provider_main.assert_called_once_with(['ai_client.py', 'proj:0', 'hi'])
+
+    def test_reply_missing_after_request_taken(self):
+        # The daemon read the request and went away before replying
+        with tempfile.TemporaryDirectory() as tmpdir:
+            socket_path = os.path.join(tmpdir, 'orchestrator.sock')
+            listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            listener.bind(socket_path)
+            listener.listen(1)
+
+            def take_request():
+                conn, _ = listener.accept()
+                conn.makefile('rb').readline()
+                conn.close()
+
+            server = threading.Thread(target=take_request, daemon=True)
+            server.start()
+            try:
+                with self.assertRaises(ConnectionError):
+                    ai_client.send_message('proj:0', 'hi', socket_path=socket_path)
+            finally:
+                server.join(timeout=5)
+                listener.close()
+
+    @patch('ai_client.send_message', side_effect=socket.timeout('timed out'))
+    def test_no_fallback_once_daemon_took_request(self, mock_send):
+        with patch('ai_provider.main') as mock_provider_main, patch('builtins.print'), \
+                self.assertRaises(SystemExit) as cm:
+            ai_client.main(['ai_client.py', 'proj:0', 'hi'])
+        self.assertEqual(cm.exception.code, 1)
+        mock_provider_main.assert_not_called()
+
+    @patch('ai_client.send_message', return_value={'ok': True, 'provider': 'claude'})
+    def test_daemon_success_exit_code(self, mock_send):
+        with self.assertRaises(SystemExit) as cm:
+            ai_client.main(['ai_client.py', 'proj:0', 'hi', 'claude'])
+        self.assertEqual(cm.exception.code, 0)
+        mock_send.assert_called_once_with('proj:0', 'hi', 'claude')
+
+    def test_default_socket_path_override(self):
+        with patch.dict(os.environ, {'AI_ORCHESTRATOR_SOCKET': '/tmp/custom.sock'}):
+            self.assertEqual(ai_client.default_socket_path(), '/tmp/custom.sock')
+
+
+if __name__ == '__main__':
+    unittest.main()
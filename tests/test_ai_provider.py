@@ -4,12 +4,15 @@ from unittest.mock import patch, MagicMock, mock_open
 import yaml
 import sys
 import os
+import shutil
 import subprocess
+import tempfile
 
 # Add the parent directory to the Python path to allow importing ai_provider
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
-from ai_provider import AIOrchestrator, AIProvider, AIConfig
+import event_log
+from ai_provider import AIOrchestrator, AIProvider, AIConfig, config_cache_path
 
 class TestAIOrchestrator(unittest.TestCase):
 
@@ -31,9 +34,12 @@ class TestAIOrchestrator(unittest.TestCase):
             yaml.dump(self.config_data, f)
 
     def tearDown(self):
-        # Remove the dummy config file
-        if os.path.exists(self.config_file):
-            os.remove(self.config_file)
+        # Remove the dummy config file and its compiled cache
+        for path in (self.config_file, config_cache_path(self.config_file)):
+            if os.path.exists(path):
+                os.remove(path)
+        # main() loads ai_config.yml, which turns on the event log
+        event_log.close()
 
     def test_load_config(self):
         orchestrator = AIOrchestrator(config_file=self.config_file)
@@ -69,6 +75,55 @@ class TestAIOrchestrator(unittest.TestCase):
         orchestrator.send_message_gemini('session1', 0, 'Hello Gemini')
         self.assertEqual(mock_subprocess_run.call_count, 2)
 
+    @patch('subprocess.run')
+    def test_send_message_waits_for_readiness(self, mock_subprocess_run):
+        self.config_data['settings'] = {'readiness': {'enabled': True}}
+        with open(self.config_file, 'w') as f:
+            yaml.dump(self.config_data, f)
+        orchestrator = AIOrchestrator(config_file=self.config_file)
+        orchestrator.readiness = MagicMock()
+        orchestrator.readiness.wait_until_ready.return_value = True
+        orchestrator.readiness.wait_for_echo.return_value = True
+
+        self.assertTrue(orchestrator.send_message_claude('session1', 0, 'Hello Claude'))
+        orchestrator.readiness.wait_until_ready.assert_called_once_with('session1:0', 'claude')
+        orchestrator.readiness.wait_for_echo.assert_called_once_with('session1:0', 'Hello Claude')
+        self.assertEqual(mock_subprocess_run.call_count, 2)
+
+    @patch('subprocess.run')
+    def test_send_message_not_ready_fails_when_configured(self, mock_subprocess_run):
+        self.config_data['settings'] = {'readiness': {'enabled': True, 'timeout_action': 'fail'}}
+        with open(self.config_file, 'w') as f:
+            yaml.dump(self.config_data, f)
+        orchestrator = AIOrchestrator(config_file=self.config_file)
+        orchestrator.readiness = MagicMock(timeout=1)
+        orchestrator.readiness.wait_until_ready.return_value = False
+
+        self.assertFalse(orchestrator.send_message_gemini('session1', 0, 'Hello Gemini'))
+        mock_subprocess_run.assert_not_called()
+
+    @patch('time.sleep')
+    @patch('subprocess.run')
+    def test_send_message_pastes_bulk_text(self, mock_subprocess_run, mock_sleep):
+        orchestrator = AIOrchestrator(config_file=self.config_file)
+        briefing = '# Spec\n\nUse `$HOME` and "quotes"; keep it exact.\n' * 40
+        self.assertTrue(orchestrator.send_message_claude('session1', 0, briefing))
+
+        load, paste, enter = [call.args[0] for call in mock_subprocess_run.call_args_list]
+        self.assertEqual(load[:3], ['tmux', 'load-buffer', '-b'])
+        self.assertEqual(load[-1], '-')
+        self.assertEqual(mock_subprocess_run.call_args_list[0].kwargs['input'], briefing.encode('utf-8'))
+        self.assertEqual(paste[:3], ['tmux', 'paste-buffer', '-p'])
+        self.assertIn(load[3], paste)
+        self.assertEqual(enter, ['tmux', 'send-keys', '-t', 'session1:0', 'Enter'])
+
+    @patch('subprocess.run')
+    def test_send_message_gemini_quotes_message(self, mock_subprocess_run):
+        orchestrator = AIOrchestrator(config_file=self.config_file)
+        orchestrator.send_message_gemini('session1', 0, "it's $(rm -rf ~) time")
+        self.assertEqual(mock_subprocess_run.call_args_list[0].args[0][-1],
+                         "gemini -p 'it'\"'\"'s $(rm -rf ~) time'")
+
     @patch.object(AIOrchestrator, 'send_message_claude', return_value=True)
     def test_send_message_dispatcher_claude(self, mock_send_message_claude):
         orchestrator = AIOrchestrator(config_file=self.config_file)
@@ -132,6 +187,63 @@ class TestAIOrchestrator(unittest.TestCase):
         orchestrator = AIOrchestrator(config_file=self.config_file)
         self.assertEqual(orchestrator.config['default_provider'], 'claude')
 
+    def test_config_cache(self):
+        AIOrchestrator(config_file=self.config_file)
+        self.assertTrue(os.path.exists(config_cache_path(self.config_file)))
+
+        # A warm cache is used without parsing YAML
+        with patch('ai_provider.parse_yaml') as mock_parse:
+            orchestrator = AIOrchestrator(config_file=self.config_file)
+        mock_parse.assert_not_called()
+        self.assertEqual(orchestrator.config, self.config_data)
+
+        # Editing the YAML invalidates it, even with the same size and mtime
+        stat = os.stat(self.config_file)
+        with open(self.config_file) as f:
+            edited = f.read().replace('gemini', 'claude', 1)
+        with open(self.config_file, 'w') as f:
+            f.write(edited)
+        os.utime(self.config_file, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+        orchestrator = AIOrchestrator(config_file=self.config_file)
+        self.assertEqual(orchestrator.config['default_provider'], 'claude')
+
+    def test_corrupt_config_cache_is_ignored(self):
+        AIOrchestrator(config_file=self.config_file)
+        with open(config_cache_path(self.config_file), 'wb') as f:
+            f.write(b'not marshal data')
+        self.assertEqual(AIOrchestrator(config_file=self.config_file).config, self.config_data)
+
+    def test_save_config_refreshes_cache(self):
+        orchestrator = AIOrchestrator(config_file=self.config_file)
+        orchestrator.configure_session('session3', 2, AIProvider.GEMINI)
+        with patch('ai_provider.parse_yaml') as mock_parse:
+            reloaded = AIOrchestrator(config_file=self.config_file)
+        mock_parse.assert_not_called()
+        self.assertEqual(reloaded.config['sessions']['session3:2']['provider'], 'gemini')
+
+    def test_import_is_lean(self):
+        # Guards cold start: with a warm config cache, importing ai_provider
+        # and loading the shipped config (readiness enabled) must not import
+        # yaml, dataclasses or asyncio, and should stay fast
+        repo = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        config_file = shutil.copy(os.path.join(repo, 'ai_config.yml'), tmp.name)
+        self.assertIsNotNone(AIOrchestrator(config_file=config_file).readiness)
+        event_log.close()
+        script = (
+            "import sys, time\n"
+            "start = time.perf_counter()\n"
+            "import ai_provider\n"
+            "ai_provider.AIOrchestrator(sys.argv[1])\n"
+            "elapsed = time.perf_counter() - start\n"
+            "print(elapsed, ','.join(m for m in ('yaml', 'dataclasses', 'asyncio') if m in sys.modules))\n"
+        )
+        output = subprocess.run([sys.executable, '-c', script, config_file],
+                                capture_output=True, text=True, check=True, cwd=repo).stdout.split()
+        self.assertEqual(output[1:], [])
+        self.assertLess(float(output[0]), 0.2)
+
     @patch('subprocess.run', side_effect=subprocess.CalledProcessError(1, 'cmd'))
     def test_send_message_claude_error(self, mock_subprocess_run):
         orchestrator = AIOrchestrator(config_file=self.config_file)
@@ -165,6 +277,16 @@ from ai_provider import main
 
 class TestAIProviderMain(unittest.TestCase):
 
+    def setUp(self):
+        # main() loads the shipped ai_config.yml, whose log_commands would
+        # append these sends to ai_orchestrator.log
+        patcher = patch.object(AIOrchestrator, '_open_event_log', return_value=None)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        event_log.close()
+
     @patch('ai_provider.AIOrchestrator')
     def test_main_success(self, MockAIOrchestrator):
         # Mock the orchestrator instance and its send_message method
@@ -180,9 +302,18 @@ class TestAIProviderMain(unittest.TestCase):
             main(['ai_provider.py', 'session1:0', 'Hello', 'unknown'])
         self.assertEqual(cm.exception.code, 1)
 
-    def test_main_invalid_session_format(self):
+    @patch('ai_provider.AIOrchestrator')
+    def test_main_without_provider(self, MockAIOrchestrator):
+        # Like ai_client.py: the provider is optional and a window name is a target
+        MockAIOrchestrator.return_value.send_message.return_value = True
         with self.assertRaises(SystemExit) as cm:
             main(['ai_provider.py', 'session1', 'Hello'])
+        self.assertEqual(cm.exception.code, 0)
+        MockAIOrchestrator.return_value.send_message.assert_called_once_with('session1', None, 'Hello', None)
+
+    def test_main_missing_message(self):
+        with self.assertRaises(SystemExit) as cm:
+            main(['ai_provider.py', 'session1:0'])
         self.assertEqual(cm.exception.code, 1)
 
     def test_main_not_enough_args(self):
@@ -0,0 +1,253 @@
+
+import unittest
+from unittest.mock import patch, MagicMock, AsyncMock
+import asyncio
+import re
+import subprocess
+import sys
+import os
+
+# Add the parent directory to the Python path to allow importing async_tmux
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from async_tmux import AsyncAIOrchestrator, AsyncTmuxOrchestrator, paste_text_async, run_tmux_async
+from ai_provider import AIOrchestrator, AIProvider
+import metrics
+from readiness import ReadinessDetector, ReadinessPatterns
+from helpers import pane_row, window_row
+
+
+def fake_process(stdout='', returncode=0):
+    proc = MagicMock(returncode=returncode)
+    proc.communicate = AsyncMock(return_value=(stdout.encode(), b'error' if returncode else b''))
+    return proc
+
+
+class TestRunTmuxAsync(unittest.IsolatedAsyncioTestCase):
+
+    @patch('asyncio.create_subprocess_exec')
+    async def test_returns_stdout(self, mock_exec):
+        mock_exec.return_value = fake_process('out\n')
+        self.assertEqual(await run_tmux_async(['list-sessions']), 'out\n')
+        self.assertEqual(mock_exec.call_args[0], ('tmux', 'list-sessions'))
+
+    @patch('asyncio.create_subprocess_exec')
+    async def test_failure_raises_called_process_error(self, mock_exec):
+        mock_exec.return_value = fake_process(returncode=1)
+        with self.assertRaises(subprocess.CalledProcessError):
+            await run_tmux_async(['kill-window', '-t', 'nope:0'])
+
+    @patch('asyncio.create_subprocess_exec')
+    async def test_uses_backend(self, mock_exec):
+        backend = MagicMock()
+        backend.run.return_value = 'from control mode\n'
+        self.assertEqual(await run_tmux_async(['list-sessions'], backend=backend), 'from control mode\n')
+        mock_exec.assert_not_called()
+
+
+class TestPasteTextAsync(unittest.IsolatedAsyncioTestCase):
+
+    @patch('asyncio.create_subprocess_exec')
+    async def test_failed_paste_deletes_buffer(self, mock_exec):
+        mock_exec.side_effect = [fake_process(), fake_process(returncode=1), fake_process()]
+
+        with self.assertRaises(subprocess.CalledProcessError):
+            await paste_text_async('s:0', 'text', server_args=['-L', 'rvb'])
+
+        load, paste, delete = [call[0] for call in mock_exec.call_args_list]
+        name = load[5]
+        self.assertTrue(name.startswith(f'orchestrator-{os.getpid()}-'))
+        self.assertEqual(paste, ('tmux', '-L', 'rvb', 'paste-buffer', '-p', '-d', '-b', name, '-t', 's:0'))
+        self.assertEqual(delete, ('tmux', '-L', 'rvb', 'delete-buffer', '-b', name))
+
+
+class TestAsyncTmuxOrchestrator(unittest.IsolatedAsyncioTestCase):
+
+    @patch('asyncio.create_subprocess_exec')
+    async def test_get_tmux_sessions(self, mock_exec):
+        mock_exec.return_value = fake_process('\n'.join([
+            window_row('session1', '1', 0, 'window1', '1'),
+            window_row('session2', '0', 0, 'window2', '1'),
+        ]) + '\n')
+
+        sessions = await AsyncTmuxOrchestrator().get_tmux_sessions()
+
+        self.assertEqual([s.name for s in sessions], ['session1', 'session2'])
+        self.assertTrue(sessions[0].attached)
+        self.assertEqual(sessions[1].windows[0].window_name, 'window2')
+
+    @patch('asyncio.create_subprocess_exec')
+    async def test_get_all_windows_status_runs_concurrently(self, mock_exec):
+        in_flight = 0
+        peak = 0
+
+        async def capture(*args, **kwargs):
+            nonlocal in_flight, peak
+            if args[1] == 'list-windows':
+                return fake_process('\n'.join(window_row('s', '1', i, f'w{i}', '0') for i in range(4)) + '\n')
+            in_flight += 1
+            peak = max(peak, in_flight)
+            await asyncio.sleep(0.01)
+            in_flight -= 1
+            return fake_process(f'content of {args[3]}\n')
+
+        mock_exec.side_effect = capture
+        status = await AsyncTmuxOrchestrator().get_all_windows_status(max_workers=2)
+
+        windows = status['sessions'][0]['windows']
+        self.assertEqual([w['info']['content'] for w in windows],
+                         [f'content of s:{i}\n' for i in range(4)])
+        self.assertEqual(peak, 2)
+
+    @patch('asyncio.create_subprocess_exec')
+    async def test_get_all_windows_status_timeout(self, mock_exec):
+        async def capture(*args, **kwargs):
+            if args[1] == 'list-windows':
+                return fake_process(window_row('s', '1', 0, 'slow', '1') + '\n')
+            await asyncio.sleep(1)
+            return fake_process('late\n')
+
+        mock_exec.side_effect = capture
+        status = await AsyncTmuxOrchestrator().get_all_windows_status(timeout=0.05)
+
+        info = status['sessions'][0]['windows'][0]['info']
+        self.assertTrue(info['timed_out'])
+        self.assertEqual(info['name'], 'slow')
+
+    @patch('asyncio.create_subprocess_exec')
+    async def test_get_all_windows_status_with_panes(self, mock_exec):
+        listing = '\n'.join([
+            pane_row('api', 0, 0, '0', 'npm'),
+            pane_row('api', 0, 1, '1', 'claude'),
+            pane_row('api', 1, 0, '1', 'bash', panes=1),
+        ]) + '\n'
+        mock_exec.side_effect = lambda *args, **kwargs: fake_process(
+            listing if args[1] == 'list-panes' else f'output of {args[3]}\n')
+        orchestrator = AsyncTmuxOrchestrator()
+        orchestrator.orchestrator.capture_cache = None
+
+        status = await orchestrator.get_all_windows_status(include_panes=True)
+
+        split, single = [window['info'] for window in status['sessions'][0]['windows']]
+        self.assertEqual([(pane['id'], pane['command'], pane['content']) for pane in split['pane_details']],
+                         [('%0', 'npm', 'output of %0\n'), ('%1', 'claude', 'output of api:0\n')])
+        self.assertNotIn('pane_details', single)
+        # The active pane's window capture is reused rather than captured twice
+        self.assertEqual(mock_exec.call_count, 4)
+        self.assertEqual(metrics.WINDOWS.value(), 2)
+
+    @patch('asyncio.create_subprocess_exec')
+    async def test_capture_reuses_sync_cache(self, mock_exec):
+        mock_exec.return_value = fake_process(window_row('s', '1', 0, 'w', '1') + '\n')
+        orchestrator = AsyncTmuxOrchestrator()
+        window = (await orchestrator.get_tmux_sessions())[0].windows[0]
+
+        mock_exec.return_value = fake_process('captured\n')
+        first = await orchestrator.capture_window_content('s', 0, window=window)
+        second = await orchestrator.capture_window_content('s', 0, window=window)
+
+        self.assertEqual(first, second)
+        self.assertEqual(mock_exec.call_count, 2)
+        self.assertEqual(orchestrator.orchestrator.capture_cache.hits, 1)
+
+
+class TestAsyncAIOrchestrator(unittest.IsolatedAsyncioTestCase):
+
+    def make_orchestrator(self):
+        sync = AIOrchestrator.__new__(AIOrchestrator)
+        sync.config = {
+            'default_provider': 'claude',
+            'providers': {'gemini': {'options': {'model': 'gemini-pro'}}},
+            'sessions': {'s:1': {'provider': 'gemini'}},
+        }
+        sync.backend = None
+        sync.server_args = []
+        sync.servers = {}
+        sync.readiness = None
+        sync.registry = None
+        return AsyncAIOrchestrator(orchestrator=sync)
+
+    @patch('asyncio.sleep', new_callable=AsyncMock)
+    @patch('asyncio.create_subprocess_exec')
+    async def test_send_message_uses_session_provider(self, mock_exec, mock_sleep):
+        mock_exec.return_value = fake_process()
+
+        self.assertTrue(await self.make_orchestrator().send_message('s', 1, 'hello'))
+
+        typed = mock_exec.call_args_list[0][0]
+        self.assertEqual(typed[:4], ('tmux', 'send-keys', '-t', 's:1'))
+        self.assertEqual(typed[4], '-l')
+        self.assertIn('-m gemini-pro', typed[-1])
+        self.assertEqual(mock_exec.call_args_list[1][0][-1], 'Enter')
+        mock_sleep.assert_awaited_once()
+
+    @patch('asyncio.create_subprocess_exec')
+    async def test_send_messages_concurrently(self, mock_exec):
+        mock_exec.return_value = fake_process()
+        orchestrator = self.make_orchestrator()
+
+        with patch('async_tmux.SEND_SETTLE_DELAY', 0.05):
+            start = asyncio.get_running_loop().time()
+            results = await orchestrator.send_messages([('s', i, 'hi') for i in range(10)])
+            elapsed = asyncio.get_running_loop().time() - start
+
+        self.assertEqual(results, [True] * 10)
+        # The settle delays overlap instead of adding up
+        self.assertLess(elapsed, 0.4)
+
+    @patch('asyncio.create_subprocess_exec')
+    async def test_send_messages_keep_order_per_window(self, mock_exec):
+        mock_exec.return_value = fake_process()
+        orchestrator = self.make_orchestrator()
+
+        with patch('async_tmux.SEND_SETTLE_DELAY', 0.02):
+            results = await orchestrator.send_messages([('s', 0, 'first'), ('s', 1, 'other'), ('s', 0, 'second')])
+
+        self.assertEqual(results, [True] * 3)
+        to_window_0 = [call[0][-1] for call in mock_exec.call_args_list if call[0][3] == 's:0']
+        # Each message is typed and entered before the next one starts
+        self.assertEqual(to_window_0, ['first', 'Enter', 'second', 'Enter'])
+
+    @patch('asyncio.sleep', new_callable=AsyncMock)
+    @patch('asyncio.create_subprocess_exec')
+    async def test_send_message_pastes_bulk_text(self, mock_exec, mock_sleep):
+        mock_exec.return_value = fake_process()
+        briefing = 'line one\nline two $HOME "quoted"\n' * 50
+
+        self.assertTrue(await self.make_orchestrator().send_message('s', 0, briefing, AIProvider.CLAUDE))
+
+        load, paste, enter = [call[0] for call in mock_exec.call_args_list]
+        self.assertEqual(load[:4], ('tmux', 'load-buffer', '-b', load[3]))
+        self.assertEqual(mock_exec.return_value.communicate.await_args_list[0][0][0], briefing.encode())
+        self.assertEqual(paste[1:3], ('paste-buffer', '-p'))
+        self.assertIn(load[3], paste)
+        self.assertEqual(enter[-1], 'Enter')
+
+    @patch('asyncio.sleep', new_callable=AsyncMock)
+    @patch('asyncio.create_subprocess_exec')
+    async def test_send_message_polls_readiness_with_asyncio(self, mock_exec, mock_sleep):
+        busy, ready, echoed = 'Thinking...\n0\n', '> \n0\n', '> hi\n0\n'
+        mock_exec.side_effect = [fake_process(busy), fake_process(ready), fake_process(ready),
+                                 fake_process(), fake_process(echoed), fake_process()]
+        orchestrator = self.make_orchestrator()
+        orchestrator.orchestrator.readiness = ReadinessDetector(
+            {'claude': ReadinessPatterns(prompt=[re.compile(r'^> ')], busy=[re.compile('Thinking')])})
+
+        with patch('time.sleep') as mock_time_sleep:
+            self.assertTrue(await orchestrator.send_message('s', 0, 'hi', AIProvider.CLAUDE))
+
+        commands = [call[0][1] for call in mock_exec.call_args_list]
+        self.assertEqual(commands, ['capture-pane'] * 3 + ['send-keys', 'capture-pane', 'send-keys'])
+        self.assertEqual(mock_exec.call_args_list[-1][0][-1], 'Enter')
+        self.assertEqual(mock_sleep.await_count, 2)
+        mock_time_sleep.assert_not_called()
+
+    @patch('asyncio.sleep', new_callable=AsyncMock)
+    @patch('asyncio.create_subprocess_exec')
+    async def test_send_message_error(self, mock_exec, mock_sleep):
+        mock_exec.return_value = fake_process(returncode=1)
+        self.assertFalse(await self.make_orchestrator().send_message('s', 0, 'hi', AIProvider.CLAUDE))
+
+
+if __name__ == '__main__':
+    unittest.main()
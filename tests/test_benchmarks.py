@@ -0,0 +1,54 @@
+
+import unittest
+import sys
+import os
+
+# Add the benchmarks directory to the Python path to allow importing run_benchmarks
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'benchmarks')))
+
+from memory_benchmark import run as run_memory_benchmark
+from run_benchmarks import compare, parse_scale, percentile, summarize
+
+
+class TestBenchmarkHelpers(unittest.TestCase):
+
+    def test_parse_scale(self):
+        self.assertEqual(parse_scale('100x10'), (100, 10))
+        self.assertEqual(parse_scale('3'), (3, 1))
+        with self.assertRaises(ValueError):
+            parse_scale('many')
+
+    def test_summarize_percentiles(self):
+        summary = summarize([0.004, 0.001, 0.003, 0.002, 0.005])
+        self.assertEqual(summary['iterations'], 5)
+        self.assertEqual((summary['min'], summary['max']), (0.001, 0.005))
+        self.assertAlmostEqual(summary['p50'], 0.003)
+        self.assertAlmostEqual(summary['p90'], 0.0046)
+        self.assertAlmostEqual(summary['ops_per_sec'], 1 / 0.003)
+        self.assertEqual(percentile([], 0.5), 0.0)
+
+    def test_compare_flags_p50_regressions(self):
+        def results(p50s):
+            return {'results': {'10x5': {'operations': {name: {'p50': p50} for name, p50 in p50s.items()}}}}
+
+        baseline = results({'capture': 0.010, 'list': 0.001, 'send': 0.020})
+        # list is 100% slower but only by a millisecond; new has no baseline
+        current = results({'capture': 0.020, 'list': 0.002, 'send': 0.021, 'new': 1.0})
+        [regression] = compare(current, baseline, tolerance=0.25)
+        self.assertTrue(regression.startswith('10x5 capture: p50 20.0ms vs baseline 10.0ms'))
+
+    def test_memory_benchmark_reports_per_window_bytes(self):
+        results = run_memory_benchmark(windows=20, lines=100)
+        self.assertGreater(results['model_bytes_per_window'], 0)
+        self.assertGreater(results['model_with_panes_bytes_per_window'], results['model_bytes_per_window'])
+        for kind in ('ascii', 'mixed'):
+            # Captures are held once, shared by the status and the cache
+            self.assertLess(results[f'{kind}_status_bytes_per_window'],
+                            1.5 * results[f'{kind}_capture_str_bytes_per_window'])
+        # Box drawing makes a str 2 bytes per character
+        self.assertLess(results['ascii_capture_str_bytes_per_window'],
+                        0.6 * results['mixed_capture_str_bytes_per_window'])
+
+
+if __name__ == '__main__':
+    unittest.main()
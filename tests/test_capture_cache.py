@@ -0,0 +1,59 @@
+import unittest
+import os
+import sys
+
+# Add the parent directory to the Python path to allow importing capture_cache
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from capture_cache import CaptureCache
+
+
+class TestCaptureCache(unittest.TestCase):
+
+    def test_hit_requires_same_validator(self):
+        cache = CaptureCache()
+        cache.put(('%1', 50), (100, 0, 5), 'content')
+
+        self.assertEqual(cache.get(('%1', 50), (100, 0, 5)), 'content')
+        self.assertIsNone(cache.get(('%1', 50), (101, 0, 5)))
+        self.assertIsNone(cache.get(('%2', 50), (100, 0, 5)))
+        self.assertEqual(cache.hits, 1)
+        self.assertEqual(cache.misses, 2)
+
+    def test_lru_eviction(self):
+        cache = CaptureCache(max_entries=2)
+        cache.put('a', 1, 'A')
+        cache.put('b', 1, 'B')
+        cache.get('a', 1)
+        cache.put('c', 1, 'C')
+
+        # 'b' was least recently used
+        self.assertIsNone(cache.get('b', 1))
+        self.assertEqual(cache.get('a', 1), 'A')
+        self.assertEqual(cache.get('c', 1), 'C')
+        self.assertEqual(cache.evictions, 1)
+        self.assertEqual(len(cache), 2)
+
+    def test_invalidate(self):
+        cache = CaptureCache()
+        cache.put('a', 1, 'A')
+        cache.put('b', 1, 'B')
+        cache.invalidate('a')
+        self.assertIsNone(cache.get('a', 1))
+        cache.invalidate()
+        self.assertEqual(len(cache), 0)
+
+    def test_stats(self):
+        cache = CaptureCache(max_entries=4)
+        cache.put('a', 1, 'A')
+        cache.get('a', 1)
+        cache.get('a', 2)
+        stats = cache.stats()
+        self.assertEqual(stats['entries'], 1)
+        self.assertEqual(stats['hits'], 1)
+        self.assertEqual(stats['misses'], 1)
+        self.assertEqual(stats['hit_rate'], 0.5)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,82 @@
+
+import unittest
+from unittest.mock import MagicMock
+import threading
+import time
+import sys
+import os
+
+# Add the parent directory to the Python path to allow importing dispatch
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from dispatch import MessageDispatcher, DispatchResult
+
+
+def slow_orchestrator(delay=0.05, log=None):
+    """An AIOrchestrator stand-in whose send_message takes `delay` seconds"""
+    orchestrator = MagicMock()
+    lock = threading.Lock()
+
+    def send_message(session_name, window_index, message, provider=None):
+        time.sleep(delay)
+        if log is not None:
+            with lock:
+                log.append((f"{session_name}:{window_index}", message))
+        return True
+
+    orchestrator.send_message.side_effect = send_message
+    return orchestrator
+
+
+class TestMessageDispatcher(unittest.TestCase):
+
+    def test_fifo_within_target(self):
+        log = []
+        with MessageDispatcher(slow_orchestrator(0.01, log)) as dispatcher:
+            futures = [dispatcher.submit('s', 0, f'm{i}') for i in range(5)]
+            results = [future.result() for future in futures]
+
+        self.assertEqual([message for _, message in log], [f'm{i}' for i in range(5)])
+        # Each message started after the previous one to the same window finished
+        for earlier, later in zip(results, results[1:]):
+            self.assertGreaterEqual(later.started_at, earlier.finished_at)
+
+    def test_targets_overlap(self):
+        with MessageDispatcher(slow_orchestrator(0.1)) as dispatcher:
+            start = time.monotonic()
+            futures = dispatcher.broadcast([('s', i) for i in range(10)], 'hello')
+            results = [future.result() for future in futures]
+            elapsed = time.monotonic() - start
+
+        self.assertTrue(all(isinstance(r, DispatchResult) and r.success for r in results))
+        self.assertEqual([r.target for r in results], [f's:{i}' for i in range(10)])
+        # Ten sends of 0.1s each, run side by side
+        self.assertLess(elapsed, 0.5)
+
+    def test_failure_and_exception_outcomes(self):
+        orchestrator = MagicMock()
+        orchestrator.send_message.side_effect = [False, RuntimeError('boom')]
+        with MessageDispatcher(orchestrator) as dispatcher:
+            failed = dispatcher.submit('s', 0, 'a').result()
+            raised = dispatcher.submit('s', 0, 'b').result()
+
+        self.assertFalse(failed.success)
+        self.assertIsNone(failed.error)
+        self.assertFalse(raised.success)
+        self.assertEqual(raised.error, 'boom')
+
+    def test_timing_and_pending(self):
+        with MessageDispatcher(slow_orchestrator(0.05)) as dispatcher:
+            first = dispatcher.submit('s', 0, 'a')
+            second = dispatcher.submit('s', 0, 'b')
+            self.assertEqual(dispatcher.pending(), {'s:0': 2})
+            result = second.result()
+            first.result()
+
+        self.assertGreaterEqual(result.wait_seconds, 0.04)
+        self.assertGreaterEqual(result.send_seconds, 0.04)
+        self.assertEqual(dispatcher.pending(), {})
+
+
+if __name__ == '__main__':
+    unittest.main()
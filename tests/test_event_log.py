@@ -0,0 +1,183 @@
+
+import unittest
+from unittest.mock import patch, MagicMock
+import json
+import subprocess
+import tempfile
+import time
+import sys
+import os
+
+import yaml
+
+# Add the parent directory to the Python path to allow importing event_log
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import event_log
+from event_log import EventLog, log_files, parse_time, read_events
+from ai_provider import AIOrchestrator, AIProvider
+from tmux_control import paste_text, run_tmux
+
+
+class EventLogTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmpdir.name, 'orchestrator.log')
+
+    def tearDown(self):
+        event_log.close()
+        self.tmpdir.cleanup()
+
+    def read_lines(self, path=None):
+        with open(path or self.path) as f:
+            return [json.loads(line) for line in f]
+
+
+class TestEventLog(EventLogTestCase):
+
+    def test_writes_jsonl_in_background(self):
+        log = EventLog(self.path, flush_interval=60)
+        log.record('send', target='proj:0', provider='claude', bytes=5, duration=0.01, ok=True)
+        # Nothing reaches the disk until the writer runs
+        self.assertFalse(os.path.exists(self.path))
+        self.assertTrue(log.flush())
+        log.close()
+
+        [entry] = self.read_lines()
+        self.assertEqual(entry['event'], 'send')
+        self.assertEqual(entry['target'], 'proj:0')
+        self.assertIn('ts', entry)
+
+    def test_record_does_not_block_and_drops_when_full(self):
+        log = EventLog(self.path, flush_interval=60, max_pending=100)
+        start = time.perf_counter()
+        for i in range(1000):
+            log.record('tmux', command='send-keys', target=f'proj:{i}')
+        self.assertLess(time.perf_counter() - start, 0.1)
+        self.assertEqual(log.dropped, 900)
+        log.close()
+        self.assertEqual(len(self.read_lines()), 100)
+
+    def test_rotates_by_size(self):
+        log = EventLog(self.path, max_bytes=150, backups=2, flush_interval=60)
+        for i in range(8):
+            log.record('tmux', command='send-keys', target=f'proj:{i}', bytes=100)
+            log.flush()
+        log.close()
+
+        self.assertEqual(log_files(self.path), [self.path + '.2', self.path + '.1', self.path])
+        # Two events fit in a file and only two backups are kept
+        targets = [entry['target'] for entry in read_events(self.path)]
+        self.assertEqual(targets, [f'proj:{i}' for i in range(2, 8)])
+
+    def test_rotates_by_age(self):
+        with open(self.path, 'w') as f:
+            f.write(json.dumps({'ts': time.time() - 7200, 'event': 'send', 'target': 'old:0'}) + '\n')
+        log = EventLog(self.path, max_age=3600)
+        log.record('send', target='new:0')
+        log.close()
+
+        self.assertEqual([entry['target'] for entry in self.read_lines(self.path + '.1')], ['old:0'])
+        self.assertEqual([entry['target'] for entry in self.read_lines()], ['new:0'])
+
+    def test_query_filters(self):
+        now = time.time()
+        with open(self.path + '.1', 'w') as f:
+            f.write(json.dumps({'ts': now - 3600, 'event': 'send', 'target': 'proj:0'}) + '\n')
+        with open(self.path, 'w') as f:
+            for ts, event, target in ((now - 60, 'tmux', 'proj:0'), (now - 30, 'send', 'proj:1'),
+                                      (now - 10, 'send', 'project:0')):
+                f.write(json.dumps({'ts': ts, 'event': event, 'target': target}) + '\n')
+
+        self.assertEqual(len(list(read_events(self.path))), 4)
+        self.assertEqual([e['target'] for e in read_events(self.path, target='proj')], ['proj:0', 'proj:0', 'proj:1'])
+        self.assertEqual([e['target'] for e in read_events(self.path, since=now - 120, event='send')],
+                         ['proj:1', 'project:0'])
+        self.assertEqual([e['target'] for e in read_events(self.path, until=now - 45)], ['proj:0', 'proj:0'])
+
+    def test_parse_time(self):
+        self.assertEqual(parse_time('30m', now=10000), 8200)
+        self.assertEqual(parse_time('2h', now=10000), 2800)
+        self.assertEqual(parse_time('2024-01-02T03:04:05'), time.mktime((2024, 1, 2, 3, 4, 5, 0, 0, -1)))
+
+    def test_configure_from_settings(self):
+        config_file = os.path.join(os.path.dirname(self.path), 'ai_config.yml')
+        self.assertIsNone(event_log.configure_from_settings({'log_file': 'events.log'}, config_file))
+        self.assertIsNone(event_log.current())
+
+        log = event_log.configure_from_settings({'log_commands': True, 'log_file': 'events.log', 'log_backups': 2},
+                                                config_file)
+        self.assertIs(log, event_log.current())
+        self.assertEqual((log.path, log.backups), (os.path.join(os.path.dirname(self.path), 'events.log'), 2))
+
+    def test_query_command(self):
+        log = event_log.configure(self.path)
+        log.record('send', target='proj:0', provider='claude', bytes=2, duration=0.05, ok=True)
+        log.record('send', target='other:0', provider='gemini', bytes=2, duration=0.05, ok=False, error='boom')
+        log.flush()
+
+        with patch('builtins.print') as mock_print:
+            event_log.main(['event_log.py', self.path, '--target', 'other', '--since', '5m'])
+        [line] = [call.args[0] for call in mock_print.call_args_list]
+        self.assertIn('other:0', line)
+        self.assertIn('FAILED boom', line)
+
+
+class TestCommandLogging(EventLogTestCase):
+
+    @patch('subprocess.run')
+    def test_run_tmux_records_calls(self, mock_subprocess_run):
+        # Output bytes, not characters: "é" is two bytes in UTF-8
+        mock_subprocess_run.return_value = MagicMock(stdout='lin\u00e9\n')
+        log = event_log.configure(self.path)
+        run_tmux(['capture-pane', '-t', 'proj:0', '-p'])
+        mock_subprocess_run.side_effect = subprocess.CalledProcessError(1, 'tmux')
+        with self.assertRaises(subprocess.CalledProcessError):
+            run_tmux(['send-keys', '-t', 'proj:1', 'Enter'], capture=False)
+        log.flush()
+
+        capture, failure = self.read_lines()
+        self.assertEqual((capture['command'], capture['target'], capture['output_bytes'], capture['ok']),
+                         ('capture-pane', 'proj:0', 6, True))
+        self.assertEqual((failure['command'], failure['target'], failure['ok']), ('send-keys', 'proj:1', False))
+        self.assertIn('error', failure)
+
+    @patch('subprocess.run')
+    def test_paste_records_payload_size(self, mock_subprocess_run):
+        log = event_log.configure(self.path)
+        paste_text('proj:0', 'x' * 1000)
+        log.flush()
+
+        load, paste = self.read_lines()
+        self.assertEqual((load['command'], load['target'], load['bytes']), ('load-buffer', 'proj:0', 1000))
+        self.assertEqual(paste['command'], 'paste-buffer')
+
+    @patch('subprocess.run')
+    @patch('time.sleep')
+    def test_orchestrator_logs_sends_from_settings(self, mock_sleep, mock_subprocess_run):
+        config_file = os.path.join(self.tmpdir.name, 'ai_config.yml')
+        with open(config_file, 'w') as f:
+            yaml.dump({'default_provider': 'claude', 'providers': {}, 'sessions': {},
+                       'settings': {'log_commands': True, 'log_file': 'orchestrator.log'}}, f)
+
+        orchestrator = AIOrchestrator(config_file=config_file)
+        self.assertEqual(orchestrator.event_log.path, self.path)
+        orchestrator.send_message('proj', 0, 'héllo', AIProvider.CLAUDE)
+        orchestrator.event_log.flush()
+
+        events = self.read_lines()
+        self.assertEqual([e['event'] for e in events], ['tmux', 'tmux', 'send'])
+        self.assertEqual((events[-1]['provider'], events[-1]['bytes'], events[-1]['ok']), ('claude', 6, True))
+
+    def test_disabled_without_settings(self):
+        config_file = os.path.join(self.tmpdir.name, 'ai_config.yml')
+        with open(config_file, 'w') as f:
+            yaml.dump({'default_provider': 'claude', 'settings': {'log_commands': False,
+                                                                  'log_file': 'orchestrator.log'}}, f)
+        self.assertIsNone(AIOrchestrator(config_file=config_file).event_log)
+        self.assertIsNone(event_log.current())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,142 @@
+
+import unittest
+from unittest.mock import patch, MagicMock
+import subprocess
+import tempfile
+import time
+import sys
+import os
+
+import yaml
+
+# Add the parent directory to the Python path to allow importing metrics
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import metrics
+from metrics import MetricsRegistry, TextfileExporter
+from ai_provider import AIOrchestrator, AIProvider
+from tmux_utils import TmuxOrchestrator
+from helpers import window_row
+
+
+class TestMetricsRegistry(unittest.TestCase):
+
+    def setUp(self):
+        self.registry = MetricsRegistry()
+
+    def test_histogram_buckets_and_snapshot(self):
+        histogram = self.registry.histogram('op_seconds', 'Op duration', ('op',), buckets=(0.1, 1.0))
+        for value in (0.05, 0.1, 0.5, 3.0):
+            histogram.observe(value, 'capture')
+
+        [sample] = self.registry.snapshot()['op_seconds']['samples']
+        self.assertEqual(sample['labels'], {'op': 'capture'})
+        self.assertEqual(sample['count'], 4)
+        self.assertAlmostEqual(sample['sum'], 3.65)
+        # Buckets are cumulative and le is inclusive
+        self.assertEqual(sample['buckets'], {'0.1': 2, '1.0': 3, '+Inf': 4})
+
+    def test_openmetrics_exposition(self):
+        self.registry.counter('failures', 'Failed sends', ('provider',)).inc('claude', amount=2)
+        self.registry.gauge('windows', 'Open windows').set(7)
+        self.registry.histogram('latency', 'Latency', buckets=(1.0,)).observe(0.5)
+        self.registry.counter('quoted', 'Escaping', ('name',)).inc('a "b"\n')
+
+        text = self.registry.render()
+        self.assertIn('# TYPE failures counter\n# HELP failures Failed sends\nfailures_total{provider="claude"} 2\n', text)
+        self.assertIn('windows 7\n', text)
+        self.assertIn('latency_bucket{le="1.0"} 1\nlatency_bucket{le="+Inf"} 1\nlatency_count 1\nlatency_sum 0.5\n', text)
+        self.assertIn('quoted_total{name="a \\"b\\"\\n"} 1', text)
+        self.assertTrue(text.endswith('# EOF\n'))
+
+    def test_register_returns_existing_metric(self):
+        counter = self.registry.counter('sends', 'Sends', ('provider',))
+        self.assertIs(self.registry.counter('sends', 'Sends', ('provider',)), counter)
+        with self.assertRaises(ValueError):
+            self.registry.gauge('sends', 'Sends')
+
+    def test_textfile_exporter_writes_atomically(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, 'orchestrator.prom')
+            gauge = self.registry.gauge('sessions', 'Sessions')
+            gauge.set(3)
+            exporter = TextfileExporter(path, registry=self.registry, interval=0.01)
+            deadline = time.time() + 5
+            while not os.path.exists(path) and time.time() < deadline:
+                time.sleep(0.01)
+            gauge.set(4)
+            exporter.stop()
+
+            with open(path) as f:
+                self.assertIn('sessions 4\n', f.read())
+            self.assertEqual(os.listdir(tmpdir), ['orchestrator.prom'])
+
+    def test_observe_is_cheap(self):
+        histogram = self.registry.histogram('hot', 'Hot path', ('provider',))
+        start = time.perf_counter()
+        for _ in range(10000):
+            histogram.observe(0.003, 'claude')
+        self.assertLess((time.perf_counter() - start) / 10000, 20e-6)
+
+
+class TestInstrumentation(unittest.TestCase):
+
+    @patch('subprocess.run')
+    def test_tmux_operations_are_timed(self, mock_subprocess_run):
+        output = '\n'.join([window_row('a', '0', 0, 'w0', '0'), window_row('a', '0', 1, 'w1', '0'),
+                            window_row('b', '0', 0, 'w0', '0')])
+        mock_subprocess_run.return_value = MagicMock(stdout=output)
+        orchestrator = TmuxOrchestrator()
+        before = metrics.OPERATION_SECONDS.count('get_tmux_sessions')
+
+        orchestrator.get_tmux_sessions()
+
+        self.assertEqual(metrics.OPERATION_SECONDS.count('get_tmux_sessions'), before + 1)
+        self.assertEqual(metrics.SESSIONS.value(), 2)
+        self.assertEqual(metrics.WINDOWS.value(), 3)
+
+    @patch('subprocess.run', side_effect=subprocess.CalledProcessError(1, 'tmux'))
+    def test_capture_failures_are_counted(self, mock_subprocess_run):
+        before = metrics.OPERATION_FAILURES.value('capture_window_content')
+        TmuxOrchestrator().capture_window_content('a', 0)
+        self.assertEqual(metrics.OPERATION_FAILURES.value('capture_window_content'), before + 1)
+
+    @patch('time.sleep')
+    def test_sends_are_timed_per_provider(self, mock_sleep):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            config_file = os.path.join(tmpdir, 'ai_config.yml')
+            with open(config_file, 'w') as f:
+                yaml.dump({'default_provider': 'claude', 'providers': {'gemini': {'options': {}}}, 'sessions': {}}, f)
+            orchestrator = AIOrchestrator(config_file=config_file)
+
+            sends = metrics.SEND_SECONDS.count('gemini')
+            failures = metrics.SEND_FAILURES.value('gemini')
+            with patch('subprocess.run'):
+                orchestrator.send_message('proj', 0, 'hi', AIProvider.GEMINI)
+            with patch('subprocess.run', side_effect=subprocess.CalledProcessError(1, 'tmux')):
+                orchestrator.send_message('proj', 0, 'hi', AIProvider.GEMINI)
+
+        self.assertEqual(metrics.SEND_SECONDS.count('gemini'), sends + 2)
+        self.assertEqual(metrics.SEND_FAILURES.value('gemini'), failures + 1)
+
+    def test_exporter_started_from_settings(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            config_file = os.path.join(tmpdir, 'ai_config.yml')
+            with open(config_file, 'w') as f:
+                yaml.dump({'default_provider': 'claude',
+                           'settings': {'metrics_textfile': 'orchestrator.prom', 'metrics_interval': 60}}, f)
+            try:
+                AIOrchestrator(config_file=config_file)
+                exporter = metrics._exporter
+                self.assertEqual(exporter.path, os.path.join(tmpdir, 'orchestrator.prom'))
+                self.assertEqual(exporter.interval, 60)
+                # A reloaded config reuses the running exporter
+                AIOrchestrator(config_file=config_file)
+                self.assertIs(metrics._exporter, exporter)
+            finally:
+                metrics.stop_exporter()
+            self.assertTrue(os.path.exists(os.path.join(tmpdir, 'orchestrator.prom')))
+
+
+if __name__ == '__main__':
+    unittest.main()
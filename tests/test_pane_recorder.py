@@ -0,0 +1,112 @@
+import unittest
+from unittest.mock import patch, MagicMock
+import os
+import shutil
+import sys
+import tempfile
+
+# Add the parent directory to the Python path to allow importing pane_recorder
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import pane_recorder
+from pane_recorder import PaneLog, PaneRecorder, render_text
+
+
+class TestRenderText(unittest.TestCase):
+
+    def test_strips_escape_sequences(self):
+        self.assertEqual(render_text(b'\x1b[1;32mok\x1b[0m\r\n\x1b]0;title\x07done'), 'ok\ndone')
+
+    def test_carriage_return_overwrites(self):
+        self.assertEqual(render_text(b'progress 10%\rprogress 99%\r\n'), 'progress 99%\n')
+        self.assertEqual(render_text(b'abcdef\rXY'), 'XYcdef')
+
+
+class TestPaneLog(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmpdir, 'pane.log')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def append(self, data):
+        with open(self.path, 'ab') as f:
+            f.write(data)
+
+    def test_missing_log_is_empty(self):
+        log = PaneLog(self.path)
+        self.assertEqual(log.line_count(), 0)
+        self.assertEqual(bytes(log.tail(5)), b'')
+        self.assertEqual(bytes(log.slice(0, 5)), b'')
+
+    def test_tail(self):
+        self.append(b'one\ntwo\nthree\n')
+        log = PaneLog(self.path)
+        self.assertEqual(bytes(log.tail(2)), b'two\nthree\n')
+        self.assertEqual(bytes(log.tail(10)), b'one\ntwo\nthree\n')
+        # A partial last line is part of the tail
+        self.append(b'four')
+        self.assertEqual(bytes(log.tail(2)), b'three\nfour')
+
+    @patch.object(pane_recorder, 'INDEX_STRIDE', 4)
+    def test_slice_uses_index_and_follows_appends(self):
+        self.append(b''.join(b'line %d\n' % i for i in range(10)))
+        log = PaneLog(self.path)
+        self.assertEqual(log.line_count(), 10)
+        self.assertEqual(bytes(log.slice(5, 7)), b'line 5\nline 6\n')
+        self.assertEqual(bytes(log.slice(-1)), b'line 9\n')
+
+        self.append(b''.join(b'line %d\n' % i for i in range(10, 20)) + b'partial')
+        self.assertEqual(log.line_count(), 20)
+        self.assertEqual(bytes(log.slice(17, 30)), b'line 17\nline 18\nline 19\n')
+
+    @patch.object(pane_recorder, 'INDEX_STRIDE', 4)
+    def test_index_is_reused_by_new_readers(self):
+        self.append(b''.join(b'line %d\n' % i for i in range(9)))
+        PaneLog(self.path).refresh()
+
+        log = PaneLog(self.path)
+        self.assertEqual(log._lines, 9)
+        self.assertEqual(list(log._checkpoints), [0, 28, 56])
+        self.assertEqual(bytes(log.slice(8, 9)), b'line 8\n')
+
+    def test_truncated_log_is_reindexed(self):
+        self.append(b'a\nb\nc\n')
+        log = PaneLog(self.path)
+        self.assertEqual(log.line_count(), 3)
+        with open(self.path, 'wb') as f:
+            f.write(b'x\n')
+        self.assertEqual(log.line_count(), 1)
+        self.assertEqual(bytes(log.slice(0)), b'x\n')
+
+
+class TestPaneRecorder(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def test_start_and_stop(self):
+        run = MagicMock(side_effect=['4242 %7\n', '', ''])
+        recorder = PaneRecorder(self.tmpdir, run=run)
+
+        log = recorder.start('project:1')
+
+        self.assertEqual(log.path, os.path.join(self.tmpdir, 'pane-4242-7.log'))
+        pipe_args = run.call_args_list[1].args[0]
+        self.assertEqual(pipe_args[:3], ['pipe-pane', '-t', '%7'])
+        self.assertIn('pane-4242-7.log', pipe_args[3])
+        self.assertIs(recorder.log_for('project:1'), log)
+        self.assertIs(recorder.log_for('%7'), log)
+
+        recorder.stop('project:1')
+        run.assert_called_with(['pipe-pane', '-t', '%7'])
+        self.assertIsNone(recorder.log_for('project:1'))
+
+
+if __name__ == '__main__':
+    unittest.main()
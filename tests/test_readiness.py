@@ -0,0 +1,97 @@
+
+import unittest
+from unittest.mock import patch, MagicMock
+import subprocess
+import sys
+import os
+
+# Add the parent directory to the Python path to allow importing readiness
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from readiness import ReadinessDetector, ReadinessPatterns, PaneState
+
+
+def screen(*lines, cursor_y=None):
+    """capture-pane ; display-message output for a screen"""
+    cursor_y = len(lines) - 1 if cursor_y is None else cursor_y
+    return '\n'.join(lines) + f'\n{cursor_y}\n'
+
+
+CONFIG = {
+    'providers': {
+        'claude': {'readiness': {'prompt_patterns': [r'^\s*│?\s*>'], 'busy_patterns': ['esc to interrupt']}},
+        'gemini': {},
+    },
+    'settings': {'readiness': {'enabled': True, 'timeout': 2, 'poll_initial': 0.01}},
+}
+
+
+class TestReadinessDetector(unittest.TestCase):
+
+    def test_from_config(self):
+        detector = ReadinessDetector.from_config(CONFIG)
+        self.assertEqual(detector.timeout, 2.0)
+        self.assertEqual(detector.poll_initial, 0.01)
+        self.assertEqual(len(detector.patterns['claude'].prompt), 1)
+        self.assertEqual(detector.patterns['gemini'].prompt, [])
+
+    def test_read_state(self):
+        run = MagicMock(return_value=screen('a', 'b', '', cursor_y=1))
+        state = ReadinessDetector(run=run).read_state('s:0')
+        self.assertEqual(state.lines, ['a', 'b', ''])
+        self.assertEqual(state.cursor_y, 1)
+        args = run.call_args[0][0]
+        self.assertEqual(args[:4], ['capture-pane', '-p', '-t', 's:0'])
+        self.assertIn(';', args)
+
+    def test_read_state_malformed_output(self):
+        run = MagicMock(return_value='a\nb\n')
+        with self.assertRaises(subprocess.CalledProcessError):
+            ReadinessDetector(run=run).read_state('s:0')
+
+    def test_is_ready(self):
+        detector = ReadinessDetector.from_config(CONFIG)
+        self.assertTrue(detector.is_ready(PaneState(['╭───', '│ > '], 1), 'claude'))
+        self.assertFalse(detector.is_ready(PaneState(['thinking', '│ > ', 'esc to interrupt'], 1), 'claude'))
+        self.assertFalse(detector.is_ready(PaneState(['working...'], 0), 'claude'))
+        # No prompt patterns: anything not busy counts
+        self.assertTrue(detector.is_ready(PaneState(['whatever'], 0), 'gemini'))
+
+    @patch('readiness.time.sleep')
+    def test_wait_until_ready_needs_stable_prompt(self, mock_sleep):
+        run = MagicMock(side_effect=[
+            screen('working', 'esc to interrupt'),
+            screen('done', '│ > '),
+            screen('done', '│ > '),
+        ])
+        detector = ReadinessDetector.from_config(CONFIG, run=run)
+        self.assertTrue(detector.wait_until_ready('s:0', 'claude'))
+        self.assertEqual(run.call_count, 3)
+        # Adaptive backoff between polls
+        delays = [call[0][0] for call in mock_sleep.call_args_list]
+        self.assertEqual(len(delays), 2)
+        self.assertGreater(delays[1], delays[0])
+
+    def test_wait_until_ready_times_out(self):
+        run = MagicMock(return_value=screen('esc to interrupt'))
+        detector = ReadinessDetector.from_config(CONFIG, run=run)
+        self.assertFalse(detector.wait_until_ready('s:0', 'claude', timeout=0.05))
+
+    @patch('readiness.time.sleep')
+    def test_wait_for_echo_across_wrapped_lines(self, mock_sleep):
+        text = 'please summarise the test failures in the last run'
+        run = MagicMock(side_effect=[
+            screen('│ > please summ'),
+            screen('│ > please summarise the test fai', 'lures in the last run'),
+        ])
+        detector = ReadinessDetector(run=run)
+        self.assertTrue(detector.wait_for_echo('s:0', text))
+        self.assertEqual(run.call_count, 2)
+
+    def test_empty_patterns_config(self):
+        patterns = ReadinessPatterns.from_config(None)
+        self.assertEqual((patterns.prompt, patterns.busy), ([], []))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,160 @@
+
+import unittest
+from unittest.mock import patch
+import tempfile
+import threading
+import time
+import sys
+import os
+
+# Add the parent directory to the Python path to allow importing scheduler
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import scheduler
+from scheduler import CheckStore, Scheduler, note_path
+
+
+class SchedulerTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self.tmpdir.name, 'scheduler.db')
+        self.store = CheckStore(self.db_path)
+        patcher = patch('scheduler.NOTES_DIR', os.path.join(self.tmpdir.name, 'notes'))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        self.store.close()
+        self.tmpdir.cleanup()
+
+
+class TestCheckStore(SchedulerTestCase):
+
+    def test_coalesces_near_checks_to_same_target(self):
+        now = time.time()
+        first, merged = self.store.add('proj:0', now + 300, 'check build')
+        self.assertFalse(merged)
+        second, merged = self.store.add('proj:0', now + 270, 'check tests')
+        self.assertTrue(merged)
+        self.assertEqual(second.id, first.id)
+        self.assertEqual(second.due, now + 270)
+        # Duplicate notes are not repeated
+        third, _ = self.store.add('proj:0', now + 310, 'check build')
+        self.assertEqual(third.note, 'check build\n\ncheck tests')
+
+        # Other windows, other providers and distant times stay separate
+        self.store.add('proj:1', now + 300, 'x')
+        self.store.add('proj:0', now + 300, 'x', provider='gemini')
+        self.store.add('proj:0', now + 900, 'x')
+        self.assertEqual(len(self.store.pending()), 4)
+        self.assertEqual(len(self.store.pending('proj:0')), 3)
+
+    def test_cancel_and_reschedule(self):
+        check, _ = self.store.add('proj:0', time.time() + 60, 'note')
+        self.assertTrue(self.store.reschedule(check.id, 123.0))
+        self.assertEqual(self.store.get(check.id).due, 123.0)
+        self.assertTrue(self.store.cancel(check.id))
+        self.assertFalse(self.store.cancel(check.id))
+        self.assertFalse(self.store.reschedule(check.id, 456.0))
+        self.assertEqual(self.store.pending(), [])
+
+    def test_persists_across_instances(self):
+        self.store.add('proj:0', time.time() + 60, 'survives restarts')
+        reopened = CheckStore(self.db_path)
+        self.assertEqual([c.note for c in reopened.pending()], ['survives restarts'])
+        reopened.close()
+
+
+class TestScheduler(SchedulerTestCase):
+
+    def make_scheduler(self):
+        self.sent = []
+        # The scheduler uses its own connection, like the resident process
+        return Scheduler(CheckStore(self.db_path),
+                         send=lambda target, message, provider: self.sent.append((target, message, provider)) or True)
+
+    def test_fires_due_checks_in_order(self):
+        now = time.time()
+        self.store.add('b:0', now - 5, 'second')
+        self.store.add('a:0', now - 10, 'first', provider='gemini')
+        self.store.add('c:0', now + 3600, 'later')
+        runner = self.make_scheduler()
+
+        self.assertEqual(runner.run_due(now), 2)
+        self.assertEqual([(target, provider) for target, _, provider in self.sent], [('a:0', 'gemini'), ('b:0', None)])
+        self.assertIn(note_path('a:0'), self.sent[0][1])
+        with open(note_path('a:0')) as f:
+            self.assertIn('first', f.read())
+        self.assertEqual([c.target for c in self.store.pending()], ['c:0'])
+        self.assertEqual(self.store.get(1).status, 'done')
+
+    def test_picks_up_changes_from_other_processes(self):
+        now = time.time()
+        check, _ = self.store.add('a:0', now + 3600, 'moved')
+        runner = self.make_scheduler()
+        self.assertEqual(runner.run_due(now), 0)
+
+        self.store.reschedule(check.id, now - 1)
+        self.store.add('b:0', now - 1, 'new')
+        cancelled, _ = self.store.add('c:0', now - 1, 'cancelled')
+        self.store.cancel(cancelled.id)
+
+        self.assertEqual(runner.run_due(now), 2)
+        self.assertEqual(sorted(target for target, _, _ in self.sent), ['a:0', 'b:0'])
+
+    def test_failed_send_is_recorded(self):
+        self.store.add('a:0', time.time() - 1, 'note')
+        runner = Scheduler(CheckStore(self.db_path), send=lambda *args: False)
+        runner.run_due()
+        self.assertEqual(self.store.get(1).status, 'failed')
+
+    def test_run_forever_fires_and_stops(self):
+        runner = self.make_scheduler()
+        runner.poll_interval = 0.02
+        thread = threading.Thread(target=runner.run_forever)
+        thread.start()
+        try:
+            self.store.add('a:0', time.time() + 0.05, 'soon')
+            deadline = time.time() + 5
+            while not self.sent and time.time() < deadline:
+                time.sleep(0.01)
+        finally:
+            runner.stop()
+            thread.join(timeout=5)
+        self.assertEqual(self.sent[0][0], 'a:0')
+
+    def test_thousands_of_pending_checks(self):
+        now = time.time()
+        for i in range(2000):
+            self.store.add(f'w{i}:0', now + 3600 + i, 'n')
+        runner = self.make_scheduler()
+        runner.run_due(now)
+
+        start = time.perf_counter()
+        for _ in range(100):
+            runner.run_due(now)
+        # An idle tick with nothing due is only a data_version query
+        self.assertLess((time.perf_counter() - start) / 100, 0.005)
+        self.assertAlmostEqual(runner.seconds_until_next(now), 3600, delta=1)
+
+
+class TestSchedulerCommands(SchedulerTestCase):
+
+    def run_command(self, *args):
+        with patch.dict(os.environ, {'ORCHESTRATOR_SCHEDULER_DB': self.db_path}), \
+             patch('builtins.print') as mock_print:
+            scheduler.main(['scheduler.py', *args])
+        return ' '.join(str(call.args[0]) for call in mock_print.call_args_list)
+
+    def test_add_list_cancel(self):
+        self.assertIn('Scheduled check 1 for proj:2', self.run_command('add', '30', 'Review auth', 'proj:2'))
+        self.assertIn('Merged into existing check 1', self.run_command('add', '30', 'Merge PR', 'proj:2'))
+        self.assertIn('Review auth | Merge PR', self.run_command('list'))
+        self.assertIn('Rescheduled check 1', self.run_command('reschedule', '1', '5'))
+        self.assertIn('Cancelled check 1', self.run_command('cancel', '1'))
+        self.assertEqual(self.run_command('list'), '')
+
+
+if __name__ == '__main__':
+    unittest.main()
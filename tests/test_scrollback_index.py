@@ -0,0 +1,122 @@
+
+import unittest
+from unittest.mock import patch, MagicMock
+import time
+import sys
+import os
+
+# Add the parent directory to the Python path to allow importing scrollback_index
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from scrollback_index import ScrollbackIndex, main, tokenize
+from tmux_utils import PanePosition, TmuxSession, TmuxWindow
+
+
+def make_window(session, index, activity=0, cursor_y=10):
+    return TmuxWindow(session_name=session, window_index=index, window_name=f'agent-{index}', active=False,
+                      window_id=f'@{index}', activity=activity,
+                      position=PanePosition(pane_id=f'%{index}', history_size=0, history_limit=2000,
+                                            cursor_y=cursor_y))
+
+
+class TestScrollbackIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.index = ScrollbackIndex()
+
+    def test_tokenize(self):
+        self.assertEqual(tokenize('connect ECONNREFUSED 127.0.0.1 (exit_code=1)'),
+                         {'connect', 'econnrefused', '127', '0', '1', 'exit_code'})
+
+    def test_search_matches_words_and_phrases(self):
+        self.index.add('api:0', 'starting\nError: connect ECONNREFUSED 127.0.0.1:5432\nretrying', timestamp=100)
+        self.index.add('web:1', 'ECONNREFUSED while fetching\nconnect ok', timestamp=200)
+
+        hits = self.index.search('econnrefused')
+        # Newest first
+        self.assertEqual([(hit.target, hit.line) for hit in hits], [('web:1', 0), ('api:0', 1)])
+        self.assertEqual(hits[1].text, 'Error: connect ECONNREFUSED 127.0.0.1:5432')
+        self.assertEqual([hit.target for hit in self.index.search('connect ECONNREFUSED')], ['api:0'])
+        self.assertEqual(self.index.search('ECONN'), [])
+        self.assertEqual(self.index.search('  '), [])
+
+    def test_search_filters(self):
+        self.index.add('api:0', 'timeout', timestamp=100)
+        self.index.add('api:1', 'timeout', timestamp=200)
+        self.index.add('apiserver:0', 'timeout', timestamp=300)
+
+        self.assertEqual([hit.target for hit in self.index.search('timeout', since=150)], ['apiserver:0', 'api:1'])
+        self.assertEqual([hit.target for hit in self.index.search('timeout', until=150)], ['api:0'])
+        self.assertEqual([hit.target for hit in self.index.search('timeout', target='api')], ['api:1', 'api:0'])
+        self.assertEqual(len(self.index.search('timeout', limit=1)), 1)
+
+    def test_retention_bounds_memory(self):
+        index = ScrollbackIndex(max_lines_per_pane=3, max_age=60)
+        index.add('api:0', '\n'.join(f'line {i} unique{i}' for i in range(10)), timestamp=time.time())
+        index.add('api:1', 'stale output', timestamp=time.time() - 120)
+
+        self.assertEqual([hit.line for hit in index.search('line', limit=None)], [9, 8, 7])
+        self.assertEqual(index.search('unique0'), [])
+        index.expire()
+        self.assertEqual(index.search('stale'), [])
+        # Postings of dropped lines are gone too
+        self.assertEqual(index.stats(), {'windows': 2, 'lines': 3, 'tokens': 7})
+
+        index.remove('api:0')
+        self.assertEqual(index.stats(), {'windows': 1, 'lines': 0, 'tokens': 0})
+
+    def test_refresh_captures_only_changed_windows(self):
+        orchestrator = MagicMock(capture_workers=4)
+        orchestrator.get_tmux_sessions.return_value = [
+            TmuxSession(name='proj', attached=False, windows=[make_window('proj', 0), make_window('proj', 1)])]
+        orchestrator.capture_window_delta.side_effect = lambda session, index, window: f'{session}:{index} ready\n'
+
+        self.assertEqual(self.index.refresh(orchestrator), 2)
+        self.assertEqual(self.index.refresh(orchestrator), 0)
+
+        orchestrator.get_tmux_sessions.return_value = [
+            TmuxSession(name='proj', attached=False, windows=[make_window('proj', 1, activity=5, cursor_y=11)])]
+        orchestrator.capture_window_delta.side_effect = lambda session, index, window: 'ECONNREFUSED\n'
+        self.assertEqual(self.index.refresh(orchestrator), 1)
+
+        self.assertEqual(orchestrator.capture_window_delta.call_count, 3)
+        self.assertEqual([hit.target for hit in self.index.search('ECONNREFUSED')], ['proj:1'])
+        # proj:0 closed
+        self.assertEqual([hit.target for hit in self.index.search('ready')], ['proj:1'])
+
+    def test_search_is_fast_across_many_windows(self):
+        for window in range(300):
+            lines = '\n'.join(f'step {i} of build {window}: compiling module_{i % 97}' for i in range(500))
+            self.index.add(f'agent-{window // 10}:{window % 10}', lines)
+        self.index.add('agent-7:3', 'Error: connect ECONNREFUSED 10.0.0.5:443')
+
+        start = time.perf_counter()
+        hits = self.index.search('ECONNREFUSED')
+        self.assertLess(time.perf_counter() - start, 0.01)
+        self.assertEqual([hit.target for hit in hits], ['agent-7:3'])
+
+
+
+class TestScrollbackIndexMain(unittest.TestCase):
+
+    @patch('tmux_utils.TmuxOrchestrator')
+    @patch('ai_client.request', return_value=None)
+    def test_time_filters_need_the_daemon(self, mock_request, MockTmuxOrchestrator):
+        # Without the daemon every line would be stamped with the current time
+        with patch('builtins.print') as mock_print, self.assertRaises(SystemExit) as cm:
+            main(['scrollback_index.py', 'timeout', '--since', '1h'])
+        self.assertEqual(cm.exception.code, 1)
+        mock_request.assert_called_once()
+        MockTmuxOrchestrator.assert_not_called()
+        self.assertIn('--daemon', mock_print.call_args.args[0])
+
+    @patch('tmux_utils.TmuxOrchestrator')
+    @patch('ai_client.request', return_value={'ok': True, 'hits': [{'timestamp': 0, 'target': 'api:1', 'line': 3, 'text': 'timeout'}]})
+    def test_time_filters_go_to_the_daemon(self, mock_request, MockTmuxOrchestrator):
+        with patch('builtins.print'):
+            main(['scrollback_index.py', 'timeout', '--since', '1h'])
+        self.assertIn('since', mock_request.call_args.args[0])
+        MockTmuxOrchestrator.assert_not_called()
+
+if __name__ == '__main__':
+    unittest.main()
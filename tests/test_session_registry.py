@@ -0,0 +1,124 @@
+
+import unittest
+from unittest.mock import patch
+import sqlite3
+import tempfile
+import threading
+import sys
+import os
+
+import yaml
+
+# Add the parent directory to the Python path to allow importing session_registry
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from session_registry import SessionRegistry, split_session_key
+from ai_provider import AIOrchestrator, AIProvider
+
+
+class TestSessionRegistry(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmpdir.name, 'sessions.db')
+        self.registry = SessionRegistry(self.path)
+
+    def tearDown(self):
+        self.registry.close()
+        self.tmpdir.cleanup()
+
+    def test_upsert_and_get(self):
+        self.assertIsNone(self.registry.get('proj', 0))
+        self.registry.set('proj', 0, 'claude')
+        self.registry.set('proj', 0, 'gemini', {'model': 'gemini-pro'})
+
+        self.assertEqual(self.registry.get('proj', 0), {'provider': 'gemini', 'options': {'model': 'gemini-pro'}})
+        self.assertEqual(self.registry.count(), 1)
+
+    def test_wal_mode_and_indexes(self):
+        conn = sqlite3.connect(self.path)
+        self.assertEqual(conn.execute('PRAGMA journal_mode').fetchone()[0], 'wal')
+        indexes = {row[1] for row in conn.execute("PRAGMA index_list('sessions')")}
+        self.assertIn('sessions_provider', indexes)
+        self.assertIn('sessions_window', indexes)
+        plan = ' '.join(str(row) for row in conn.execute(
+            "EXPLAIN QUERY PLAN SELECT * FROM sessions WHERE provider = 'claude'"))
+        self.assertIn('sessions_provider', plan)
+        conn.close()
+
+    def test_queries(self):
+        self.registry.import_sessions({
+            'proj:0': {'provider': 'claude'},
+            'proj:2': {'provider': 'gemini', 'options': {'yolo': True}},
+            'other:1': {'provider': 'claude', 'options': {}},
+        })
+        self.assertEqual(self.registry.targets_for_provider('claude'), ['other:1', 'proj:0'])
+        self.assertEqual(list(self.registry.windows_for_session('proj')), [0, 2])
+        self.assertTrue(self.registry.remove('proj', 0))
+        self.assertFalse(self.registry.remove('proj', 0))
+
+    def test_import_export_round_trip(self):
+        sessions = {
+            'a:b:3': {'provider': 'rovodev', 'options': {'shadow': True}},
+            'proj:0': {'provider': 'claude', 'options': {}},
+        }
+        self.assertEqual(self.registry.import_sessions(sessions), 2)
+        self.assertEqual(self.registry.export_sessions(), sessions)
+
+        self.registry.import_sessions({'new:0': {'provider': 'gemini'}}, replace=True)
+        self.assertEqual(list(self.registry.export_sessions()), ['new:0'])
+
+    def test_concurrent_writers(self):
+        def writer(worker):
+            registry = SessionRegistry(self.path)
+            for index in range(50):
+                registry.set(f'worker{worker}', index, 'claude')
+            registry.close()
+
+        threads = [threading.Thread(target=writer, args=(i,)) for i in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(self.registry.count(), 200)
+
+    def test_split_session_key(self):
+        self.assertEqual(split_session_key('agent:one:3'), ('agent:one', 3))
+
+
+class TestRegistryBackedOrchestrator(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.config_file = os.path.join(self.tmpdir.name, 'ai_config.yml')
+        self.config_data = {
+            'default_provider': 'claude',
+            'providers': {},
+            'sessions': {'proj:1': {'provider': 'gemini', 'options': {}}},
+            'settings': {'session_registry': 'sessions.db'},
+        }
+        with open(self.config_file, 'w') as f:
+            yaml.dump(self.config_data, f)
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_seeds_from_yaml_and_skips_rewrite(self):
+        orchestrator = AIOrchestrator(config_file=self.config_file)
+        self.assertTrue(os.path.exists(os.path.join(self.tmpdir.name, 'sessions.db')))
+        self.assertEqual(orchestrator.get_provider_for_session('proj', 1), AIProvider.GEMINI)
+        self.assertEqual(orchestrator.get_provider_for_session('proj', 0), AIProvider.CLAUDE)
+
+        with patch.object(AIOrchestrator, '_save_config') as mock_save:
+            orchestrator.configure_session('proj', 0, AIProvider.ROVODEV, {'shadow': True})
+        mock_save.assert_not_called()
+        self.assertEqual(orchestrator.config['sessions']['proj:0']['provider'], 'rovodev')
+
+        # Another orchestrator sees the update without the YAML changing
+        other = AIOrchestrator(config_file=self.config_file)
+        self.assertEqual(other.get_provider_for_session('proj', 0), AIProvider.ROVODEV)
+        self.assertEqual(set(other.list_sessions()), {'proj:0', 'proj:1'})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,200 @@
+
+import unittest
+from unittest.mock import patch, MagicMock
+import subprocess
+import tempfile
+import sys
+import os
+
+import yaml
+
+# Add the parent directory to the Python path to allow importing target_resolver
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from ai_provider import AIOrchestrator
+from target_resolver import GENERATION_HOOKS, RESOLVE_FIELDS, ROLE_OPTION, TargetResolver, UnknownTargetError, is_id
+from tmux_utils import FIELD_SEP, TmuxOrchestrator
+
+
+def window_row(session, index, name, role=''):
+    values = {'session_name': session, 'window_index': str(index), 'window_id': f'@{index}',
+              'pane_id': f'%{index + 10}', ROLE_OPTION: role, 'window_name': name}
+    return FIELD_SEP.join(values[field] for field in RESOLVE_FIELDS)
+
+
+class FakeServer:
+    """Answers the resolver's tmux commands and counts window listings"""
+
+    def __init__(self, rows):
+        self.rows = rows
+        self.generation = '0'
+        self.listings = 0
+
+    def __call__(self, args):
+        if args[0] == 'list-windows':
+            self.listings += 1
+            return '\n'.join(self.rows) + '\n'
+        if args[0] == 'show-options':
+            return self.generation + '\n'
+        return ''
+
+
+class TestTargetResolver(unittest.TestCase):
+
+    def setUp(self):
+        self.server = FakeServer([
+            window_row('proj', 0, 'editor'),
+            window_row('proj', 1, 'claude', role='reviewer'),
+            window_row('proj', 2, '1'),
+            window_row('ops', 3, 'claude'),
+        ])
+        self.resolver = TargetResolver(run=self.server)
+
+    def test_resolves_every_target_form(self):
+        self.assertEqual(self.resolver.target('proj:1'), '%11')
+        self.assertEqual(self.resolver.target('proj:editor'), '%10')
+        self.assertEqual(self.resolver.target('editor'), '%10')
+        self.assertEqual(self.resolver.target('role=reviewer'), '%11')
+        self.assertEqual(self.resolver.resolve('@3').session_window, 'ops:3')
+        # An index wins over a window named like one
+        self.assertEqual(self.resolver.resolve('proj:1').window_name, 'claude')
+        self.assertEqual(self.server.listings, 1)
+
+    def test_ids_need_no_lookup(self):
+        self.assertTrue(is_id('%12') and is_id('@4'))
+        self.assertFalse(is_id('%name'))
+        self.assertEqual(self.resolver.target('%99'), '%99')
+        self.assertEqual(self.server.listings, 0)
+
+    def test_ambiguous_and_unknown_targets(self):
+        with self.assertRaisesRegex(UnknownTargetError, 'matches 2 windows: proj:1, ops:3'):
+            self.resolver.resolve('claude')
+        with self.assertRaises(UnknownTargetError):
+            self.resolver.resolve('role=builder')
+        # The miss listed the windows again in case the window was new
+        self.assertEqual(self.server.listings, 2)
+
+    def test_installs_generation_hooks_once(self):
+        calls = []
+        resolver = TargetResolver(run=lambda args: calls.append(args) or self.server(args))
+        resolver.target('proj:0')
+        resolver.refresh()
+
+        hooks = [call[2] for call in calls if call[0] == 'set-hook']
+        self.assertEqual(hooks, [f'{hook}[77]' for hook in GENERATION_HOOKS])
+        self.assertIn('window-renamed[77]', hooks)
+
+    def test_unknown_hooks_are_skipped(self):
+        def run(args):
+            if args[0] == 'set-hook' and args[2] == 'window-pane-changed[77]':
+                raise subprocess.CalledProcessError(1, args, stderr='invalid option: window-pane-changed[77]\n')
+            return self.server(args)
+
+        resolver = TargetResolver(run=run)
+        resolver.target('proj:0')
+        self.assertTrue(resolver._hooks_installed)
+
+    def test_failed_hook_install_is_undone_and_not_retried(self):
+        calls = []
+
+        def run(args):
+            calls.append(args)
+            if args[:2] == ['set-hook', '-g'] and args[2] == 'window-renamed[77]':
+                raise subprocess.CalledProcessError(1, args, stderr='server exited unexpectedly\n')
+            return self.server(args)
+
+        resolver = TargetResolver(run=run)
+        resolver.target('proj:0')
+        resolver.refresh()
+
+        self.assertFalse(resolver._hooks_installed)
+        self.assertEqual([call[2] for call in calls if call[:2] == ['set-hook', '-gu']],
+                         ['window-linked[77]', 'window-unlinked[77]'])
+        self.assertEqual(len([call for call in calls if call[:2] == ['set-hook', '-g']]), 3)
+
+    @patch('time.monotonic')
+    def test_generation_check_invalidates(self, mock_monotonic):
+        mock_monotonic.return_value = 100.0
+        self.resolver.target('proj:0')
+        mock_monotonic.return_value = 100.5
+        self.resolver.target('proj:0')
+        self.assertEqual(self.server.listings, 1)
+
+        # Checked after check_interval: unchanged, then bumped by a rename
+        mock_monotonic.return_value = 102.0
+        self.resolver.target('proj:0')
+        self.assertEqual(self.server.listings, 1)
+        self.server.generation = '1'
+        self.server.rows[0] = window_row('proj', 0, 'renamed')
+        mock_monotonic.return_value = 104.0
+        self.assertEqual(self.resolver.target('renamed'), '%10')
+        self.assertEqual(self.server.listings, 2)
+
+    def test_invalidated_by_watcher_events(self):
+        watcher = MagicMock()
+        self.resolver.watch(watcher)
+        self.resolver.target('proj:0')
+
+        callbacks = {call.args[0]: call.args[1] for call in watcher.on.call_args_list}
+        self.assertEqual(set(callbacks), {'window-add', 'window-close', 'window-renamed', 'sessions-changed'})
+        callbacks['window-close'](None)
+        self.resolver.target('proj:0')
+        self.assertEqual(self.server.listings, 2)
+
+
+class TestSendByID(unittest.TestCase):
+
+    @patch('subprocess.run')
+    def test_send_keys_by_id_and_role(self, mock_subprocess_run):
+        orchestrator = TmuxOrchestrator()
+        orchestrator._resolver = TargetResolver(run=FakeServer([window_row('proj', 1, 'claude', role='reviewer')]))
+
+        self.assertTrue(orchestrator.send_command_to_window('%7', None, 'ls', confirm=False))
+        self.assertTrue(orchestrator.send_keys_to_window('role=reviewer', None, 'y', confirm=False))
+        with patch('builtins.print'):
+            self.assertFalse(orchestrator.send_keys_to_window('role=builder', None, 'y', confirm=False))
+
+        commands = [call.args[0] for call in mock_subprocess_run.call_args_list]
+        self.assertEqual(commands, [
+            ['tmux', 'send-keys', '-t', '%7', 'ls'],
+            ['tmux', 'send-keys', '-t', '%7', 'C-m'],
+            ['tmux', 'send-keys', '-t', '%11', 'y'],
+        ])
+
+    @patch('subprocess.run')
+    @patch('time.sleep')
+    def test_send_message_by_role_uses_window_provider(self, mock_sleep, mock_subprocess_run):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            config_file = os.path.join(tmpdir, 'ai_config.yml')
+            with open(config_file, 'w') as f:
+                yaml.dump({'default_provider': 'claude', 'providers': {'gemini': {'options': {}}},
+                           'sessions': {'proj:1': {'provider': 'gemini'}}}, f)
+            orchestrator = AIOrchestrator(config_file=config_file)
+            orchestrator._resolver = TargetResolver(run=FakeServer([window_row('proj', 1, 'agent', role='reviewer')]))
+
+            self.assertTrue(orchestrator.send_message('role=reviewer', None, 'review it'))
+
+        typed, enter = [call.args[0] for call in mock_subprocess_run.call_args_list]
+        self.assertEqual(typed[:4], ['tmux', 'send-keys', '-t', '%11'])
+        self.assertIn('gemini', typed[-1])
+        self.assertEqual(enter, ['tmux', 'send-keys', '-t', '%11', 'Enter'])
+
+    @patch('subprocess.run', side_effect=subprocess.CalledProcessError(1, 'tmux'))
+    @patch('time.sleep')
+    def test_failed_send_invalidates(self, mock_sleep, mock_subprocess_run):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            config_file = os.path.join(tmpdir, 'ai_config.yml')
+            with open(config_file, 'w') as f:
+                yaml.dump({'default_provider': 'claude', 'sessions': {}}, f)
+            orchestrator = AIOrchestrator(config_file=config_file)
+            server = FakeServer([window_row('proj', 1, 'agent')])
+            orchestrator._resolver = TargetResolver(run=server)
+
+            with patch('builtins.print'):
+                self.assertFalse(orchestrator.send_message('agent', None, 'hi'))
+                orchestrator.send_message('agent', None, 'hi')
+        self.assertEqual(server.listings, 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
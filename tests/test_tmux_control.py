@@ -0,0 +1,182 @@
+import unittest
+from unittest.mock import patch, MagicMock
+import shutil
+import subprocess
+import sys
+import os
+import uuid
+
+# Add the parent directory to the Python path to allow importing tmux_control
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from tmux_control import TmuxControlClient, TmuxControlError, TmuxReplyTimeout, quote_arg, run_tmux
+
+
+class FakeStdout:
+    """Line-by-line stdout of a control client, fed from a list"""
+
+    def __init__(self, lines):
+        self.lines = [line.encode() + b'\n' for line in lines]
+
+    def readline(self):
+        return self.lines.pop(0) if self.lines else b''
+
+
+class TestQuoteArg(unittest.TestCase):
+
+    def test_plain(self):
+        self.assertEqual(quote_arg('session1:0'), '"session1:0"')
+
+    def test_escapes(self):
+        self.assertEqual(quote_arg('a"b$c\\d'), '"a\\"b\\$c\\\\d"')
+        self.assertEqual(quote_arg('x\ny\tz'), '"x\\ny\\tz"')
+        self.assertEqual(quote_arg('\x1f'), '"\\037"')
+
+    def test_empty(self):
+        self.assertEqual(quote_arg(''), '""')
+
+    def test_command_separator_stays_bare(self):
+        self.assertEqual(quote_arg(';'), ';')
+
+
+class TestTmuxControlClient(unittest.TestCase):
+
+    def _client_with_output(self, lines, pending):
+        client = TmuxControlClient()
+        client._pending.extend(pending)
+        proc = MagicMock()
+        proc.stdout = FakeStdout(lines)
+        return client, proc
+
+    def test_read_loop_matches_replies_in_order(self):
+        from tmux_control import _Request
+        first, second = _Request(), _Request()
+        notifications = []
+        client, proc = self._client_with_output([
+            '%begin 100 1 0',
+            '%end 100 1 0',
+            '%window-add @3',
+            '%begin 100 2 1',
+            'line one',
+            '%end 100 2 1',
+            '%begin 100 3 1',
+            'unknown command',
+            '%error 100 3 1',
+        ], [first, second])
+        client.add_notification_handler(notifications.append)
+
+        client._read_loop(proc)
+
+        self.assertEqual(first.lines, ['line one'])
+        self.assertFalse(first.error)
+        self.assertEqual(second.lines, ['unknown command'])
+        self.assertTrue(second.error)
+        self.assertEqual(notifications, ['%window-add @3'])
+
+    def test_output_that_looks_like_end_does_not_close_block(self):
+        from tmux_control import _Request
+        request = _Request()
+        client, proc = self._client_with_output([
+            '%begin 100 7 1',
+            '%end 1 1 1',
+            '%end 100 7 1',
+        ], [request])
+
+        client._read_loop(proc)
+
+        self.assertEqual(request.lines, ['%end 1 1 1'])
+
+    def test_command_list_collects_every_block(self):
+        from tmux_control import _Request
+        chained, failed, after = _Request(blocks=2), _Request(blocks=2), _Request()
+        client, proc = self._client_with_output([
+            '%begin 100 1 1', 'a', '%end 100 1 1',
+            '%begin 100 2 1', 'b', '%end 100 2 1',
+            # The second command of a failed list never runs
+            '%begin 100 3 1', 'bad', '%error 100 3 1',
+            '%begin 100 4 1', 'c', '%end 100 4 1',
+        ], [chained, failed, after])
+
+        client._read_loop(proc)
+
+        self.assertEqual(chained.lines, ['a', 'b'])
+        self.assertTrue(failed.error)
+        self.assertEqual(after.lines, ['c'])
+
+    def test_pending_requests_are_lost_on_exit(self):
+        from tmux_control import _Request
+        request = _Request()
+        client, proc = self._client_with_output([], [request])
+
+        client._read_loop(proc)
+
+        self.assertTrue(request.lost)
+        self.assertTrue(request.done.is_set())
+
+
+class TestRunTmux(unittest.TestCase):
+
+    @patch('subprocess.run')
+    def test_subprocess_path(self, mock_subprocess_run):
+        mock_subprocess_run.return_value = MagicMock(stdout='out\n')
+        self.assertEqual(run_tmux(['list-sessions']), 'out\n')
+        mock_subprocess_run.assert_called_with(['tmux', 'list-sessions'], capture_output=True, text=True, check=True)
+
+    @patch('subprocess.run')
+    def test_backend_is_preferred(self, mock_subprocess_run):
+        backend = MagicMock()
+        backend.run.return_value = 'out\n'
+        self.assertEqual(run_tmux(['list-sessions'], backend=backend), 'out\n')
+        mock_subprocess_run.assert_not_called()
+
+    @patch('subprocess.run')
+    def test_falls_back_when_backend_unavailable(self, mock_subprocess_run):
+        backend = MagicMock()
+        backend.run.side_effect = TmuxControlError('gone')
+        run_tmux(['send-keys', '-t', 's:0', 'x'], backend=backend, capture=False)
+        mock_subprocess_run.assert_called_with(['tmux', 'send-keys', '-t', 's:0', 'x'], check=True)
+
+    def test_reply_timeout_is_not_retried(self):
+        client = TmuxControlClient(timeout=0.05)
+        client._proc = MagicMock()
+        client._proc.poll.return_value = None
+        with self.assertRaises(TmuxReplyTimeout):
+            client.run(['send-keys', '-t', 's:0', 'X'])
+        # The request stays queued for its late reply
+        self.assertEqual(len(client._pending), 1)
+
+        with patch('subprocess.run') as mock_subprocess_run:
+            with self.assertRaises(subprocess.CalledProcessError):
+                run_tmux(['send-keys', '-t', 's:0', 'X'], backend=client, capture=False)
+            mock_subprocess_run.assert_not_called()
+
+    def test_command_errors_are_not_retried(self):
+        backend = MagicMock()
+        backend.run.side_effect = subprocess.CalledProcessError(1, 'cmd')
+        with patch('subprocess.run') as mock_subprocess_run:
+            with self.assertRaises(subprocess.CalledProcessError):
+                run_tmux(['kill-window', '-t', 'x'], backend=backend)
+            mock_subprocess_run.assert_not_called()
+
+
+@unittest.skipUnless(shutil.which('tmux'), 'tmux is not installed')
+class TestTmuxControlClientLive(unittest.TestCase):
+
+    def setUp(self):
+        self.server_args = ['-L', f'test-{uuid.uuid4().hex[:8]}']
+        subprocess.run(['tmux', *self.server_args, 'new-session', '-d', '-s', 'live'], check=True)
+
+    def tearDown(self):
+        subprocess.run(['tmux', *self.server_args, 'kill-server'], capture_output=True)
+
+    def test_round_trip(self):
+        with TmuxControlClient(server_args=self.server_args) as client:
+            self.assertEqual(client.run(['display-message', '-p', 'a"b$HOME #{session_name}']), 'a"b$HOME __orchestrator_ctl\n')
+            self.assertIn('live', client.run(['list-sessions', '-F', '#{session_name}']))
+            with self.assertRaises(subprocess.CalledProcessError):
+                client.run(['no-such-command'])
+            self.assertEqual(client.run(['display-message', '-p', 'a', ';', 'display-message', '-p', 'b']), 'a\nb\n')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,180 @@
+
+import unittest
+from unittest.mock import patch, MagicMock
+import subprocess
+import tempfile
+import time
+import sys
+import os
+
+import yaml
+
+# Add the parent directory to the Python path to allow importing tmux_federation
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from ai_provider import AIOrchestrator, AIProvider
+from tmux_control import parse_server, split_server
+from tmux_federation import FederatedOrchestrator
+from helpers import window_row
+
+
+class FakeServers:
+    """subprocess.run stand-in answering per -L server"""
+
+    def __init__(self, windows, slow=(), delay=2.0):
+        # server -> list-windows output; a missing server isn't running
+        self.windows = windows
+        self.slow = slow
+        self.delay = delay
+
+    def __call__(self, cmd, **kwargs):
+        server, args = cmd[2], cmd[3:]
+        if server in self.slow:
+            time.sleep(self.delay)
+        if server not in self.windows:
+            raise subprocess.CalledProcessError(1, cmd, stderr=f'no server running on /tmp/tmux-0/{server}\n')
+        if args[0] == 'list-windows':
+            return MagicMock(stdout=self.windows[server])
+        if args[0] == 'capture-pane':
+            return MagicMock(stdout=f'{server} {args[2]}\n')
+        return MagicMock(stdout='')
+
+
+class TestTargets(unittest.TestCase):
+
+    def test_parse_server(self):
+        self.assertEqual(parse_server('team-a'), ('team-a', ['-L', 'team-a']))
+        self.assertEqual(parse_server('/tmp/tmux-1000/ops'), ('ops', ['-S', '/tmp/tmux-1000/ops']))
+
+    def test_split_server(self):
+        servers = {'team-a': ['-L', 'team-a']}
+        self.assertEqual(split_server('team-a/proj:0', servers), ('team-a', 'proj:0'))
+        # Unknown prefixes are part of the session name
+        self.assertEqual(split_server('feature/x:1', servers), (None, 'feature/x:1'))
+        self.assertEqual(split_server('proj:0', servers), (None, 'proj:0'))
+
+
+class TestFederatedOrchestrator(unittest.TestCase):
+
+    def setUp(self):
+        self.servers = FakeServers({
+            'team-a': '\n'.join([window_row('proj', '0', 0, 'agent-0', '0'), window_row('proj', '0', 1, 'agent-1', '0')]),
+            'team-b': window_row('api', '0', 0, 'agent-0', '0'),
+        })
+
+    @patch('subprocess.run')
+    def test_sessions_are_merged_and_qualified(self, mock_subprocess_run):
+        mock_subprocess_run.side_effect = self.servers
+        orchestrator = FederatedOrchestrator(['team-a', 'team-b', 'gone'])
+
+        with patch('builtins.print'):
+            sessions = orchestrator.get_tmux_sessions()
+
+        self.assertEqual([session.name for session in sessions], ['team-a/proj', 'team-b/api'])
+        self.assertEqual(sessions[0].windows[1].session_name, 'team-a/proj')
+        self.assertEqual(orchestrator.server_errors, {'gone': 'no server running on /tmp/tmux-0/gone'})
+        self.assertEqual(orchestrator.find_window_by_name('agent-1'), [('team-a/proj', 1)])
+
+    @patch('subprocess.run')
+    def test_status_reports_each_server(self, mock_subprocess_run):
+        mock_subprocess_run.side_effect = self.servers
+        orchestrator = FederatedOrchestrator(['gone', 'team-a', 'team-b'])
+
+        status = orchestrator.get_all_windows_status()
+
+        self.assertEqual([session['name'] for session in status['sessions']], ['team-a/proj', 'team-b/api'])
+        api = status['sessions'][1]['windows'][0]
+        self.assertEqual(api['info']['content'], 'team-b api:0\n')
+        self.assertEqual([server['name'] for server in status['servers']], ['gone', 'team-a', 'team-b'])
+        self.assertIn('error', status['servers'][0])
+        self.assertEqual(status['servers'][1]['sessions'], 1)
+
+    @patch('subprocess.run')
+    def test_slow_server_does_not_delay_others(self, mock_subprocess_run):
+        self.servers.slow = ('team-b',)
+        mock_subprocess_run.side_effect = self.servers
+        orchestrator = FederatedOrchestrator(['team-a', 'team-b'], server_timeout=0.2)
+
+        start = time.monotonic()
+        status = orchestrator.get_all_windows_status()
+
+        self.assertLess(time.monotonic() - start, 1.0)
+        self.assertEqual([session['name'] for session in status['sessions']], ['team-a/proj'])
+        self.assertEqual(status['servers'][1], {'name': 'team-b', 'error': 'Timed out after 0.2s'})
+
+    @patch('subprocess.run')
+    def test_sends_are_routed_to_their_server(self, mock_subprocess_run):
+        orchestrator = FederatedOrchestrator(['team-a', 'team-b'])
+
+        self.assertTrue(orchestrator.send_command_to_window('team-b/api', 0, 'ls', confirm=False))
+        self.assertTrue(orchestrator.send_keys_to_window('local', 2, 'q', confirm=False))
+
+        commands = [call.args[0] for call in mock_subprocess_run.call_args_list]
+        self.assertEqual(commands, [
+            ['tmux', '-L', 'team-b', 'send-keys', '-t', 'api:0', 'ls'],
+            ['tmux', '-L', 'team-b', 'send-keys', '-t', 'api:0', 'C-m'],
+            ['tmux', 'send-keys', '-t', 'local:2', 'q'],
+        ])
+
+
+class TestSendRouting(unittest.TestCase):
+
+    def make_orchestrator(self, tmpdir, settings):
+        config_file = os.path.join(tmpdir, 'ai_config.yml')
+        with open(config_file, 'w') as f:
+            yaml.dump({'default_provider': 'claude', 'providers': {}, 'sessions': {}, 'settings': settings}, f)
+        return AIOrchestrator(config_file=config_file)
+
+    @patch('subprocess.run')
+    @patch('time.sleep')
+    def test_send_message_uses_target_server(self, mock_sleep, mock_subprocess_run):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            orchestrator = self.make_orchestrator(tmpdir, {'tmux_servers': ['team-a', '/run/tmux/ops']})
+
+            self.assertTrue(orchestrator.send_message('ops/deploy', 1, 'status', AIProvider.CLAUDE))
+            self.assertTrue(orchestrator.send_message('proj', 0, 'hi', AIProvider.CLAUDE))
+
+        commands = [call.args[0] for call in mock_subprocess_run.call_args_list]
+        self.assertEqual(commands, [
+            ['tmux', '-S', '/run/tmux/ops', 'send-keys', '-t', 'deploy:1', '-l', 'status'],
+            ['tmux', '-S', '/run/tmux/ops', 'send-keys', '-t', 'deploy:1', 'Enter'],
+            ['tmux', 'send-keys', '-t', 'proj:0', '-l', 'hi'],
+            ['tmux', 'send-keys', '-t', 'proj:0', 'Enter'],
+        ])
+
+    @patch('subprocess.run')
+    @patch('time.sleep')
+    def test_send_with_readiness_routes_every_target(self, mock_sleep, mock_subprocess_run):
+        def tmux(cmd, **kwargs):
+            if 'capture-pane' in cmd:
+                return MagicMock(stdout='> echo hi\n0\n')
+            return MagicMock(stdout='')
+        mock_subprocess_run.side_effect = tmux
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            orchestrator = self.make_orchestrator(tmpdir, {'tmux_servers': ['rvb'],
+                                                           'readiness': {'enabled': True, 'timeout': 1}})
+            self.assertIsNotNone(orchestrator.readiness)
+            self.assertTrue(orchestrator.send_message('rvb/proj', 0, 'echo hi', AIProvider.CLAUDE))
+
+        commands = [call.args[0] for call in mock_subprocess_run.call_args_list]
+        read = next(command for command in commands if 'capture-pane' in command)
+        self.assertEqual(read[:3], ['tmux', '-L', 'rvb'])
+        self.assertEqual([read[i + 1] for i, arg in enumerate(read) if arg == '-t'], ['proj:0', 'proj:0'])
+        self.assertEqual(commands[-1], ['tmux', '-L', 'rvb', 'send-keys', '-t', 'proj:0', 'Enter'])
+
+    @patch('subprocess.run')
+    @patch('time.sleep')
+    def test_pasted_text_uses_target_server(self, mock_sleep, mock_subprocess_run):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            orchestrator = self.make_orchestrator(tmpdir, {'tmux_servers': ['team-a']})
+            self.assertTrue(orchestrator.send_message('team-a/proj', 0, 'line one\nline two', AIProvider.CLAUDE))
+
+        load, paste, enter = [call.args[0] for call in mock_subprocess_run.call_args_list]
+        self.assertEqual(load[:4], ['tmux', '-L', 'team-a', 'load-buffer'])
+        self.assertEqual(paste[:3] + paste[-2:], ['tmux', '-L', 'team-a', '-t', 'proj:0'])
+        self.assertEqual(enter, ['tmux', '-L', 'team-a', 'send-keys', '-t', 'proj:0', 'Enter'])
+
+
+if __name__ == '__main__':
+    unittest.main()
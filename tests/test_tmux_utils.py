@@ -1,39 +1,32 @@
 
 import unittest
+import dataclasses
 from unittest.mock import patch, MagicMock
 import subprocess
+import json
 import sys
+import tempfile
+import threading
+import time
 import os
 
 # Add the parent directory to the Python path to allow importing tmux_utils
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
-from tmux_utils import TmuxOrchestrator, TmuxSession, TmuxWindow
+from tmux_utils import TmuxOrchestrator, TmuxSession, TmuxWindow, PanePosition, FIELD_SEP, WINDOW_FIELDS, RECORD_FIELDS, build_sessions, overlap_end, parse_rows
+from helpers import pane_row, window_row
 
 class TestTmuxOrchestrator(unittest.TestCase):
 
     @patch('subprocess.run')
     def test_get_tmux_sessions(self, mock_subprocess_run):
-        # Mock the output of the tmux list-sessions command
-        mock_sessions_output = '''
-session1:1
-session2:0
-'''
-        # Mock the output of the tmux list-windows command
-        mock_windows_output_s1 = '''
-0:window1:1
-1:window2:0
-'''
-        mock_windows_output_s2 = '''
-0:window3:1
-'''
-
-        # Configure the mock to return different values for different calls
-        mock_subprocess_run.side_effect = [
-            MagicMock(stdout=mock_sessions_output, stderr='', check_returncode=lambda: None),
-            MagicMock(stdout=mock_windows_output_s1, stderr='', check_returncode=lambda: None),
-            MagicMock(stdout=mock_windows_output_s2, stderr='', check_returncode=lambda: None)
-        ]
+        # Mock the output of the single tmux list-windows -a command
+        mock_windows_output = '\n'.join([
+            window_row('session1', '1', 0, 'window1', '1'),
+            window_row('session1', '1', 1, 'window2', '0'),
+            window_row('session2', '0', 0, 'window3', '1'),
+        ]) + '\n'
+        mock_subprocess_run.return_value = MagicMock(stdout=mock_windows_output, stderr='', check_returncode=lambda: None)
 
         orchestrator = TmuxOrchestrator()
         sessions = orchestrator.get_tmux_sessions()
@@ -57,6 +50,34 @@ session2:0
         self.assertEqual(sessions[1].windows[0].window_name, 'window3')
         self.assertTrue(sessions[1].windows[0].active)
 
+        # The whole server is enumerated with one tmux call
+        self.assertEqual(mock_subprocess_run.call_count, 1)
+        self.assertEqual(mock_subprocess_run.call_args.args[0][:3], ['tmux', 'list-windows', '-a'])
+
+    @patch('subprocess.run')
+    def test_get_tmux_sessions_with_control_backend(self, mock_subprocess_run):
+        backend = MagicMock()
+        backend.run.return_value = '\n'.join([
+            window_row('__orchestrator_ctl', '1', 0, 'bash', '1'),
+            window_row('session1', '0', 0, 'window1', '1'),
+        ])
+
+        orchestrator = TmuxOrchestrator(backend=backend)
+        sessions = orchestrator.get_tmux_sessions()
+
+        # The control client's own session is hidden
+        self.assertEqual([s.name for s in sessions], ['session1'])
+        mock_subprocess_run.assert_not_called()
+
+    def test_parse_rows_keeps_delimiters_in_window_name(self):
+        line = window_row('s', '0', 3, 'odd:name' + FIELD_SEP + 'tail', '0')
+        rows = parse_rows(line + '\n\n', WINDOW_FIELDS)
+        self.assertEqual(len(rows), 1)
+        self.assertEqual(rows[0]['window_name'], 'odd:name' + FIELD_SEP + 'tail')
+        window = TmuxWindow.from_row(rows[0])
+        self.assertEqual(window.window_index, 3)
+        self.assertEqual(window.window_id, '@3')
+
 
 
     @patch('subprocess.run')
@@ -70,9 +91,56 @@ session2:0
         self.assertEqual(content, mock_capture_output)
         mock_subprocess_run.assert_called_with(['tmux', 'capture-pane', '-t', 'session1:0', '-p', '-S', '-50'], capture_output=True, text=True, check=True)
 
+    @patch('subprocess.run')
+    def test_capture_window_content_skips_idle_windows(self, mock_subprocess_run):
+        mock_subprocess_run.return_value = MagicMock(stdout='idle output\n')
+        position = PanePosition(pane_id='%1', history_size=10, history_limit=2000, cursor_y=3)
+        window = TmuxWindow(session_name='s', window_index=0, window_name='w', active=True,
+                            activity=int(time.time()) - 60, position=position)
+
+        orchestrator = TmuxOrchestrator()
+        first = orchestrator.capture_window_content('s', 0, window=window)
+        second = orchestrator.capture_window_content('s', 0, window=window)
+
+        self.assertEqual(first, second)
+        self.assertEqual(mock_subprocess_run.call_count, 1)
+        self.assertEqual(orchestrator.capture_cache.hits, 1)
+
+        # New activity means a fresh capture
+        busy = TmuxWindow(session_name='s', window_index=0, window_name='w', active=True,
+                          activity=window.activity + 30, position=position)
+        orchestrator.capture_window_content('s', 0, window=busy)
+        self.assertEqual(mock_subprocess_run.call_count, 2)
+
+    @patch('subprocess.run')
+    def test_capture_window_content_does_not_cache_current_second(self, mock_subprocess_run):
+        mock_subprocess_run.return_value = MagicMock(stdout='output\n')
+        position = PanePosition(pane_id='%1', history_size=0, history_limit=2000, cursor_y=3)
+        window = TmuxWindow(session_name='s', window_index=0, window_name='w', active=True,
+                            activity=int(time.time()) + 5, position=position)
+
+        orchestrator = TmuxOrchestrator()
+        orchestrator.capture_window_content('s', 0, window=window)
+        orchestrator.capture_window_content('s', 0, window=window)
+
+        self.assertEqual(mock_subprocess_run.call_count, 2)
+
+    @patch('subprocess.run')
+    def test_capture_window_content_reads_recorded_log(self, mock_subprocess_run):
+        orchestrator = TmuxOrchestrator()
+        orchestrator.recorder = MagicMock()
+        orchestrator.recorder.log_for.return_value.tail.return_value = memoryview(b'\x1b[1mbuild ok\x1b[0m\r\n$ ')
+
+        content = orchestrator.capture_window_content('session1', 0, num_lines=2)
+
+        self.assertEqual(content, 'build ok\n$ ')
+        orchestrator.recorder.log_for.assert_called_with('session1:0')
+        orchestrator.recorder.log_for.return_value.tail.assert_called_with(2)
+        mock_subprocess_run.assert_not_called()
+
     @patch('subprocess.run')
     def test_get_window_info(self, mock_subprocess_run):
-        mock_display_message_output = 'window1:1:1:layout'
+        mock_display_message_output = window_row('session1', '1', 0, 'window1', '1', panes=1, layout='layout')
         mock_capture_output = 'Line 1\nLine 2\nLine 3'
 
         mock_subprocess_run.side_effect = [
@@ -89,6 +157,19 @@ session2:0
         self.assertEqual(info['layout'], 'layout')
         self.assertEqual(info['content'], mock_capture_output)
 
+    @patch('subprocess.run')
+    def test_get_window_info_reuses_window_metadata(self, mock_subprocess_run):
+        mock_subprocess_run.return_value = MagicMock(stdout='Line 1', stderr='', check_returncode=lambda: None)
+        window = TmuxWindow(session_name='session1', window_index=2, window_name='w', active=False, pane_count=3, layout='lay')
+
+        orchestrator = TmuxOrchestrator()
+        info = orchestrator.get_window_info('session1', 2, window)
+
+        self.assertEqual(info['panes'], 3)
+        self.assertEqual(info['layout'], 'lay')
+        # Only the capture-pane call, no display-message
+        self.assertEqual(mock_subprocess_run.call_count, 1)
+        self.assertEqual(mock_subprocess_run.call_args.args[0][1], 'capture-pane')
 
 
     @patch('builtins.input', return_value='yes')
@@ -101,6 +182,18 @@ session2:0
         self.assertTrue(result)
         mock_subprocess_run.assert_called_with(['tmux', 'send-keys', '-t', 'session1:0', 'echo "Hello"'], check=True)
 
+    @patch('subprocess.run')
+    def test_send_keys_to_window_pastes_multiline_text(self, mock_subprocess_run):
+        orchestrator = TmuxOrchestrator()
+        result = orchestrator.send_keys_to_window('session1', 0, 'first line\nsecond line', confirm=False)
+
+        self.assertTrue(result)
+        load, paste = [call.args[0] for call in mock_subprocess_run.call_args_list]
+        self.assertEqual(load[:2], ['tmux', 'load-buffer'])
+        self.assertEqual(mock_subprocess_run.call_args_list[0].kwargs['input'], b'first line\nsecond line')
+        self.assertEqual(paste[:2], ['tmux', 'paste-buffer'])
+        self.assertEqual(paste[-2:], ['-t', 'session1:0'])
+
     @patch('builtins.input', return_value='no')
     @patch('subprocess.run')
     def test_send_keys_to_window_cancelled(self, mock_subprocess_run, mock_input):
@@ -138,6 +231,53 @@ session2:0
         self.assertEqual(len(status['sessions'][0]['windows']), 1)
         self.assertEqual(status['sessions'][0]['windows'][0]['name'], 'w1')
 
+    @patch.object(TmuxOrchestrator, 'get_tmux_sessions')
+    @patch.object(TmuxOrchestrator, 'get_window_info')
+    def test_get_all_windows_status_concurrent_keeps_order(self, mock_get_window_info, mock_get_tmux_sessions):
+        windows = [TmuxWindow(session_name='s', window_index=i, window_name=f'w{i}', active=i == 0) for i in range(6)]
+        mock_get_tmux_sessions.return_value = [TmuxSession(name='s', windows=windows, attached=False)]
+
+        def slow_first(session_name, window_index, window, num_lines):
+            # Earlier windows finish last
+            time.sleep(0.01 * (6 - window_index))
+            return {'name': window.window_name, 'content': str(window_index)}
+        mock_get_window_info.side_effect = slow_first
+
+        orchestrator = TmuxOrchestrator()
+        status = orchestrator.get_all_windows_status(max_workers=4)
+
+        contents = [w['info']['content'] for w in status['sessions'][0]['windows']]
+        self.assertEqual(contents, ['0', '1', '2', '3', '4', '5'])
+
+    @patch.object(TmuxOrchestrator, 'get_tmux_sessions')
+    @patch.object(TmuxOrchestrator, 'get_window_info')
+    def test_get_all_windows_status_timeout_gives_partial_result(self, mock_get_window_info, mock_get_tmux_sessions):
+        windows = [
+            TmuxWindow(session_name='s', window_index=0, window_name='stuck', active=True, layout='lay'),
+            TmuxWindow(session_name='s', window_index=1, window_name='fine', active=False),
+        ]
+        mock_get_tmux_sessions.return_value = [TmuxSession(name='s', windows=windows, attached=False)]
+        release = threading.Event()
+
+        def stall_first(session_name, window_index, window, num_lines):
+            if window_index == 0:
+                release.wait(5)
+            return {'name': window.window_name, 'content': 'ok'}
+        mock_get_window_info.side_effect = stall_first
+
+        orchestrator = TmuxOrchestrator()
+        try:
+            status = orchestrator.get_all_windows_status(max_workers=2, timeout=0.2)
+        finally:
+            release.set()
+
+        stuck, fine = [w['info'] for w in status['sessions'][0]['windows']]
+        self.assertTrue(stuck['timed_out'])
+        self.assertEqual(stuck['name'], 'stuck')
+        self.assertEqual(stuck['layout'], 'lay')
+        self.assertNotIn('content', stuck)
+        self.assertEqual(fine['content'], 'ok')
+
     @patch.object(TmuxOrchestrator, 'get_tmux_sessions')
     def test_find_window_by_name(self, mock_get_tmux_sessions):
         mock_get_tmux_sessions.return_value = [
@@ -180,23 +320,91 @@ session2:0
         self.assertIn('line1', snapshot)
 
 
-    @patch('subprocess.run')
-    def test_get_tmux_sessions_with_empty_lines(self, mock_subprocess_run):
-        mock_sessions_output = '''
-session1:1
+    def _status(self, windows):
+        return {
+            'timestamp': '2025-07-29T12:00:00',
+            'sessions': [{'name': 'session1', 'attached': True, 'windows': [
+                {'index': index, 'name': name, 'active': active, 'info': {'content': content}}
+                for index, name, active, content in windows
+            ]}]
+        }
 
-session2:0
-'''
-        mock_windows_output = '''
-0:window1:1
+    @patch.object(TmuxOrchestrator, 'get_all_windows_status')
+    def test_create_monitoring_snapshot_changes_only(self, mock_get_all_windows_status):
+        orchestrator = TmuxOrchestrator()
+        mock_get_all_windows_status.return_value = self._status([
+            (0, 'pm', True, 'a\nb\nc'),
+            (1, 'dev', False, 'x\ny'),
+        ])
+        orchestrator.create_monitoring_snapshot()
+
+        mock_get_all_windows_status.return_value = self._status([
+            (0, 'pm', True, 'a\nb\nc'),
+            (1, 'dev', False, 'y\nz'),
+        ])
+        snapshot = orchestrator.create_monitoring_snapshot(changes_only=True)
+
+        self.assertNotIn('pm', snapshot)
+        self.assertIn('Window 1: dev', snapshot)
+        self.assertIn('    + z\n', snapshot)
+        # 'x' scrolled off the top rather than being removed
+        self.assertNotIn('- x', snapshot)
+        self.assertIn('1 window(s) unchanged', snapshot)
+
+        # Nothing changed since
+        snapshot = orchestrator.create_monitoring_snapshot(changes_only=True)
+        self.assertNotIn('Window', snapshot)
+        self.assertIn('2 window(s) unchanged', snapshot)
 
-1:window2:0
-'''
-        mock_subprocess_run.side_effect = [
-            MagicMock(stdout=mock_sessions_output, stderr='', check_returncode=lambda: None),
-            MagicMock(stdout=mock_windows_output, stderr='', check_returncode=lambda: None),
-            MagicMock(stdout=mock_windows_output, stderr='', check_returncode=lambda: None)
-        ]
+    @patch.object(TmuxOrchestrator, 'get_all_windows_status')
+    def test_create_monitoring_snapshot_budget_drops_low_priority(self, mock_get_all_windows_status):
+        mock_get_all_windows_status.return_value = self._status([
+            # Dropping idle frees more than the omitted-windows footer takes
+            (0, 'idle', False, 'quiet ' * 15),
+            (1, 'main', True, 'busy ' * 20),
+        ])
+        orchestrator = TmuxOrchestrator()
+        full = orchestrator.create_monitoring_snapshot()
+        self.assertIn('idle', full)
+
+        orchestrator = TmuxOrchestrator()
+        snapshot = orchestrator.create_monitoring_snapshot(max_chars=len(full) - 20)
+
+        self.assertIn('Window 1: main (ACTIVE)', snapshot)
+        self.assertNotIn('idle', snapshot)
+        self.assertIn('1 lower-priority window(s) omitted', snapshot)
+        self.assertLessEqual(len(snapshot), len(full) - 20)
+
+        # The omitted window is still reported as changed next time
+        snapshot = orchestrator.create_monitoring_snapshot(changes_only=True, max_tokens=1000)
+        self.assertIn('Window 0: idle', snapshot)
+        self.assertNotIn('main', snapshot)
+
+    @patch.object(TmuxOrchestrator, 'get_all_windows_status')
+    def test_create_monitoring_snapshot_never_exceeds_budget(self, mock_get_all_windows_status):
+        windows = [(i, f'agent-{i}', i == 0, f'output {i}\n' * 3) for i in range(6)]
+        mock_get_all_windows_status.return_value = self._status(windows)
+        for max_chars in (0, 40, 100, 250, 350, 450, 1000):
+            orchestrator = TmuxOrchestrator()
+            # Half the windows unchanged, so both footers can show up
+            orchestrator.create_monitoring_snapshot()
+            mock_get_all_windows_status.return_value = self._status(
+                windows[:3] + [(i, name, active, 'new\n') for i, name, active, _ in windows[3:]])
+            for changes_only in (False, True):
+                snapshot = orchestrator.create_monitoring_snapshot(changes_only=changes_only, max_chars=max_chars)
+                self.assertLessEqual(len(snapshot), max_chars)
+            mock_get_all_windows_status.return_value = self._status(windows)
+
+    @patch('subprocess.run')
+    def test_get_tmux_sessions_with_empty_lines(self, mock_subprocess_run):
+        mock_windows_output = '\n'.join([
+            '',
+            window_row('session1', '1', 0, 'window1', '1'),
+            '',
+            window_row('session2', '0', 1, 'window2', '0'),
+            '',
+        ])
+        mock_subprocess_run.return_value = MagicMock(stdout=mock_windows_output, stderr='', check_returncode=lambda: None)
         orchestrator = TmuxOrchestrator()
         sessions = orchestrator.get_tmux_sessions()
         self.assertEqual(len(sessions), 2)
@@ -248,18 +456,308 @@ session2:0
         self.assertFalse(result)
 
 
+def position_line(pane_id, history_size, cursor_y, history_limit=2000):
+    return FIELD_SEP.join([pane_id, str(history_size), str(history_limit), str(cursor_y)])
+
+
+class TestDeltaCapture(unittest.TestCase):
+
+    def test_delta_range(self):
+        orchestrator = TmuxOrchestrator()
+        position = PanePosition(pane_id='%1', history_size=100, history_limit=2000, cursor_y=10)
+        # Lines from watermark 95 up to the line before the cursor (110)
+        self.assertEqual(orchestrator._delta_range(95, position), (-5, 9))
+        # Nothing new
+        self.assertEqual(orchestrator._delta_range(110, position), (10, 9))
+        # No watermark, or the pane was cleared: fall back to the most recent lines
+        self.assertEqual(orchestrator._delta_range(None, position), (-100, 9))
+        self.assertEqual(orchestrator._delta_range(500, position), (-100, 9))
+        orchestrator.max_lines_capture = 5
+        self.assertEqual(orchestrator._delta_range(0, position), (5, 9))
+
+    def test_overlap_end(self):
+        self.assertEqual(overlap_end(['c', 'd'], ['b', 'c', 'd', 'e']), 3)
+        # The latest match wins
+        self.assertEqual(overlap_end(['x'], ['x', 'y', 'x', 'z']), 3)
+        self.assertIsNone(overlap_end(['q'], ['a', 'b']))
+        self.assertIsNone(overlap_end([], ['a']))
+
+    def test_delta_range_saturated_history(self):
+        orchestrator = TmuxOrchestrator()
+        orchestrator.max_lines_capture = 20
+        position = PanePosition(pane_id='%1', history_size=2000, history_limit=2000, cursor_y=10)
+        self.assertEqual(orchestrator._delta_range(2005, position), (-10, 9))
+
+    @patch('subprocess.run')
+    def test_capture_new_lines(self, mock_subprocess_run):
+        mock_subprocess_run.return_value = MagicMock(stdout='new 1\nnew 2\n' + position_line('%1', 10, 4) + '\n')
+        window = TmuxWindow(session_name='s', window_index=0, window_name='w', active=True,
+                            position=PanePosition(pane_id='%1', history_size=10, history_limit=2000, cursor_y=4))
+
+        orchestrator = TmuxOrchestrator()
+        content, watermark = orchestrator.capture_new_lines('s', 0, since=12, window=window)
+
+        self.assertEqual(content, 'new 1\nnew 2\n')
+        self.assertEqual(watermark, 14)
+        # Capture and position read go out as one tmux command list
+        self.assertEqual(mock_subprocess_run.call_count, 1)
+        args = mock_subprocess_run.call_args.args[0]
+        self.assertEqual(args[:9], ['tmux', 'capture-pane', '-t', 's:0', '-p', '-S', '2', '-E', '3'])
+        self.assertIn(';', args)
+
+    @patch('subprocess.run')
+    def test_capture_new_lines_retries_when_history_scrolled(self, mock_subprocess_run):
+        mock_subprocess_run.side_effect = [
+            MagicMock(stdout='stale\n' + position_line('%1', 12, 4) + '\n'),
+            MagicMock(stdout='a\nb\nc\nd\n' + position_line('%1', 12, 4) + '\n'),
+        ]
+        window = TmuxWindow(session_name='s', window_index=0, window_name='w', active=True,
+                            position=PanePosition(pane_id='%1', history_size=10, history_limit=2000, cursor_y=4))
+
+        orchestrator = TmuxOrchestrator()
+        content, watermark = orchestrator.capture_new_lines('s', 0, since=12, window=window)
+
+        self.assertEqual(content, 'a\nb\nc\nd\n')
+        self.assertEqual(watermark, 16)
+        self.assertEqual(mock_subprocess_run.call_args.args[0][6:9], ['0', '-E', '3'])
+
+    @patch('subprocess.run')
+    def test_capture_window_delta_saturated_history(self, mock_subprocess_run):
+        # History is full, so history_size and the watermark stay put while
+        # old lines scroll off; the new part is found by overlap instead
+        full = position_line('%1', 2000, 5, history_limit=2000)
+        mock_subprocess_run.side_effect = [
+            MagicMock(stdout=full + '\n'),
+            MagicMock(stdout='a\nb\nc\nd\ne\n' + full + '\n'),
+            MagicMock(stdout='c\nd\ne\nf\ng\n' + full + '\n'),
+            MagicMock(stdout='c\nd\ne\nf\ng\n' + full + '\n'),
+        ]
+        orchestrator = TmuxOrchestrator()
+        orchestrator.max_lines_capture = 5
+
+        with patch('tmux_utils.OVERLAP_LINES', 3):
+            deltas = [orchestrator.capture_window_delta('s', 0) for _ in range(3)]
+
+        self.assertEqual(deltas, ['a\nb\nc\nd\ne\n', 'f\ng\n', ''])
+        lines = ''.join(deltas).splitlines()
+        self.assertEqual(len(lines), len(set(lines)))
+
+    @patch('subprocess.run')
+    def test_capture_window_delta_tracks_watermark(self, mock_subprocess_run):
+        mock_subprocess_run.side_effect = [
+            MagicMock(stdout=position_line('%1', 0, 2) + '\n'),
+            MagicMock(stdout='one\ntwo\n' + position_line('%1', 0, 2) + '\n'),
+            MagicMock(stdout=position_line('%1', 0, 2) + '\n'),
+        ]
+        orchestrator = TmuxOrchestrator()
+
+        self.assertEqual(orchestrator.capture_window_delta('s', 0), 'one\ntwo\n')
+        # Nothing printed since: only the position is read
+        self.assertEqual(orchestrator.capture_window_delta('s', 0), '')
+        self.assertEqual(mock_subprocess_run.call_args.args[0][1], 'display-message')
+
+
+class TestPanes(unittest.TestCase):
+
+    def setUp(self):
+        self.listing = MagicMock(stdout='\n'.join([
+            pane_row('api', 0, 0, '0', 'npm'),
+            pane_row('api', 0, 1, '1', 'claude'),
+            pane_row('api', 1, 0, '1', 'bash', panes=1),
+        ]) + '\n')
+
+    @patch('subprocess.run')
+    def test_panes_listed_in_one_call(self, mock_subprocess_run):
+        mock_subprocess_run.return_value = self.listing
+        sessions = TmuxOrchestrator().get_tmux_sessions(include_panes=True)
+
+        mock_subprocess_run.assert_called_once()
+        self.assertEqual(mock_subprocess_run.call_args.args[0][:3], ['tmux', 'list-panes', '-a'])
+        split, single = sessions[0].windows
+        self.assertEqual([(p.pane_id, p.current_command, p.pid, p.active) for p in split.panes],
+                         [('%0', 'npm', 4000, False), ('%1', 'claude', 4001, True)])
+        self.assertEqual(split.panes[1].history_size, 100)
+        # The window's position is its active pane's
+        self.assertEqual(split.position.pane_id, '%1')
+        self.assertEqual(len(single.panes), 1)
+
+    @patch('subprocess.run')
+    def test_status_captures_every_pane(self, mock_subprocess_run):
+        mock_subprocess_run.side_effect = lambda cmd, **kwargs: self.listing if cmd[1] == 'list-panes' \
+            else MagicMock(stdout=f'output of {cmd[3]}\n')
+        orchestrator = TmuxOrchestrator()
+        orchestrator.capture_cache = None
+
+        status = orchestrator.get_all_windows_status(max_workers=1, include_panes=True)
+
+        split, single = [window['info'] for window in status['sessions'][0]['windows']]
+        self.assertEqual([(pane['id'], pane['command'], pane['size'], pane['content']) for pane in split['pane_details']],
+                         [('%0', 'npm', '80x24', 'output of %0\n'), ('%1', 'claude', '80x24', 'output of api:0\n')])
+        self.assertNotIn('pane_details', single)
+        # The active pane's window capture is reused rather than captured twice
+        self.assertEqual(mock_subprocess_run.call_count, 4)
+
+    @patch('subprocess.run')
+    def test_pane_capture_is_cached_while_idle(self, mock_subprocess_run):
+        mock_subprocess_run.return_value = self.listing
+        orchestrator = TmuxOrchestrator()
+        pane = orchestrator.get_tmux_sessions(include_panes=True)[0].windows[0].panes[0]
+
+        mock_subprocess_run.reset_mock()
+        mock_subprocess_run.return_value = MagicMock(stdout='npm output\n')
+        self.assertEqual(orchestrator.capture_pane_content(pane, 20), 'npm output\n')
+        self.assertEqual(orchestrator.capture_pane_content(pane, 20), 'npm output\n')
+        mock_subprocess_run.assert_called_once_with(['tmux', 'capture-pane', '-t', '%0', '-p', '-S', '-20'],
+                                                    capture_output=True, text=True, check=True)
+
+class TestCompactModel(unittest.TestCase):
+
+    def test_model_is_frozen_slotted_and_interned(self):
+        output = '\n'.join(window_row('api', '1', i, 'claude', '0') for i in range(2))
+        [session] = build_sessions(parse_rows(output, WINDOW_FIELDS))
+        first, second = session.windows
+
+        self.assertFalse(hasattr(first, '__dict__'))
+        with self.assertRaises(dataclasses.FrozenInstanceError):
+            first.window_name = 'renamed'
+        self.assertIs(first.window_name, second.window_name)
+        self.assertIs(first.session_name, session.name)
+
+    @patch('subprocess.run')
+    def test_status_content_is_the_cached_text(self, mock_subprocess_run):
+        text = '╭──╮ build ok\n'
+        mock_subprocess_run.side_effect = lambda cmd, **kwargs: MagicMock(stdout=text) if cmd[1] == 'capture-pane' \
+            else MagicMock(stdout=window_row('api', '1', 0, 'claude', '1').replace('1700000000', '1000') + '\n')
+        orchestrator = TmuxOrchestrator()
+
+        first = orchestrator.get_all_windows_status()
+        second = orchestrator.get_all_windows_status()
+
+        content = first['sessions'][0]['windows'][0]['info']['content']
+        self.assertEqual(content, text)
+        # The idle window's capture is the cached string itself, not a copy
+        self.assertIs(second['sessions'][0]['windows'][0]['info']['content'], content)
+        self.assertIn('"content": "\\u256d', json.dumps(first))
+        self.assertEqual(orchestrator.capture_window_bytes('api', 0), text.encode())
+
+class TestStreamWindows(unittest.TestCase):
+
+    def setUp(self):
+        self.listing = MagicMock(stdout='\n'.join([
+            window_row('api', '1', 0, 'claude', '1', panes=2),
+            window_row('api', '1', 1, 'tests', '0'),
+            window_row('web', '0', 2, 'claude', '1'),
+        ]) + '\n')
+
+    @patch('subprocess.run')
+    def test_projection_skips_capture(self, mock_subprocess_run):
+        mock_subprocess_run.return_value = self.listing
+        records = list(TmuxOrchestrator().stream_windows(fields=['session', 'name', 'active', 'panes']))
+
+        self.assertEqual(records, [
+            {'session': 'api', 'name': 'claude', 'active': True, 'panes': 2},
+            {'session': 'api', 'name': 'tests', 'active': False, 'panes': 1},
+            {'session': 'web', 'name': 'claude', 'active': True, 'panes': 1},
+        ])
+        self.assertEqual(mock_subprocess_run.call_count, 1)
+
+    @patch('subprocess.run')
+    def test_globs_filter_before_capture(self, mock_subprocess_run):
+        mock_subprocess_run.side_effect = lambda cmd, **kwargs: self.listing if cmd[1] == 'list-windows' \
+            else MagicMock(stdout=f'output of {cmd[3]}\n')
+        orchestrator = TmuxOrchestrator()
+
+        records = list(orchestrator.stream_windows(window_glob='claude'))
+        self.assertEqual(sorted((r['session'], r['index'], r['content']) for r in records),
+                         [('api', 0, 'output of api:0\n'), ('web', 2, 'output of web:2\n')])
+        self.assertEqual(tuple(records[0]), RECORD_FIELDS)
+        records = list(orchestrator.stream_windows(fields=['index'], session_glob='a*', window_glob='1'))
+        self.assertEqual(records, [{'index': 1}])
+        self.assertEqual(mock_subprocess_run.call_count, 4)
+
+    @patch('subprocess.run')
+    def test_records_stream_in_completion_order(self, mock_subprocess_run):
+        mock_subprocess_run.return_value = self.listing
+        release = threading.Event()
+
+        def capture(session_name, window_index, num_lines=50, window=None):
+            if window_index == 0:
+                release.wait(5)
+            return f'{session_name}:{window_index}'
+
+        orchestrator = TmuxOrchestrator()
+        with patch.object(orchestrator, 'capture_window_content', side_effect=capture):
+            stream = orchestrator.stream_windows(fields=['index', 'content'])
+            # The slow first window doesn't hold back the others
+            first, second = next(stream), next(stream)
+            release.set()
+            rest = list(stream)
+
+        self.assertEqual({first['index'], second['index']}, {1, 2})
+        self.assertEqual(rest, [{'index': 0, 'content': 'api:0'}])
+
+    @patch('subprocess.run')
+    def test_stuck_captures_time_out(self, mock_subprocess_run):
+        mock_subprocess_run.return_value = self.listing
+        release = threading.Event()
+        orchestrator = TmuxOrchestrator()
+        capture = lambda session_name, window_index, *args: release.wait(5) if window_index == 2 else 'ok'
+
+        with patch.object(orchestrator, 'capture_window_content', side_effect=capture):
+            records = list(orchestrator.stream_windows(fields=['index', 'content'], timeout=0.1))
+        release.set()
+
+        self.assertEqual(records[-1]['index'], 2)
+        self.assertTrue(records[-1]['timed_out'])
+        self.assertNotIn('content', records[-1])
+
+
 from tmux_utils import main as tmux_main
 
 class TestTmuxUtilsMain(unittest.TestCase):
 
+    def setUp(self):
+        # Keep the shipped ai_config.yml from opening a log in the repo
+        patcher = patch('event_log.configure_from_settings')
+        self.configure_log = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    @patch('tmux_utils.TmuxOrchestrator')
+    def test_main_configures_event_log_from_config(self, MockTmuxOrchestrator):
+        MockTmuxOrchestrator.return_value.get_all_windows_status.return_value = {'sessions': []}
+        with tempfile.TemporaryDirectory() as tmp:
+            config_file = os.path.join(tmp, 'ai_config.yml')
+            with open(config_file, 'w') as f:
+                f.write("settings:\n  log_commands: true\n  log_file: tmux.log\n")
+            with patch('tmux_utils.CONFIG_FILE', config_file), patch('builtins.print'):
+                tmux_main(['tmux_utils.py'])
+
+        self.configure_log.assert_called_once_with({'log_commands': True, 'log_file': 'tmux.log'}, config_file)
+
     @patch('tmux_utils.TmuxOrchestrator')
     def test_main(self, MockTmuxOrchestrator):
         mock_orchestrator_instance = MockTmuxOrchestrator.return_value
         mock_orchestrator_instance.get_all_windows_status.return_value = {'sessions': []}
         with patch('builtins.print') as mock_print:
-            tmux_main()
+            tmux_main(["tmux_utils.py"])
             mock_print.assert_called_with(json.dumps({'sessions': []}, indent=2))
 
+    @patch('tmux_utils.TmuxOrchestrator')
+    def test_main_streams_ndjson(self, MockTmuxOrchestrator):
+        stream = MockTmuxOrchestrator.return_value.stream_windows
+        stream.return_value = iter([{'name': 'claude', 'active': True}, {'name': 'tests', 'active': False}])
+        with patch('sys.stdout') as mock_stdout:
+            tmux_main(['tmux_utils.py', '--fields', 'name,active', '--session', 'api*'])
+
+        stream.assert_called_once_with(fields=['name', 'active'], session_glob='api*')
+        written = ''.join(call.args[0] for call in mock_stdout.write.call_args_list)
+        self.assertEqual([json.loads(line) for line in written.splitlines()],
+                         [{'name': 'claude', 'active': True}, {'name': 'tests', 'active': False}])
+
+    def test_main_rejects_unknown_fields(self):
+        with patch('builtins.print'), self.assertRaises(SystemExit):
+            tmux_main(['tmux_utils.py', '--fields', 'name,bogus'])
+
 if __name__ == '__main__':
     unittest.main()
 
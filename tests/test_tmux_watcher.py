@@ -0,0 +1,101 @@
+import unittest
+from unittest.mock import patch, MagicMock
+import os
+import sys
+
+# Add the parent directory to the Python path to allow importing tmux_watcher
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from tmux_utils import FIELD_SEP, WINDOW_FIELDS, PanePosition, TmuxSession, TmuxWindow
+from tmux_watcher import TmuxWatcher
+
+
+def make_window(session_name, index, name, window_id, pane_id):
+    return TmuxWindow(session_name=session_name, window_index=index, window_name=name, active=index == 0,
+                      window_id=window_id,
+                      position=PanePosition(pane_id=pane_id, history_size=0, history_limit=2000, cursor_y=0))
+
+
+@patch('tmux_watcher.TmuxControlClient')
+class TestTmuxWatcher(unittest.TestCase):
+
+    def make_watcher(self, silence_after=60.0):
+        orchestrator = MagicMock()
+        orchestrator.backend = None
+        orchestrator.server_args = []
+        orchestrator.get_tmux_sessions.return_value = [
+            TmuxSession(name='proj', attached=False, windows=[
+                make_window('proj', 0, 'pm', '@1', '%1'),
+                make_window('proj', 1, 'dev', '@2', '%2'),
+            ])
+        ]
+        watcher = TmuxWatcher(orchestrator, silence_after=silence_after)
+        self.events = []
+        for kind in ('output', 'activity', 'silence', 'window-add', 'window-close', 'window-renamed', 'sessions-changed'):
+            watcher.on(kind, lambda event: self.events.append(event))
+        watcher.resync()
+        return watcher
+
+    def kinds(self):
+        return [(event.kind, event.window.window_name if event.window else None) for event in self.events]
+
+    def test_resync_attaches_one_client_per_session(self, MockClient):
+        watcher = self.make_watcher()
+        MockClient.assert_called_once_with(session='proj', server_args=[], no_output=False)
+        self.assertEqual([w.window_name for w in watcher.sessions()[0].windows], ['pm', 'dev'])
+
+    def test_output_silence_and_activity(self, MockClient):
+        watcher = self.make_watcher(silence_after=30)
+
+        watcher.handle_notification('%output %2 build ok\\015\\012')
+        self.assertEqual(self.events[0].data, b'build ok\r\n')
+        self.assertEqual(self.kinds(), [('output', 'dev')])
+
+        last = watcher._last_output['%2']
+        watcher._check_silence(last + 31)
+        self.assertIn(('silence', 'dev'), self.kinds())
+        self.assertIn(('silence', 'pm'), self.kinds())
+
+        # Reported once, then activity when output resumes
+        self.events.clear()
+        watcher._check_silence(last + 60)
+        watcher.handle_notification('%output %2 more')
+        self.assertEqual(self.kinds(), [('output', 'dev'), ('activity', 'dev')])
+
+    @patch('tmux_watcher.run_tmux')
+    def test_window_add_rename_close(self, mock_run_tmux, MockClient):
+        watcher = self.make_watcher()
+        values = {field: '0' for field in WINDOW_FIELDS}
+        values.update(session_name='proj', window_index='2', window_id='@5', window_name='qa', pane_id='%5')
+        mock_run_tmux.return_value = FIELD_SEP.join(values[field] for field in WINDOW_FIELDS) + '\n'
+
+        watcher.handle_notification('%window-add @5')
+        # Reported again by another session's client
+        watcher.handle_notification('%unlinked-window-add @5')
+        watcher.handle_notification('%window-renamed @5 qa-bot')
+        self.assertEqual([w.window_name for w in watcher.sessions()[0].windows], ['pm', 'dev', 'qa-bot'])
+
+        watcher.handle_notification('%window-close @5')
+        self.assertEqual([w.window_name for w in watcher.sessions()[0].windows], ['pm', 'dev'])
+        self.assertEqual(self.kinds(), [('window-add', 'qa'), ('window-renamed', 'qa-bot'), ('window-close', 'qa-bot')])
+        mock_run_tmux.assert_called_once()
+
+    def test_sessions_changed_resyncs(self, MockClient):
+        watcher = self.make_watcher()
+        watcher.orchestrator.get_tmux_sessions.return_value = []
+
+        watcher.handle_notification('%sessions-changed')
+        watcher.handle_notification('%sessions-changed')
+
+        self.assertEqual(watcher.sessions(), [])
+        MockClient.return_value.close.assert_called_once()
+        self.assertEqual(self.kinds(), [('sessions-changed', None)])
+
+    def test_unknown_event_kind(self, MockClient):
+        watcher = self.make_watcher()
+        with self.assertRaises(ValueError):
+            watcher.on('bogus', print)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,387 @@
+#!/usr/bin/env python3
+
+import itertools
+import os
+import re
+import subprocess
+import sys
+import threading
+import time
+from collections import deque
+from typing import Callable, Container, Deque, List, Optional, Sequence, Tuple
+
+import event_log
+
+# Dedicated session the control client attaches to, so it never shows up as
+# a client on (or resizes) an agent session. It is destroyed once the last
+# control client detaches.
+CONTROL_SESSION = "__orchestrator_ctl"
+
+# Text at least this long, or spanning several lines, is pasted rather than typed
+BULK_THRESHOLD = 512
+
+# Separates the server from the session in server/session:window targets
+SERVER_SEP = "/"
+
+_buffer_ids = itertools.count()
+
+# %output escapes control characters and backslashes as \ooo
+_OCTAL_ESCAPE_RE = re.compile(rb"\\([0-7]{3})")
+
+class TmuxControlError(Exception):
+    """The control-mode connection is unavailable (not a failed tmux command)"""
+
+class TmuxReplyTimeout(TmuxControlError):
+    """A command was sent but its reply didn't come in time; tmux may still run it"""
+
+def quote_arg(arg: str) -> str:
+    """Quote one argument for the tmux command parser used by control mode
+
+    A lone ";" is left bare so it still separates commands, as it does on
+    the tmux command line.
+    """
+    if arg == ";":
+        return arg
+    out = ['"']
+    for char in arg:
+        if char in '\\"$':
+            out.append('\\' + char)
+        elif char == '\n':
+            out.append('\\n')
+        elif char == '\r':
+            out.append('\\r')
+        elif char == '\t':
+            out.append('\\t')
+        elif ord(char) < 32 or ord(char) == 127:
+            out.append('\\%03o' % ord(char))
+        else:
+            out.append(char)
+    out.append('"')
+    return ''.join(out)
+
+class _Request:
+    __slots__ = ("done", "lines", "error", "lost", "blocks")
+
+    def __init__(self, blocks: int = 1):
+        self.done = threading.Event()
+        self.lines: List[str] = []
+        self.error = False
+        self.lost = False
+        # Each command in a ";" list gets its own reply block
+        self.blocks = blocks
+
+class TmuxControlClient:
+    """A persistent `tmux -C` connection that multiplexes commands
+
+    Commands are written one per line and tmux answers them in order with a
+    %begin/%end (or %error) block, so replies are matched to a FIFO of
+    pending requests. Lines outside a block are notifications and are passed
+    to any registered handlers.
+    """
+
+    def __init__(self, session: Optional[str] = None, server_args: Sequence[str] = (),
+                 no_output: bool = True, timeout: float = 10.0):
+        # None attaches to the private CONTROL_SESSION; a name attaches to
+        # that existing session, e.g. to receive %output for its panes
+        self.session = session
+        self.server_args = list(server_args)
+        self.no_output = no_output
+        self.timeout = timeout
+        self._proc: Optional[subprocess.Popen] = None
+        self._reader: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self._pending: Deque[_Request] = deque()
+        self._handlers: List[Callable[[str], None]] = []
+        self._attached = threading.Event()
+        self._closed = False
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def add_notification_handler(self, handler: Callable[[str], None]):
+        """Register a callback for notification lines such as %window-add"""
+        self._handlers.append(handler)
+
+    def is_alive(self) -> bool:
+        return self._proc is not None and self._proc.poll() is None and not self._closed
+
+    def start(self):
+        """Start the control client if it is not already running"""
+        with self._lock:
+            self._start_locked()
+
+    def _start_locked(self):
+        if self._closed:
+            raise TmuxControlError("control client is closed")
+        if self._proc is not None and self._proc.poll() is None:
+            return
+
+        flags = "ignore-size,no-output" if self.no_output else "ignore-size"
+        if self.session is None:
+            cmd = ["tmux", *self.server_args, "-C", "new-session", "-A", "-s", CONTROL_SESSION, "-f", flags]
+        else:
+            cmd = ["tmux", *self.server_args, "-C", "attach-session", "-t", self.session, "-f", flags]
+        try:
+            self._proc = subprocess.Popen(cmd, stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                                          stderr=subprocess.DEVNULL, bufsize=0)
+        except OSError as e:
+            raise TmuxControlError(f"Could not start tmux control client: {e}")
+
+        self._pending.clear()
+        self._attached.clear()
+        self._reader = threading.Thread(target=self._read_loop, args=(self._proc,),
+                                        name="tmux-control-reader", daemon=True)
+        self._reader.start()
+        # Commands sent before the client is attached would resolve their
+        # default target against whatever session tmux picks
+        self._attached.wait(self.timeout)
+        if self.session is None:
+            self._send_locked(["set-option", "-t", CONTROL_SESSION, "destroy-unattached", "on"], _Request())
+
+    def close(self):
+        """Detach the control client and fail any outstanding requests"""
+        with self._lock:
+            self._closed = True
+            proc = self._proc
+        if proc is None:
+            return
+        try:
+            proc.stdin.close()
+        except OSError:
+            pass
+        try:
+            proc.wait(timeout=self.timeout)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+        if self._reader is not None:
+            self._reader.join(timeout=self.timeout)
+
+    def run(self, args: Sequence[str], timeout: Optional[float] = None) -> str:
+        """Run a tmux command and return its output like `tmux <args>` would
+
+        Raises subprocess.CalledProcessError if tmux reports an error,
+        TmuxReplyTimeout if the command was sent but not answered in time,
+        and TmuxControlError if the connection itself fails.
+        """
+        request = _Request(blocks=list(args).count(";") + 1)
+        with self._lock:
+            self._start_locked()
+            self._send_locked(args, request)
+
+        if not request.done.wait(self.timeout if timeout is None else timeout):
+            # The request stays queued so later replies still line up
+            raise TmuxReplyTimeout(f"Timed out waiting for tmux reply to {args[0]}")
+        if request.lost:
+            raise TmuxControlError("tmux control client exited")
+
+        output = "".join(line + "\n" for line in request.lines)
+        if request.error:
+            raise subprocess.CalledProcessError(1, ["tmux", *args], output=output, stderr=output)
+        return output
+
+    def _send_locked(self, args: Sequence[str], request: _Request):
+        line = " ".join(quote_arg(arg) for arg in args) + "\n"
+        self._pending.append(request)
+        try:
+            self._proc.stdin.write(line.encode("utf-8"))
+        except (OSError, ValueError) as e:
+            self._pending.pop()
+            raise TmuxControlError(f"Could not write to tmux control client: {e}")
+
+    def _read_loop(self, proc: subprocess.Popen):
+        block: Optional[List[str]] = None
+        guard: Optional[str] = None
+        ours = False
+        for raw in iter(proc.stdout.readline, b""):
+            line = raw.rstrip(b"\n").decode("utf-8", errors="replace")
+            if block is not None:
+                # Only the %end/%error carrying the same time/number/flags
+                # closes the block; anything else is command output
+                if line.startswith(("%end ", "%error ")) and line.split(" ", 1)[1] == guard:
+                    if ours:
+                        self._complete(block, line.startswith("%error"))
+                    block = None
+                elif ours:
+                    block.append(line)
+                continue
+
+            if line.startswith("%begin "):
+                guard = line.split(" ", 1)[1]
+                parts = guard.split(" ")
+                # Flag bit 1 marks replies to commands this client sent; the
+                # block for the initial attach has no flags
+                ours = len(parts) >= 3 and parts[2].isdigit() and int(parts[2]) & 1 == 1
+                block = []
+            elif line.startswith("%"):
+                if line.startswith("%session-changed "):
+                    self._attached.set()
+                for handler in list(self._handlers):
+                    try:
+                        handler(line)
+                    except Exception as e:
+                        print(f"Error in tmux notification handler: {e}", file=sys.stderr)
+
+        self._attached.set()
+        with self._lock:
+            pending = list(self._pending)
+            self._pending.clear()
+        for request in pending:
+            request.lost = True
+            request.done.set()
+
+    def _complete(self, lines: List[str], error: bool):
+        with self._lock:
+            if not self._pending:
+                return
+            request = self._pending[0]
+            request.lines.extend(lines)
+            request.blocks -= 1
+            # tmux drops the rest of a command list after an error
+            if request.blocks > 0 and not error:
+                return
+            self._pending.popleft()
+        request.error = error
+        request.done.set()
+
+def unescape_output(data: str) -> bytes:
+    """Decode the octal-escaped pane data of an %output notification"""
+    return _OCTAL_ESCAPE_RE.sub(lambda m: bytes([int(m.group(1), 8) & 0xff]), data.encode("utf-8"))
+
+def run_tmux(args: Sequence[str], backend: Optional[TmuxControlClient] = None, capture: bool = True,
+             server_args: Sequence[str] = ()) -> str:
+    """Run a tmux command through the control-mode backend, falling back to subprocess
+
+    server_args (e.g. ["-L", "bench"]) select a tmux server other than the default one.
+    """
+    log = event_log.current()
+    if log is None:
+        return _run_tmux(args, backend, capture, server_args)
+    start = time.perf_counter()
+    try:
+        output = _run_tmux(args, backend, capture, server_args)
+    except Exception as e:
+        log_tmux_call(log, args, start, error=e)
+        raise
+    log_tmux_call(log, args, start, output=output)
+    return output
+
+def _run_tmux(args: Sequence[str], backend: Optional[TmuxControlClient], capture: bool,
+              server_args: Sequence[str]) -> str:
+    if backend is not None:
+        try:
+            return backend.run(args)
+        except TmuxReplyTimeout as e:
+            # The command was sent and may already have run; running it
+            # again would repeat it (typing keys twice)
+            raise subprocess.CalledProcessError(1, ["tmux", *server_args, *args], stderr=str(e)) from e
+        except TmuxControlError:
+            pass
+
+    cmd = ["tmux", *server_args, *args]
+    if capture:
+        return subprocess.run(cmd, capture_output=True, text=True, check=True).stdout
+    subprocess.run(cmd, check=True)
+    return ""
+
+def log_tmux_call(log: "event_log.EventLog", args: Sequence[str], start: float, output: str = "",
+                  error: Optional[BaseException] = None, target: Optional[str] = None,
+                  sent_bytes: Optional[int] = None):
+    """Record a "tmux" event: command, target, bytes sent and received, duration and outcome"""
+    args = list(args)
+    if target is None and "-t" in args[:-1]:
+        target = args[args.index("-t") + 1]
+    fields = {"command": args[0] if args else "", "target": target,
+              "bytes": sum(len(arg.encode("utf-8")) for arg in args[1:]) if sent_bytes is None else sent_bytes,
+              "output_bytes": len(output.encode("utf-8")), "duration": round(time.perf_counter() - start, 6),
+              "ok": error is None}
+    if error is not None:
+        fields["error"] = str(error)
+    log.record("tmux", **fields)
+
+def parse_server(spec: str) -> Tuple[str, List[str]]:
+    """Name and tmux options of a server given as a -L socket name or a -S socket path"""
+    if os.sep in spec:
+        return os.path.basename(spec), ["-S", spec]
+    return spec, ["-L", spec]
+
+def split_server(target: str, servers: Container[str]) -> Tuple[Optional[str], str]:
+    """Split "server/session:window" into the server and the target on it
+
+    Targets without a known server prefix are returned unchanged with None,
+    so session names containing '/' still work.
+    """
+    server, sep, rest = target.partition(SERVER_SEP)
+    if sep and server in servers:
+        return server, rest
+    return None, target
+
+def is_bulk(text: str) -> bool:
+    """Whether text should go through paste_text instead of send-keys"""
+    return len(text) >= BULK_THRESHOLD or "\n" in text
+
+def paste_buffer_name() -> str:
+    """A tmux buffer name unique to this process, for one paste"""
+    return f"orchestrator-{os.getpid()}-{next(_buffer_ids)}"
+
+def paste_buffer_args(name: str, target: str, bracketed: bool = True) -> List[str]:
+    """paste-buffer arguments that paste buffer name into target and delete it"""
+    return ["paste-buffer", *(["-p"] if bracketed else []), "-d", "-b", name, "-t", target]
+
+def log_load_buffer(name: str, target: str, data: bytes, start: float, error: Optional[BaseException] = None):
+    """Record a load-buffer of data in the current event log, if any"""
+    log = event_log.current()
+    if log is not None:
+        log_tmux_call(log, ["load-buffer", "-b", name], start, error=error, target=target, sent_bytes=len(data))
+
+def paste_text(target: str, text: str, backend: Optional[TmuxControlClient] = None, bracketed: bool = True,
+               server_args: Sequence[str] = ()):
+    """Deliver text to a pane as a single paste
+
+    The text is streamed to `tmux load-buffer -` on stdin, so it is not
+    limited by argv size or mangled by key-name and shell parsing, then
+    pasted with paste-buffer (as a bracketed paste if the application asked
+    for one) and the buffer deleted.
+    """
+    name = paste_buffer_name()
+    data = text.encode("utf-8")
+    start = time.perf_counter()
+    try:
+        subprocess.run(["tmux", *server_args, "load-buffer", "-b", name, "-"], input=data,
+                       capture_output=True, check=True)
+    except subprocess.CalledProcessError as e:
+        log_load_buffer(name, target, data, start, error=e)
+        raise
+    log_load_buffer(name, target, data, start)
+    try:
+        run_tmux(paste_buffer_args(name, target, bracketed), backend=backend, capture=False,
+                 server_args=server_args)
+    except subprocess.CalledProcessError:
+        # paste-buffer -d only deletes the buffer once it has pasted it
+        subprocess.run(["tmux", *server_args, "delete-buffer", "-b", name], capture_output=True)
+        raise
+
+def _benchmark(iterations: int = 200):
+    """Compare per-call latency of subprocess and control mode"""
+    args = ["display-message", "-p", "#{pid}"]
+
+    start = time.perf_counter()
+    for _ in range(iterations):
+        run_tmux(args)
+    subprocess_ms = (time.perf_counter() - start) * 1000 / iterations
+
+    with TmuxControlClient() as client:
+        client.run(args)
+        start = time.perf_counter()
+        for _ in range(iterations):
+            client.run(args)
+        control_ms = (time.perf_counter() - start) * 1000 / iterations
+
+    print(f"subprocess:   {subprocess_ms:.3f} ms/call")
+    print(f"control mode: {control_ms:.3f} ms/call")
+
+if __name__ == "__main__":
+    _benchmark(int(sys.argv[1]) if len(sys.argv) > 1 else 200)
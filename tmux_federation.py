@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+
+import json
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from dataclasses import replace
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Sequence, Tuple, TypeVar
+
+import metrics
+from tmux_control import SERVER_SEP, parse_server, split_server
+from tmux_utils import TmuxOrchestrator, TmuxPane, TmuxSession, TmuxWindow, build_sessions, build_status
+
+# Seconds a server gets to answer a federated query before it is reported
+# as timed out and left out of the merged result
+SERVER_TIMEOUT = 30.0
+
+T = TypeVar("T")
+
+def qualify_sessions(server: str, sessions: List[TmuxSession]) -> List[TmuxSession]:
+    """Copies of a server's sessions named server/session"""
+    qualified = []
+    for session in sessions:
+        name = f"{server}{SERVER_SEP}{session.name}"
+        qualified.append(TmuxSession(name=name, attached=session.attached,
+                                     windows=[replace(window, session_name=name,
+                                                      panes=tuple(replace(pane, session_name=name) for pane in window.panes))
+                                              for window in session.windows]))
+    return qualified
+
+class FederatedOrchestrator(TmuxOrchestrator):
+    """TmuxOrchestrator over several tmux servers at once
+
+    servers are -L socket names or -S socket paths. Each server is queried
+    on its own thread and the answers are merged into one session tree
+    whose sessions are named server/session, so every target in it reads
+    server/session:window. Per-window methods route such targets to their
+    server; unqualified targets go to the server of server_args as before.
+
+    A server that is down, or hasn't answered within server_timeout seconds,
+    is left out of the result and reported in server_errors (and in the
+    "servers" list of get_all_windows_status) instead of holding up the
+    others.
+    """
+
+    def __init__(self, servers: Sequence[str], server_timeout: float = SERVER_TIMEOUT,
+                 server_args: Sequence[str] = ()):
+        super().__init__(server_args=server_args)
+        self.servers: Dict[str, TmuxOrchestrator] = {}
+        for spec in servers:
+            name, args = parse_server(spec)
+            self.servers[name] = TmuxOrchestrator(server_args=args)
+        self.server_timeout = server_timeout
+        # Why each server missing from the last merged query was left out
+        self.server_errors: Dict[str, str] = {}
+
+    def _route(self, session_name: str) -> Tuple[Optional[TmuxOrchestrator], str]:
+        """The orchestrator of a server/session name and the session on it; None for unqualified names"""
+        server, session_name = split_server(session_name, self.servers)
+        return (self.servers[server] if server is not None else None), session_name
+
+    def _gather(self, query: Callable[[TmuxOrchestrator], T]) -> List[Tuple[str, T]]:
+        """Run query on every server concurrently
+
+        Returns (server, result) for the servers that answered within
+        server_timeout, in configuration order; the others are recorded in
+        server_errors.
+        """
+        errors: Dict[str, str] = {}
+        results = []
+        executor = ThreadPoolExecutor(max_workers=max(len(self.servers), 1), thread_name_prefix="tmux-server")
+        try:
+            futures = [(name, executor.submit(query, orchestrator)) for name, orchestrator in self.servers.items()]
+            # One deadline for all servers, so slow ones don't add up
+            deadline = time.monotonic() + self.server_timeout
+            for name, future in futures:
+                try:
+                    results.append((name, future.result(timeout=max(deadline - time.monotonic(), 0))))
+                except FutureTimeoutError:
+                    future.cancel()
+                    errors[name] = f"Timed out after {self.server_timeout}s"
+                except (subprocess.CalledProcessError, OSError) as e:
+                    errors[name] = (getattr(e, "stderr", None) or str(e)).strip()
+        finally:
+            # A hung server's query is left to finish in the background
+            executor.shutdown(wait=False, cancel_futures=True)
+        self.server_errors = errors
+        return results
+
+    @metrics.timed("get_tmux_sessions")
+    def get_tmux_sessions(self, include_panes: bool = False) -> List[TmuxSession]:
+        """Sessions of every server that answered, named server/session"""
+        sessions = []
+        query = (lambda orchestrator: orchestrator.query_panes()) if include_panes else \
+            (lambda orchestrator: orchestrator.query_windows())
+        for name, rows in self._gather(query):
+            sessions.extend(qualify_sessions(name, build_sessions(rows)))
+        for name, error in self.server_errors.items():
+            print(f"Error getting tmux sessions from {name}: {error}")
+        metrics.SESSIONS.set(len(sessions))
+        metrics.WINDOWS.set(sum(len(session.windows) for session in sessions))
+        return sessions
+
+    @metrics.timed("get_all_windows_status")
+    def get_all_windows_status(self, max_workers: Optional[int] = None, timeout: Optional[float] = None,
+                               num_lines: int = 50, include_panes: bool = False) -> Dict:
+        """get_all_windows_status merged across servers
+
+        Each server captures its own windows concurrently as in
+        TmuxOrchestrator. The result has an extra "servers" list giving
+        each server's session count or the error it was left out for.
+        """
+        timestamp = datetime.now().isoformat()
+
+        def server_status(orchestrator: TmuxOrchestrator) -> Tuple[List[TmuxSession], List[Dict]]:
+            sessions = build_sessions(orchestrator.query_panes() if include_panes else orchestrator.query_windows())
+            windows = [(session, window) for session in sessions for window in session.windows]
+            return sessions, orchestrator._collect_window_info(
+                windows, max_workers or self.capture_workers,
+                self.capture_timeout if timeout is None else timeout, num_lines)
+
+        sessions, infos, servers = [], [], []
+        for name, (server_sessions, server_infos) in self._gather(server_status):
+            sessions.extend(qualify_sessions(name, server_sessions))
+            infos.extend(server_infos)
+            servers.append({"name": name, "sessions": len(server_sessions)})
+        servers.extend({"name": name, "error": error} for name, error in self.server_errors.items())
+
+        status = build_status(sessions, infos, timestamp)
+        status["servers"] = sorted(servers, key=lambda server: list(self.servers).index(server["name"]))
+        return status
+
+    def capture_window_content(self, session_name: str, window_index: int, num_lines: int = 50,
+                               window: Optional[TmuxWindow] = None) -> str:
+        orchestrator, session_name = self._route(session_name)
+        if orchestrator is None:
+            return super().capture_window_content(session_name, window_index, num_lines, window)
+        return orchestrator.capture_window_content(session_name, window_index, num_lines, window)
+
+    def capture_pane_content(self, pane: TmuxPane, num_lines: int = 50) -> str:
+        orchestrator, session_name = self._route(pane.session_name)
+        if orchestrator is None:
+            return super().capture_pane_content(pane, num_lines)
+        return orchestrator.capture_pane_content(replace(pane, session_name=session_name), num_lines)
+
+    def capture_window_delta(self, session_name: str, window_index: int, window: Optional[TmuxWindow] = None) -> str:
+        orchestrator, session_name = self._route(session_name)
+        if orchestrator is None:
+            return super().capture_window_delta(session_name, window_index, window)
+        return orchestrator.capture_window_delta(session_name, window_index, window)
+
+    def get_window_info(self, session_name: str, window_index: int, window: Optional[TmuxWindow] = None,
+                        num_lines: int = 50) -> Dict:
+        orchestrator, session_name = self._route(session_name)
+        if orchestrator is None:
+            return super().get_window_info(session_name, window_index, window, num_lines)
+        return orchestrator.get_window_info(session_name, window_index, window, num_lines)
+
+    def send_keys_to_window(self, session_name: str, window_index: Optional[int], keys: str,
+                            confirm: bool = True) -> bool:
+        orchestrator, local_session = self._route(session_name)
+        if orchestrator is None:
+            return super().send_keys_to_window(session_name, window_index, keys, confirm)
+        if self.safety_mode and confirm:
+            target = session_name if window_index is None else f"{session_name}:{window_index}"
+            print(f"SAFETY CHECK: About to send '{keys}' to {target}")
+            response = input("Confirm? (yes/no): ")
+            if response.lower() != 'yes':
+                print("Operation cancelled")
+                return False
+        return orchestrator.send_keys_to_window(local_session, window_index, keys, confirm=False)
+
+    def send_command_to_window(self, session_name: str, window_index: Optional[int], command: str,
+                               confirm: bool = True) -> bool:
+        if not self.send_keys_to_window(session_name, window_index, command, confirm):
+            return False
+        orchestrator, session_name = self._route(session_name)
+        server = self if orchestrator is None else orchestrator
+        try:
+            server._tmux(["send-keys", "-t", server.window_target(session_name, window_index), "C-m"], capture=False)
+            return True
+        except (LookupError, subprocess.CalledProcessError) as e:
+            print(f"Error sending Enter key: {e}")
+            return False
+
+def main(argv=None):
+    if argv is None:
+        argv = sys.argv
+
+    if len(argv) < 2:
+        print("Usage: python3 tmux_federation.py <socket_name|socket_path>...")
+        print("Example: python3 tmux_federation.py team-a team-b /tmp/tmux-1000/ops")
+        sys.exit(1)
+
+    orchestrator = FederatedOrchestrator(argv[1:])
+    status = orchestrator.get_all_windows_status()
+    print(json.dumps(status, indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -1,160 +1,781 @@
 #!/usr/bin/env python3
 
 import subprocess
+import difflib
+import fnmatch
+import hashlib
 import json
+import os
+import sys
 import time
-from typing import List, Dict, Optional, Tuple
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, TimeoutError as FutureTimeoutError, wait
+from typing import Iterator, List, Dict, Optional, Sequence, Tuple
 from dataclasses import dataclass
 from datetime import datetime
 
-@dataclass
+import event_log
+import metrics
+from capture_cache import CaptureCache
+from pane_recorder import PaneRecorder, render_text
+from tmux_control import CONTROL_SESSION, TmuxControlClient, is_bulk, paste_text, run_tmux
+
+# Field delimiter for -F format output. Unlike ':' it does not turn up in
+# session or window names; window names go last so a stray one stays part
+# of the name.
+FIELD_SEP = "\x1f"
+
+# One row per window across the whole server, read with a single list-windows -a
+WINDOW_FIELDS = (
+    "session_name",
+    "session_attached",
+    "window_index",
+    "window_id",
+    "window_active",
+    "window_panes",
+    "window_layout",
+    "window_activity",
+    "pane_id",
+    "history_size",
+    "history_limit",
+    "cursor_y",
+    "window_name",
+)
+
+# One row per pane across the whole server, read with a single list-panes -a.
+# The window fields are repeated on every pane row; pane_id, history_size,
+# history_limit and cursor_y describe the row's own pane.
+PANE_FIELDS = WINDOW_FIELDS[:-1] + (
+    "pane_index",
+    "pane_active",
+    "pane_pid",
+    "pane_width",
+    "pane_height",
+    "pane_current_command",
+    "window_name",
+)
+
+# Scroll position of a pane, used to capture only lines added since the last read
+POSITION_FIELDS = (
+    "pane_id",
+    "history_size",
+    "history_limit",
+    "cursor_y",
+)
+
+# Lines of output already read that are looked for in a capture of a pane
+# whose history is full, to tell where the new output starts
+OVERLAP_LINES = 20
+
+# Rough characters-per-token ratio used to turn a token budget into characters
+CHARS_PER_TOKEN = 4
+
+# Fields of the per-window records streamed by stream_windows; only
+# "content" needs a capture-pane
+RECORD_FIELDS = ("session", "attached", "index", "name", "active", "window_id", "pane_id", "panes", "layout",
+                 "activity", "content")
+
+def compact_diff(old: List[str], new: List[str]) -> List[str]:
+    """Diff two tails of output as '- line' / '+ line' entries
+
+    Lines that only scrolled off the top of the old tail are not reported
+    as removed.
+    """
+    diff = []
+    for tag, i1, i2, j1, j2 in difflib.SequenceMatcher(a=old, b=new, autojunk=False).get_opcodes():
+        if tag == 'equal' or (tag == 'delete' and i1 == 0):
+            continue
+        diff.extend(f"- {line}" for line in old[i1:i2])
+        diff.extend(f"+ {line}" for line in new[j1:j2])
+    return diff
+
+def tmux_format(fields: Tuple[str, ...]) -> str:
+    """Build a -F format string that prints the given fields on one line"""
+    return FIELD_SEP.join(f"#{{{field}}}" for field in fields)
+
+def parse_rows(output: str, fields: Tuple[str, ...]) -> List[Dict[str, str]]:
+    """Parse -F format output into one dict per non-empty line"""
+    rows = []
+    for line in output.split('\n'):
+        if not line:
+            continue
+        values = line.split(FIELD_SEP, len(fields) - 1)
+        if len(values) != len(fields):
+            continue
+        rows.append(dict(zip(fields, values)))
+    return rows
+
+# The model classes below are frozen and slotted (no per-instance __dict__),
+# with names interned, so a few thousand windows share their strings and
+# stay cheap to hold; use dataclasses.replace() to change one.
+
+@dataclass(frozen=True, slots=True)
+class PanePosition:
+    pane_id: str
+    history_size: int
+    history_limit: int
+    cursor_y: int
+
+    @classmethod
+    def from_row(cls, row: Dict[str, str]) -> "PanePosition":
+        """Build a position from a row holding the POSITION_FIELDS"""
+        return cls(
+            pane_id=row["pane_id"],
+            history_size=int(row["history_size"] or 0),
+            history_limit=int(row["history_limit"] or 0),
+            cursor_y=int(row["cursor_y"] or 0),
+        )
+
+    @property
+    def watermark(self) -> int:
+        """Line number of the cursor line, counted from the oldest history line"""
+        return self.history_size + self.cursor_y
+
+    @property
+    def saturated(self) -> bool:
+        """Whether history is full, so old lines are dropping off the top"""
+        return self.history_limit > 0 and self.history_size >= self.history_limit
+
+@dataclass(frozen=True, slots=True)
+class TmuxPane:
+    session_name: str
+    window_index: int
+    pane_index: int
+    pane_id: str
+    active: bool
+    current_command: str = ""
+    pid: int = 0
+    width: int = 0
+    height: int = 0
+    # Last activity of the pane's window; tmux keeps no per-pane activity time
+    activity: int = 0
+    position: Optional[PanePosition] = None
+
+    @classmethod
+    def from_row(cls, row: Dict[str, str]) -> "TmuxPane":
+        """Build a pane from a PANE_FIELDS row"""
+        return cls(
+            session_name=sys.intern(row["session_name"]),
+            window_index=int(row["window_index"]),
+            pane_index=int(row["pane_index"]),
+            pane_id=row["pane_id"],
+            active=row["pane_active"] == '1',
+            current_command=sys.intern(row["pane_current_command"]),
+            pid=int(row["pane_pid"] or 0),
+            width=int(row["pane_width"] or 0),
+            height=int(row["pane_height"] or 0),
+            activity=int(row["window_activity"] or 0),
+            position=PanePosition.from_row(row),
+        )
+
+    @property
+    def history_size(self) -> int:
+        return self.position.history_size if self.position else 0
+
+@dataclass(frozen=True, slots=True)
 class TmuxWindow:
     session_name: str
     window_index: int
     window_name: str
     active: bool
+    window_id: str = ""
+    pane_count: int = 1
+    layout: str = ""
+    activity: int = 0
+    # Scroll position of the active pane
+    position: Optional[PanePosition] = None
+    # Every pane of the window, when listed with get_tmux_sessions(include_panes=True)
+    panes: Tuple[TmuxPane, ...] = ()
+
+    @classmethod
+    def from_row(cls, row: Dict[str, str], panes: Tuple[TmuxPane, ...] = ()) -> "TmuxWindow":
+        """Build a window from a WINDOW_FIELDS row, or a PANE_FIELDS row of its active pane"""
+        return cls(
+            session_name=sys.intern(row["session_name"]),
+            window_index=int(row["window_index"]),
+            window_name=sys.intern(row["window_name"]),
+            active=row["window_active"] == '1',
+            window_id=row["window_id"],
+            pane_count=int(row["window_panes"] or 1),
+            layout=row["window_layout"],
+            activity=int(row["window_activity"] or 0),
+            position=PanePosition.from_row(row),
+            panes=panes,
+        )
     
-@dataclass
+@dataclass(frozen=True, slots=True)
 class TmuxSession:
     name: str
     windows: List[TmuxWindow]
     attached: bool
 
+def build_sessions(rows: List[Dict[str, str]]) -> List[TmuxSession]:
+    """Build the session/window tree from WINDOW_FIELDS rows, or PANE_FIELDS rows to include panes"""
+    # list-windows -a / list-panes -a group rows by session, in list-sessions order
+    sessions: Dict[str, TmuxSession] = {}
+    # Pane rows of each window, which are consecutive
+    pane_rows: List[Dict[str, str]] = []
+
+    def add_window(session: TmuxSession, rows: List[Dict[str, str]]):
+        # The window's position is its active pane's
+        active = next((row for row in rows if row["pane_active"] == '1'), rows[0])
+        session.windows.append(TmuxWindow.from_row(active, tuple(TmuxPane.from_row(row) for row in rows)))
+
+    for row in rows:
+        session_name = row["session_name"]
+        session = sessions.get(session_name)
+        if session is None:
+            session = sessions[session_name] = TmuxSession(
+                name=sys.intern(session_name),
+                windows=[],
+                attached=row["session_attached"] not in ('', '0')
+            )
+        if "pane_index" not in row:
+            session.windows.append(TmuxWindow.from_row(row))
+            continue
+        if pane_rows and (pane_rows[0]["session_name"], pane_rows[0]["window_index"]) != \
+                (session_name, row["window_index"]):
+            add_window(sessions[pane_rows[0]["session_name"]], pane_rows)
+            pane_rows = []
+        pane_rows.append(row)
+    if pane_rows:
+        add_window(sessions[pane_rows[0]["session_name"]], pane_rows)
+    return list(sessions.values())
+
+def overlap_end(seen: Sequence[str], lines: List[str]) -> Optional[int]:
+    """Index in lines just past the last run matching seen, or None if seen isn't there"""
+    if not seen:
+        return None
+    seen = list(seen)
+    for end in range(len(lines), len(seen) - 1, -1):
+        if lines[end - len(seen):end] == seen:
+            return end
+    return None
+
+def pane_info(pane: TmuxPane, content: str) -> Dict:
+    """A pane's entry in the "pane_details" of get_window_info"""
+    return {
+        "id": pane.pane_id,
+        "index": pane.pane_index,
+        "active": pane.active,
+        "command": pane.current_command,
+        "pid": pane.pid,
+        "size": f"{pane.width}x{pane.height}",
+        "history_size": pane.history_size,
+        "content": content
+    }
+
+def window_info(window: TmuxWindow, content: str) -> Dict:
+    """The get_window_info dict for a window and its captured content"""
+    return {
+        "name": window.window_name,
+        "active": window.active,
+        "panes": window.pane_count,
+        "layout": window.layout,
+        "content": content
+    }
+
+def timed_out_info(window: TmuxWindow, timeout: float) -> Dict:
+    """Partial window info for a capture that did not finish in time"""
+    return {
+        "name": window.window_name,
+        "active": window.active,
+        "panes": window.pane_count,
+        "layout": window.layout,
+        "error": f"Timed out capturing window after {timeout}s",
+        "timed_out": True
+    }
+
+def build_status(sessions: List[TmuxSession], infos: List[Dict], timestamp: Optional[str] = None) -> Dict:
+    """The get_all_windows_status dict, given window infos in session/window order"""
+    infos = iter(infos)
+    status = {
+        "timestamp": timestamp or datetime.now().isoformat(),
+        "sessions": []
+    }
+    
+    for session in sessions:
+        session_data = {
+            "name": session.name,
+            "attached": session.attached,
+            "windows": []
+        }
+        
+        for window in session.windows:
+            window_data = {
+                "index": window.window_index,
+                "name": window.window_name,
+                "active": window.active,
+                "info": next(infos)
+            }
+            session_data["windows"].append(window_data)
+        
+        status["sessions"].append(session_data)
+    
+    return status
+
+def window_record(session: TmuxSession, window: TmuxWindow, fields: Sequence[str] = RECORD_FIELDS) -> Dict:
+    """The stream_windows record of a window, without content"""
+    values = {
+        "session": session.name,
+        "attached": session.attached,
+        "index": window.window_index,
+        "name": window.window_name,
+        "active": window.active,
+        "window_id": window.window_id,
+        "pane_id": window.position.pane_id if window.position else "",
+        "panes": window.pane_count,
+        "layout": window.layout,
+        "activity": window.activity,
+    }
+    return {field: values[field] for field in fields if field in values}
+
+def matches_glob(pattern: Optional[str], *values) -> bool:
+    return pattern is None or any(fnmatch.fnmatchcase(str(value), pattern) for value in values)
+
 class TmuxOrchestrator:
-    def __init__(self):
+    def __init__(self, backend: Optional[TmuxControlClient] = None, server_args: Sequence[str] = ()):
         self.safety_mode = True
         self.max_lines_capture = 1000
+        # Persistent control-mode connection; None runs each command as a subprocess
+        self.backend = backend
+        # tmux options selecting the server, e.g. ["-L", "bench"]; empty for the default server
+        self.server_args = list(server_args)
+        # Concurrency and per-window timeout (seconds) for get_all_windows_status
+        self.capture_workers = 8
+        self.capture_timeout = 30.0
+        # Lines of recent output shown per window in create_monitoring_snapshot
+        self.snapshot_lines = 10
+        # Last known scroll position, and delta watermark and last lines read, per target
+        self._positions: Dict[str, PanePosition] = {}
+        self._watermarks: Dict[str, Tuple[str, int, Tuple[str, ...]]] = {}
+        # Content hash and recent lines per window from the previous snapshot
+        self._snapshot_state: Dict[str, Tuple[Optional[str], Optional[List[str]]]] = {}
+        # Opt-in pipe-pane recorder; recorded windows are read from their logs
+        self.recorder: Optional[PaneRecorder] = None
+        # Captures of idle windows, reused until the window shows activity; None disables
+        self.capture_cache: Optional[CaptureCache] = CaptureCache(max_entries=512)
+        # Name/role -> %pane_id mapping for windows addressed without an index; created on first use
+        self._resolver = None
+        
+    @property
+    def resolver(self):
+        """TargetResolver over this orchestrator's server"""
+        if self._resolver is None:
+            from target_resolver import TargetResolver
+            self._resolver = TargetResolver(run=self._tmux)
+        return self._resolver
+    
+    def window_target(self, session_name: str, window_index: Optional[int]) -> str:
+        """The -t target of a window
+
+        With a window index this is session:index. Without one, session_name
+        is a %pane_id or @window_id, used as is, or a name, session:name or
+        role=<role> resolved to the window's %pane_id, so the target can't
+        shift when windows are renumbered.
+        """
+        if window_index is None:
+            return self.resolver.target(session_name)
+        return f"{session_name}:{window_index}"
         
-    def get_tmux_sessions(self) -> List[TmuxSession]:
-        """Get all tmux sessions and their windows"""
+    def _tmux(self, args: List[str], capture: bool = True) -> str:
+        """Run a tmux command on the configured backend and return its output"""
+        return run_tmux(args, backend=self.backend, capture=capture, server_args=self.server_args)
+    
+    def query_windows(self) -> List[Dict[str, str]]:
+        """Get every window on the server as WINDOW_FIELDS rows in one tmux call"""
+        output = self._tmux(["list-windows", "-a", "-F", tmux_format(WINDOW_FIELDS)])
+        return [row for row in parse_rows(output, WINDOW_FIELDS)
+                if row["session_name"] != CONTROL_SESSION]
+
+    def query_panes(self) -> List[Dict[str, str]]:
+        """Get every pane on the server as PANE_FIELDS rows in one tmux call"""
+        output = self._tmux(["list-panes", "-a", "-F", tmux_format(PANE_FIELDS)])
+        return [row for row in parse_rows(output, PANE_FIELDS)
+                if row["session_name"] != CONTROL_SESSION]
+
+    @metrics.timed("get_tmux_sessions")
+    def get_tmux_sessions(self, include_panes: bool = False) -> List[TmuxSession]:
+        """Get all tmux sessions and their windows
+
+        With include_panes every window's panes are listed as well, from
+        one list-panes -a call instead of list-windows -a.
+        """
         try:
-            # Get sessions
-            sessions_cmd = ["tmux", "list-sessions", "-F", "#{session_name}:#{session_attached}"]
-            sessions_result = subprocess.run(sessions_cmd, capture_output=True, text=True, check=True)
-            
-            sessions = []
-            for line in sessions_result.stdout.strip().split('\n'):
-                if not line:
-                    continue
-                session_name, attached = line.split(':')
-                
-                # Get windows for this session
-                windows_cmd = ["tmux", "list-windows", "-t", session_name, "-F", "#{window_index}:#{window_name}:#{window_active}"]
-                windows_result = subprocess.run(windows_cmd, capture_output=True, text=True, check=True)
-                
-                windows = []
-                for window_line in windows_result.stdout.strip().split('\n'):
-                    if not window_line:
-                        continue
-                    window_index, window_name, window_active = window_line.split(':')
-                    windows.append(TmuxWindow(
-                        session_name=session_name,
-                        window_index=int(window_index),
-                        window_name=window_name,
-                        active=window_active == '1'
-                    ))
-                
-                sessions.append(TmuxSession(
-                    name=session_name,
-                    windows=windows,
-                    attached=attached == '1'
-                ))
-            
-            return sessions
+            rows = self.query_panes() if include_panes else self.query_windows()
         except subprocess.CalledProcessError as e:
             print(f"Error getting tmux sessions: {e}")
+            metrics.OPERATION_FAILURES.inc("get_tmux_sessions")
             return []
+
+        sessions = build_sessions(rows)
+        metrics.SESSIONS.set(len(sessions))
+        metrics.WINDOWS.set(sum(len(session.windows) for session in sessions))
+        return sessions
     
-    def capture_window_content(self, session_name: str, window_index: int, num_lines: int = 50) -> str:
-        """Safely capture the last N lines from a tmux window"""
+    @metrics.timed("capture_window_content")
+    def capture_window_content(self, session_name: str, window_index: int, num_lines: int = 50,
+                               window: Optional[TmuxWindow] = None) -> str:
+        """Safely capture the last N lines from a tmux window
+
+        Given the window from get_tmux_sessions, content captured earlier is
+        reused from capture_cache while the window shows no new activity.
+        """
         if num_lines > self.max_lines_capture:
             num_lines = self.max_lines_capture
+        
+        recorded = self.tail_recorded(session_name, window_index, num_lines)
+        if recorded is not None:
+            return recorded
+        
+        key, validator, cached = self._cached_capture(num_lines, window)
+        if cached is not None:
+            return cached
             
         try:
-            cmd = ["tmux", "capture-pane", "-t", f"{session_name}:{window_index}", "-p", "-S", f"-{num_lines}"]
-            result = subprocess.run(cmd, capture_output=True, text=True, check=True)
-            return result.stdout
+            content = self._tmux(["capture-pane", "-t", f"{session_name}:{window_index}", "-p", "-S", f"-{num_lines}"])
         except subprocess.CalledProcessError as e:
+            metrics.OPERATION_FAILURES.inc("capture_window_content")
             return f"Error capturing window content: {e}"
+        
+        self._cache_capture(key, validator, window, content)
+        return content
+    
+    def capture_window_bytes(self, session_name: str, window_index: int, num_lines: int = 50,
+                             window: Optional[TmuxWindow] = None) -> bytes:
+        """capture_window_content encoded as UTF-8, for callers that want bytes"""
+        return self.capture_window_content(session_name, window_index, num_lines, window).encode()
     
-    def get_window_info(self, session_name: str, window_index: int) -> Dict:
-        """Get detailed information about a specific window"""
+    @metrics.timed("capture_pane_content")
+    def capture_pane_content(self, pane: TmuxPane, num_lines: int = 50) -> str:
+        """Capture the last N lines of one pane by ID, reusing cached content while it is idle"""
+        num_lines = min(num_lines, self.max_lines_capture)
+        key, validator, cached = self._cached_capture(num_lines, pane)
+        if cached is not None:
+            return cached
+        
         try:
-            cmd = ["tmux", "display-message", "-t", f"{session_name}:{window_index}", "-p", 
-                   "#{window_name}:#{window_active}:#{window_panes}:#{window_layout}"]
-            result = subprocess.run(cmd, capture_output=True, text=True, check=True)
-            
-            if result.stdout.strip():
-                parts = result.stdout.strip().split(':')
-                return {
-                    "name": parts[0],
-                    "active": parts[1] == '1',
-                    "panes": int(parts[2]),
-                    "layout": parts[3],
-                    "content": self.capture_window_content(session_name, window_index)
-                }
+            content = self._tmux(["capture-pane", "-t", pane.pane_id, "-p", "-S", f"-{num_lines}"])
+        except subprocess.CalledProcessError as e:
+            metrics.OPERATION_FAILURES.inc("capture_pane_content")
+            return f"Error capturing pane content: {e}"
+        
+        self._cache_capture(key, validator, pane, content)
+        return content
+    
+    def capture_pane_bytes(self, pane: TmuxPane, num_lines: int = 50) -> bytes:
+        """capture_pane_content encoded as UTF-8, for callers that want bytes"""
+        return self.capture_pane_content(pane, num_lines).encode()
+    
+    def _cached_capture(self, num_lines: int, window: Optional[TmuxWindow]) -> Tuple:
+        """Cache key, validator and any still-valid cached content for a capture of a window (or TmuxPane)"""
+        if window is None or window.position is None or self.capture_cache is None:
+            return None, None, None
+        key = (window.position.pane_id, num_lines)
+        validator = (window.activity, window.position.history_size, window.position.cursor_y)
+        return key, validator, self.capture_cache.get(key, validator)
+    
+    def _cache_capture(self, key, validator, window: Optional[TmuxWindow], content: str):
+        # window_activity only has one-second resolution, so output later in
+        # the same second as the last activity wouldn't invalidate the entry
+        if key is not None and time.time() >= window.activity + 1:
+            self.capture_cache.put(key, validator, content)
+    
+    def start_recording(self, session_name: str, window_index: int, log_dir: Optional[str] = None) -> bool:
+        """Record everything a window prints to an append-only log via pipe-pane"""
+        if self.recorder is None:
+            self.recorder = PaneRecorder(log_dir, run=self._tmux) if log_dir else PaneRecorder(run=self._tmux)
+        try:
+            self.recorder.start(f"{session_name}:{window_index}")
+            return True
+        except subprocess.CalledProcessError as e:
+            print(f"Error starting recording: {e}")
+            return False
+    
+    def stop_recording(self, session_name: str, window_index: int) -> bool:
+        """Stop recording a window; its log is kept"""
+        if self.recorder is None:
+            return False
+        try:
+            self.recorder.stop(f"{session_name}:{window_index}")
+            return True
+        except subprocess.CalledProcessError as e:
+            print(f"Error stopping recording: {e}")
+            return False
+    
+    def tail_recorded(self, session_name: str, window_index: int, num_lines: int = 50) -> Optional[str]:
+        """Last N lines of a recorded window's log, or None if it isn't recorded"""
+        log = self.recorder.log_for(f"{session_name}:{window_index}") if self.recorder else None
+        if log is None:
+            return None
+        return render_text(log.tail(num_lines))
+    
+    def slice_recorded(self, session_name: str, window_index: int, start: int, stop: Optional[int] = None) -> Optional[str]:
+        """Lines [start, stop) of a recorded window's full log, or None if it isn't recorded"""
+        log = self.recorder.log_for(f"{session_name}:{window_index}") if self.recorder else None
+        if log is None:
+            return None
+        return render_text(log.slice(start, stop))
+    
+    def get_pane_position(self, session_name: str, window_index: int) -> PanePosition:
+        """Read the scroll position of a window's active pane"""
+        target = f"{session_name}:{window_index}"
+        output = self._tmux(["display-message", "-t", target, "-p", tmux_format(POSITION_FIELDS)])
+        position = PanePosition.from_row(parse_rows(output.strip(), POSITION_FIELDS)[0])
+        self._positions[target] = position
+        return position
+    
+    def capture_new_lines(self, session_name: str, window_index: int, since: Optional[int] = None,
+                          window: Optional[TmuxWindow] = None, seen: Sequence[str] = ()) -> Tuple[str, int]:
+        """Capture the complete lines written after watermark `since`
+
+        Returns the new text and the watermark to pass on the next call. With
+        no watermark, or after the pane was cleared, this returns the last
+        max_lines_capture lines instead. Once the pane's history is full,
+        scrolled-off lines can't be counted, so the last lines read before
+        (`seen`, up to OVERLAP_LINES) are found in the capture and only what
+        follows them is returned. The cursor line is left for the next call
+        because it may still be incomplete.
+        """
+        target = f"{session_name}:{window_index}"
+        estimate = window.position if window is not None and window.position else self._positions.get(target)
+        if estimate is None:
+            estimate = self.get_pane_position(session_name, window_index)
+        
+        # Capture and re-read the position in one tmux call; if history
+        # scrolled since the estimate the line numbers were off, so retry
+        for _ in range(3):
+            start, end = self._delta_range(since, estimate)
+            args = ["display-message", "-t", target, "-p", tmux_format(POSITION_FIELDS)]
+            if start <= end:
+                args = ["capture-pane", "-t", target, "-p", "-S", str(start), "-E", str(end), ";"] + args
+            head, sep, last = self._tmux(args).rstrip('\n').rpartition('\n')
+            position = PanePosition.from_row(parse_rows(last, POSITION_FIELDS)[0])
+            self._positions[target] = position
+            if position == estimate:
+                break
+            estimate = position
+        
+        content = head + sep if start <= end else ""
+        if content and seen and position.saturated:
+            lines = content.split("\n")[:-1]
+            skip = overlap_end(seen, lines)
+            if skip is not None:
+                content = "".join(line + "\n" for line in lines[skip:])
+        return content, position.history_size + end + 1
+    
+    def _delta_range(self, since: Optional[int], position: PanePosition) -> Tuple[int, int]:
+        """Pane-relative -S/-E range of complete lines after watermark `since`"""
+        end = position.cursor_y - 1
+        start = end - self.max_lines_capture + 1
+        if since is not None and since <= position.watermark and not position.saturated:
+            start = max(start, since - position.history_size)
+        return max(start, -position.history_size), end
+    
+    def capture_window_delta(self, session_name: str, window_index: int, window: Optional[TmuxWindow] = None) -> str:
+        """Capture only what a window printed since the previous call for it"""
+        target = f"{session_name}:{window_index}"
+        pane_id, since, seen = self._watermarks.get(target, ("", None, ()))
+        content, watermark = self.capture_new_lines(session_name, window_index, since, window, seen)
+        if since is not None and self._positions[target].pane_id != pane_id:
+            # A different pane is active now and its watermark is unknown
+            content, watermark = self.capture_new_lines(session_name, window_index)
+            seen = ()
+        if content:
+            seen = tuple((list(seen) + content.split("\n")[:-1])[-OVERLAP_LINES:])
+        self._watermarks[target] = (self._positions[target].pane_id, watermark, seen)
+        return content
+    
+    def get_window_info(self, session_name: str, window_index: int, window: Optional[TmuxWindow] = None,
+                        num_lines: int = 50) -> Dict:
+        """Get detailed information about a specific window
+
+        Pass the TmuxWindow from get_tmux_sessions to reuse its metadata
+        instead of asking tmux for it again. If it was listed with its panes
+        and has several, each pane is captured too and listed under
+        "pane_details" (id, index, active, command, pid, size, history_size,
+        content).
+        """
+        try:
+            if window is None:
+                output = self._tmux(["display-message", "-t", f"{session_name}:{window_index}", "-p",
+                                     tmux_format(WINDOW_FIELDS)])
+                rows = parse_rows(output.strip(), WINDOW_FIELDS)
+                if not rows:
+                    return None
+                window = TmuxWindow.from_row(rows[0])
+
+            info = window_info(window, self.capture_window_content(session_name, window_index, num_lines, window))
+            if len(window.panes) > 1:
+                info["pane_details"] = [
+                    pane_info(pane, info["content"] if pane.active else self.capture_pane_content(pane, num_lines))
+                    for pane in window.panes]
+            return info
         except subprocess.CalledProcessError as e:
             return {"error": f"Could not get window info: {e}"}
     
-    def send_keys_to_window(self, session_name: str, window_index: int, keys: str, confirm: bool = True) -> bool:
-        """Safely send keys to a tmux window with confirmation"""
+    def send_keys_to_window(self, session_name: str, window_index: Optional[int], keys: str,
+                            confirm: bool = True) -> bool:
+        """Safely send keys to a tmux window with confirmation
+
+        Pass window_index None to address the window by ID, name or role
+        (see window_target).
+        """
+        try:
+            target = self.window_target(session_name, window_index)
+        except (LookupError, subprocess.CalledProcessError) as e:
+            print(f"Error resolving {session_name}: {e}")
+            return False
+        
         if self.safety_mode and confirm:
-            print(f"SAFETY CHECK: About to send '{keys}' to {session_name}:{window_index}")
+            print(f"SAFETY CHECK: About to send '{keys}' to {target}")
             response = input("Confirm? (yes/no): ")
             if response.lower() != 'yes':
                 print("Operation cancelled")
                 return False
         
         try:
-            cmd = ["tmux", "send-keys", "-t", f"{session_name}:{window_index}", keys]
-            subprocess.run(cmd, check=True)
+            if is_bulk(keys):
+                # Pasted in one go rather than as a huge send-keys argument
+                paste_text(target, keys, backend=self.backend, server_args=self.server_args)
+            else:
+                self._tmux(["send-keys", "-t", target, keys], capture=False)
             return True
         except subprocess.CalledProcessError as e:
+            if window_index is None:
+                # The pane may have closed; look the target up again next time
+                self.resolver.invalidate()
             print(f"Error sending keys: {e}")
             return False
     
-    def send_command_to_window(self, session_name: str, window_index: int, command: str, confirm: bool = True) -> bool:
+    def send_command_to_window(self, session_name: str, window_index: Optional[int], command: str,
+                               confirm: bool = True) -> bool:
         """Send a command to a window (adds Enter automatically)"""
         # First send the command text
         if not self.send_keys_to_window(session_name, window_index, command, confirm):
             return False
         # Then send the actual Enter key (C-m)
         try:
-            cmd = ["tmux", "send-keys", "-t", f"{session_name}:{window_index}", "C-m"]
-            subprocess.run(cmd, check=True)
+            self._tmux(["send-keys", "-t", self.window_target(session_name, window_index), "C-m"], capture=False)
             return True
-        except subprocess.CalledProcessError as e:
+        except (LookupError, subprocess.CalledProcessError) as e:
             print(f"Error sending Enter key: {e}")
             return False
     
-    def get_all_windows_status(self) -> Dict:
-        """Get status of all windows across all sessions"""
-        sessions = self.get_tmux_sessions()
-        status = {
-            "timestamp": datetime.now().isoformat(),
-            "sessions": []
-        }
+    @metrics.timed("get_all_windows_status")
+    def get_all_windows_status(self, max_workers: Optional[int] = None, timeout: Optional[float] = None,
+                               num_lines: int = 50, include_panes: bool = False) -> Dict:
+        """Get status of all windows across all sessions
+
+        Windows are captured concurrently on up to max_workers threads
+        (default capture_workers). A window that takes longer than timeout
+        seconds (default capture_timeout) is reported with its metadata and
+        a timeout error instead of holding up the rest of the report. With
+        include_panes, windows split into several panes get "pane_details"
+        with every pane's output (see get_window_info).
+        """
+        timestamp = datetime.now().isoformat()
+        sessions = self.get_tmux_sessions(include_panes=include_panes)
+        windows = [(session, window) for session in sessions for window in session.windows]
+        infos = self._collect_window_info(windows, max_workers or self.capture_workers,
+                                          self.capture_timeout if timeout is None else timeout, num_lines)
+        return build_status(sessions, infos, timestamp)
+    
+    def _collect_window_info(self, windows: List[Tuple[TmuxSession, TmuxWindow]], max_workers: int,
+                             timeout: Optional[float], num_lines: int) -> List[Dict]:
+        """Run get_window_info for each window, returning results in input order"""
+        if max_workers <= 1 or len(windows) <= 1:
+            return [self.get_window_info(session.name, window.window_index, window, num_lines)
+                    for session, window in windows]
         
-        for session in sessions:
-            session_data = {
-                "name": session.name,
-                "attached": session.attached,
-                "windows": []
-            }
-            
-            for window in session.windows:
-                window_info = self.get_window_info(session.name, window.window_index)
-                window_data = {
-                    "index": window.window_index,
-                    "name": window.window_name,
-                    "active": window.active,
-                    "info": window_info
-                }
-                session_data["windows"].append(window_data)
-            
-            status["sessions"].append(session_data)
+        started: Dict[int, float] = {}
+        
+        def task(position: int, session: TmuxSession, window: TmuxWindow) -> Dict:
+            started[position] = time.monotonic()
+            return self.get_window_info(session.name, window.window_index, window, num_lines)
+        
+        executor = ThreadPoolExecutor(max_workers=min(max_workers, len(windows)),
+                                      thread_name_prefix="tmux-capture")
+        try:
+            futures = [executor.submit(task, position, session, window)
+                       for position, (session, window) in enumerate(windows)]
+            results = []
+            for position, future in enumerate(futures):
+                try:
+                    results.append(self._wait_for_window(future, started, position, timeout))
+                except FutureTimeoutError:
+                    future.cancel()
+                    metrics.CAPTURE_TIMEOUTS.inc()
+                    results.append(timed_out_info(windows[position][1], timeout))
+            return results
+        finally:
+            # Don't wait on captures that already timed out
+            executor.shutdown(wait=False, cancel_futures=True)
+    
+    @staticmethod
+    def _wait_for_window(future: Future, started: Dict[int, float], position: int,
+                         timeout: Optional[float]) -> Dict:
+        """Wait for one capture, timing it from when it started rather than when it was queued"""
+        if timeout is None:
+            return future.result()
+        while True:
+            start = started.get(position)
+            remaining = 0.05 if start is None else start + timeout - time.monotonic()
+            try:
+                return future.result(timeout=max(remaining, 0))
+            except FutureTimeoutError:
+                if start is not None:
+                    raise
+    
+    def stream_windows(self, fields: Sequence[str] = RECORD_FIELDS, session_glob: Optional[str] = None,
+                       window_glob: Optional[str] = None, num_lines: int = 50, max_workers: Optional[int] = None,
+                       timeout: Optional[float] = None) -> Iterator[Dict]:
+        """Yield one record (see RECORD_FIELDS) per window as soon as it is ready
+
+        Unlike get_all_windows_status nothing is held back until every
+        window is captured, so output can be written while slower windows
+        are still being read, in completion order. Windows are filtered
+        before capturing by glob on session name (session_glob) and on
+        window name or index (window_glob). Without "content" in fields no
+        window is captured at all. If no capture finishes within timeout
+        seconds (default capture_timeout) the remaining windows are yielded
+        with a timeout error.
+        """
+        windows = [(session, window) for session in self.get_tmux_sessions()
+                   if matches_glob(session_glob, session.name)
+                   for window in session.windows if matches_glob(window_glob, window.window_name, window.window_index)]
+        if "content" not in fields:
+            for session, window in windows:
+                yield window_record(session, window, fields)
+            return
+        if not windows:
+            return
         
-        return status
+        timeout = self.capture_timeout if timeout is None else timeout
+        
+        def capture(session: TmuxSession, window: TmuxWindow) -> Dict:
+            record = window_record(session, window, fields)
+            record["content"] = self.capture_window_content(session.name, window.window_index, num_lines, window)
+            return record
+        
+        executor = ThreadPoolExecutor(max_workers=min(max_workers or self.capture_workers, len(windows)),
+                                      thread_name_prefix="tmux-capture")
+        try:
+            futures = {executor.submit(capture, session, window): (session, window) for session, window in windows}
+            pending = set(futures)
+            while pending:
+                done, pending = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+                if not done:
+                    for future in pending:
+                        future.cancel()
+                        metrics.CAPTURE_TIMEOUTS.inc()
+                        record = window_record(*futures[future], fields)
+                        record.update(error=f"Timed out capturing window after {timeout}s", timed_out=True)
+                        yield record
+                    break
+                for future in done:
+                    yield future.result()
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
     
     def find_window_by_name(self, window_name: str) -> List[Tuple[str, int]]:
         """Find windows by name across all sessions"""
@@ -168,37 +789,158 @@ class TmuxOrchestrator:
         
         return matches
     
-    def create_monitoring_snapshot(self) -> str:
-        """Create a comprehensive snapshot for Claude analysis"""
-        status = self.get_all_windows_status()
+    def create_monitoring_snapshot(self, changes_only: bool = False, max_chars: Optional[int] = None,
+                                   max_tokens: Optional[int] = None) -> str:
+        """Create a comprehensive snapshot for Claude analysis
+
+        With changes_only, windows whose recent output is unchanged since the
+        previous snapshot are left out and changed ones are shown as a
+        compact diff. max_chars / max_tokens cap the size of the snapshot by
+        dropping windows in priority order: changed before unchanged, then
+        active before inactive.
+        """
+        # Only the last few lines are shown, so don't capture more than that
+        status = self.get_all_windows_status(num_lines=self.snapshot_lines)
+        if max_tokens is not None:
+            token_chars = max_tokens * CHARS_PER_TOKEN
+            max_chars = token_chars if max_chars is None else min(max_chars, token_chars)
         
         # Format for Claude consumption
-        snapshot = f"Tmux Monitoring Snapshot - {status['timestamp']}\n"
-        snapshot += "=" * 50 + "\n\n"
-        
-        for session in status['sessions']:
-            snapshot += f"Session: {session['name']} ({'ATTACHED' if session['attached'] else 'DETACHED'})\n"
-            snapshot += "-" * 30 + "\n"
+        header = f"Tmux Monitoring Snapshot - {status['timestamp']}\n" + "=" * 50 + "\n\n"
+        session_headers = []
+        sections = []
+        unchanged = 0
+        for session_position, session in enumerate(status['sessions']):
+            session_headers.append(
+                f"Session: {session['name']} ({'ATTACHED' if session['attached'] else 'DETACHED'})\n" + "-" * 30 + "\n")
             
             for window in session['windows']:
-                snapshot += f"  Window {window['index']}: {window['name']}"
-                if window['active']:
-                    snapshot += " (ACTIVE)"
-                snapshot += "\n"
+                key = f"{session['name']}:{window['index']}"
+                info = window['info'] or {}
+                recent = None
+                if 'content' in info:
+                    # Get last few lines for overview
+                    recent = [line for line in info['content'].split('\n')[-self.snapshot_lines:]
+                              if line.strip()]
+                digest = hashlib.sha1("\n".join(recent).encode()).hexdigest() if recent is not None else None
+                previous = self._snapshot_state.get(key)
+                changed = previous is None or previous[0] != digest
+                if changes_only and not changed:
+                    unchanged += 1
+                    continue
                 
-                if 'content' in window['info']:
-                    # Get last 10 lines for overview
-                    content_lines = window['info']['content'].split('\n')
-                    recent_lines = content_lines[-10:] if len(content_lines) > 10 else content_lines
-                    snapshot += "    Recent output:\n"
-                    for line in recent_lines:
-                        if line.strip():
-                            snapshot += f"    | {line}\n"
-                snapshot += "\n"
-        
-        return snapshot
+                lines = [f"  Window {window['index']}: {window['name']}{' (ACTIVE)' if window['active'] else ''}\n"]
+                if recent is not None and changes_only and previous is not None and previous[1] is not None:
+                    lines.append("    Changes:\n")
+                    lines.extend(f"    {line}\n" for line in compact_diff(previous[1], recent))
+                elif recent is not None:
+                    lines.append("    Recent output:\n")
+                    lines.extend(f"    | {line}\n" for line in recent)
+                lines.append("\n")
+                priority = (not changed, not window['active'], len(sections))
+                sections.append((priority, session_position, key, (digest, recent), "".join(lines)))
+        
+        unchanged_footer = f"{unchanged} window(s) unchanged since the last snapshot\n" if unchanged else ""
+        
+        def fill(reserved: int) -> set:
+            """Keys of the windows that fit with reserved characters kept for footers, highest priority first"""
+            included = set()
+            shown_sessions = set()
+            used = len(header) + len(unchanged_footer) + reserved
+            for priority, session_position, key, state, text in sorted(sections):
+                cost = len(text) + (0 if session_position in shown_sessions else len(session_headers[session_position]))
+                if max_chars is not None and used + cost > max_chars:
+                    continue
+                used += cost
+                included.add(key)
+                shown_sessions.add(session_position)
+            return included
+        
+        included = fill(0)
+        if len(included) < len(sections):
+            # Some windows are left out, so make room for saying so
+            included = fill(len(f"{len(sections)} lower-priority window(s) omitted to fit the budget\n"))
+        
+        parts = [header]
+        last_session = None
+        for priority, session_position, key, state, text in sections:
+            if key not in included:
+                continue
+            if session_position != last_session:
+                parts.append(session_headers[session_position])
+                last_session = session_position
+            parts.append(text)
+            # Windows dropped for the budget keep their old state so their
+            # changes are still reported next time
+            self._snapshot_state[key] = state
+        
+        parts.append(unchanged_footer)
+        if len(included) < len(sections):
+            parts.append(f"{len(sections) - len(included)} lower-priority window(s) omitted to fit the budget\n")
+        snapshot = "".join(parts)
+        # Only a budget smaller than the header and footers themselves is cut
+        return snapshot if max_chars is None else snapshot[:max_chars]
+
+# Read by main for its logging settings, like AIOrchestrator's default
+CONFIG_FILE = "ai_config.yml"
+
+def main(argv=None):
+    if argv is None:
+        argv = sys.argv
+
+    usage = ("Usage: python3 tmux_utils.py [--ndjson] [--fields name,active,...] [--session GLOB] "
+             "[--window GLOB] [--lines N] [--panes]\n"
+             f"Fields: {','.join(RECORD_FIELDS)}")
+    options = {}
+    ndjson = False
+    args = argv[1:]
+    try:
+        while args:
+            option = args.pop(0)
+            if option == "--ndjson":
+                ndjson = True
+            elif option == "--fields":
+                options["fields"] = [field.strip() for field in args.pop(0).split(",") if field.strip()]
+                unknown = set(options["fields"]) - set(RECORD_FIELDS)
+                if unknown or not options["fields"]:
+                    raise ValueError(unknown)
+            elif option == "--session":
+                options["session_glob"] = args.pop(0)
+            elif option == "--window":
+                options["window_glob"] = args.pop(0)
+            elif option == "--lines":
+                options["num_lines"] = int(args.pop(0))
+            elif option == "--panes":
+                options["include_panes"] = True
+            else:
+                raise ValueError(option)
+    except (IndexError, ValueError):
+        print(usage)
+        sys.exit(1)
+
+    # Log tmux calls when ai_config.yml turns on settings.log_commands, as the AI orchestrator does
+    from ai_provider import load_config_file
+    config = load_config_file(CONFIG_FILE) or {}
+    event_log.configure_from_settings(config.get("settings") or {}, CONFIG_FILE)
 
-if __name__ == "__main__":
     orchestrator = TmuxOrchestrator()
-    status = orchestrator.get_all_windows_status()
-    print(json.dumps(status, indent=2))
\ No newline at end of file
+    if not ndjson and not options.keys() - {"num_lines", "include_panes"}:
+        status = orchestrator.get_all_windows_status(**options)
+        print(json.dumps(status, indent=2))
+        return
+    if options.pop("include_panes", False):
+        # Streamed records are per window
+        print(usage)
+        sys.exit(1)
+
+    # Projections and filters stream one JSON object per line
+    try:
+        for record in orchestrator.stream_windows(**options):
+            sys.stdout.write(json.dumps(record) + "\n")
+            sys.stdout.flush()
+    except BrokenPipeError:
+        # The reader (e.g. head) has gone; keep the exit-time flush from failing too
+        os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+
+if __name__ == "__main__":
+    main()
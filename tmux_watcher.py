@@ -0,0 +1,249 @@
+#!/usr/bin/env python3
+
+import queue
+import subprocess
+import sys
+import threading
+import time
+from dataclasses import dataclass, replace
+from typing import Callable, Dict, List, Optional, Set
+
+from tmux_control import TmuxControlClient, TmuxControlError, run_tmux, unescape_output
+from tmux_utils import TmuxOrchestrator, TmuxSession, TmuxWindow, WINDOW_FIELDS, parse_rows, tmux_format
+
+EVENT_KINDS = ("output", "activity", "silence", "window-add", "window-close", "window-renamed", "sessions-changed")
+
+@dataclass
+class WatchEvent:
+    kind: str
+    window: Optional[TmuxWindow] = None
+    pane_id: str = ""
+    data: bytes = b""
+    timestamp: float = 0.0
+
+class TmuxWatcher:
+    """Live session/window model driven by tmux control-mode notifications
+
+    tmux only sends %output for panes in a control client's own session, so
+    the watcher attaches one output-receiving control client per session.
+    Notifications are handled, and callbacks run, on a single event thread:
+
+        watcher = TmuxWatcher(silence_after=120)
+        watcher.on("silence", lambda event: print(event.window.window_name, "went quiet"))
+        watcher.start()
+
+    Note that tmux counts these clients in #{session_attached}.
+    """
+
+    def __init__(self, orchestrator: Optional[TmuxOrchestrator] = None, silence_after: float = 60.0):
+        self.orchestrator = orchestrator or TmuxOrchestrator()
+        # Seconds without output before a pane is reported silent
+        self.silence_after = silence_after
+        self._callbacks: Dict[str, List[Callable[[WatchEvent], None]]] = {kind: [] for kind in EVENT_KINDS}
+        self._events: "queue.Queue[Optional[str]]" = queue.Queue()
+        self._clients: Dict[str, TmuxControlClient] = {}
+        self._lock = threading.Lock()
+        self._sessions: Dict[str, TmuxSession] = {}
+        self._windows: Dict[str, TmuxWindow] = {}
+        self._pane_windows: Dict[str, str] = {}
+        self._last_output: Dict[str, float] = {}
+        self._silent: Set[str] = set()
+        self._thread: Optional[threading.Thread] = None
+
+    def on(self, kind: str, callback: Callable[[WatchEvent], None]):
+        """Register a callback for one of EVENT_KINDS"""
+        if kind not in self._callbacks:
+            raise ValueError(f"Unknown event kind '{kind}'. Available: {', '.join(EVENT_KINDS)}")
+        self._callbacks[kind].append(callback)
+
+    def sessions(self) -> List[TmuxSession]:
+        """Current model of sessions and their windows"""
+        with self._lock:
+            return [TmuxSession(name=session.name, attached=session.attached,
+                                windows=sorted(session.windows, key=lambda w: w.window_index))
+                    for session in self._sessions.values()]
+
+    def start(self):
+        """Load the model, attach to every session and start handling events"""
+        if self._thread is not None:
+            return
+        self.resync()
+        self._thread = threading.Thread(target=self._run, name="tmux-watcher", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Detach from all sessions and stop the event thread"""
+        if self._thread is not None:
+            self._events.put(None)
+            self._thread.join()
+            self._thread = None
+        for client in self._clients.values():
+            client.close()
+        self._clients.clear()
+
+    def resync(self):
+        """Rebuild the model from one enumeration query and attach to new sessions"""
+        sessions = self.orchestrator.get_tmux_sessions()
+        now = time.monotonic()
+        with self._lock:
+            self._sessions = {session.name: session for session in sessions}
+            self._windows = {window.window_id: window for session in sessions for window in session.windows}
+            self._pane_windows = {window.position.pane_id: window.window_id
+                                  for window in self._windows.values() if window.position}
+            for pane_id in self._pane_windows:
+                self._last_output.setdefault(pane_id, now)
+
+        for name in list(self._clients):
+            if name not in self._sessions:
+                self._clients.pop(name).close()
+        for name in self._sessions:
+            if name not in self._clients:
+                self._attach(name)
+
+    def _attach(self, session_name: str):
+        client = TmuxControlClient(session=session_name, server_args=self.orchestrator.server_args, no_output=False)
+        client.add_notification_handler(self._events.put)
+        try:
+            client.start()
+        except TmuxControlError as e:
+            print(f"Error watching session {session_name}: {e}", file=sys.stderr)
+            return
+        self._clients[session_name] = client
+
+    def _run(self):
+        while True:
+            try:
+                line = self._events.get(timeout=max(min(self.silence_after / 4, 1.0), 0.01))
+            except queue.Empty:
+                line = ""
+            if line is None:
+                return
+            if line:
+                self.handle_notification(line)
+            self._check_silence(time.monotonic())
+
+    def handle_notification(self, line: str):
+        """Apply one control-mode notification line to the model"""
+        kind, _, rest = line.partition(" ")
+        if kind == "%output":
+            pane_id, _, data = rest.partition(" ")
+            self._output(pane_id, unescape_output(data))
+        elif kind in ("%window-add", "%unlinked-window-add"):
+            self._add_window(rest)
+        elif kind in ("%window-close", "%unlinked-window-close"):
+            self._close_window(rest)
+        elif kind in ("%window-renamed", "%unlinked-window-renamed"):
+            window_id, _, name = rest.partition(" ")
+            self._rename_window(window_id, name)
+        elif kind in ("%sessions-changed", "%session-renamed"):
+            # Every attached client reports the change; only emit it once
+            before = set(self._sessions)
+            self.resync()
+            if set(self._sessions) != before:
+                self._emit(WatchEvent("sessions-changed", timestamp=time.time()))
+
+    def _output(self, pane_id: str, data: bytes):
+        now = time.monotonic()
+        window = self._window_for_pane(pane_id)
+        self._last_output[pane_id] = now
+        self._emit(WatchEvent("output", window, pane_id, data, time.time()))
+        if pane_id in self._silent:
+            self._silent.discard(pane_id)
+            self._emit(WatchEvent("activity", window, pane_id, timestamp=time.time()))
+
+    def _check_silence(self, now: float):
+        for pane_id, last in list(self._last_output.items()):
+            if pane_id not in self._silent and now - last >= self.silence_after:
+                self._silent.add(pane_id)
+                self._emit(WatchEvent("silence", self._window_for_pane(pane_id), pane_id, timestamp=time.time()))
+
+    def _window_for_pane(self, pane_id: str) -> Optional[TmuxWindow]:
+        window_id = self._pane_windows.get(pane_id)
+        if window_id is None:
+            # Output from a pane that isn't the active one in its window
+            try:
+                output = run_tmux(["display-message", "-t", pane_id, "-p", "#{window_id}"],
+                                  backend=self.orchestrator.backend, server_args=self.orchestrator.server_args)
+            except subprocess.CalledProcessError:
+                return None
+            window_id = self._pane_windows[pane_id] = output.strip()
+        return self._windows.get(window_id)
+
+    def _add_window(self, window_id: str):
+        if window_id in self._windows:
+            # Each attached client reports the same new window
+            return
+        try:
+            output = run_tmux(["display-message", "-t", window_id, "-p", tmux_format(WINDOW_FIELDS)],
+                              backend=self.orchestrator.backend, server_args=self.orchestrator.server_args)
+        except subprocess.CalledProcessError:
+            return
+        rows = parse_rows(output.strip(), WINDOW_FIELDS)
+        if not rows:
+            return
+        window = TmuxWindow.from_row(rows[0])
+        with self._lock:
+            session = self._sessions.get(window.session_name)
+            if session is None:
+                return
+            session.windows.append(window)
+            self._windows[window_id] = window
+            if window.position:
+                self._pane_windows[window.position.pane_id] = window_id
+                self._last_output.setdefault(window.position.pane_id, time.monotonic())
+        self._emit(WatchEvent("window-add", window, timestamp=time.time()))
+
+    def _close_window(self, window_id: str):
+        with self._lock:
+            window = self._windows.pop(window_id, None)
+            if window is None:
+                return
+            session = self._sessions.get(window.session_name)
+            if session is not None:
+                session.windows[:] = [w for w in session.windows if w.window_id != window_id]
+            for pane_id in [p for p, w in self._pane_windows.items() if w == window_id]:
+                del self._pane_windows[pane_id]
+                self._last_output.pop(pane_id, None)
+                self._silent.discard(pane_id)
+        self._emit(WatchEvent("window-close", window, timestamp=time.time()))
+
+    def _rename_window(self, window_id: str, name: str):
+        with self._lock:
+            window = self._windows.get(window_id)
+            if window is None or window.window_name == name:
+                return
+            renamed = self._windows[window_id] = replace(window, window_name=name)
+            session = self._sessions.get(window.session_name)
+            if session is not None:
+                session.windows[:] = [renamed if w.window_id == window_id else w for w in session.windows]
+        self._emit(WatchEvent("window-renamed", renamed, timestamp=time.time()))
+
+    def _emit(self, event: WatchEvent):
+        for callback in self._callbacks[event.kind]:
+            try:
+                callback(event)
+            except Exception as e:
+                print(f"Error in watcher callback for {event.kind}: {e}", file=sys.stderr)
+
+def main(argv=None):
+    if argv is None:
+        argv = sys.argv
+
+    silence_after = float(argv[1]) if len(argv) > 1 else 60.0
+    watcher = TmuxWatcher(silence_after=silence_after)
+
+    def report(event: WatchEvent):
+        target = f"{event.window.session_name}:{event.window.window_index}" if event.window else event.pane_id
+        print(f"{time.strftime('%H:%M:%S')} {event.kind} {target}", flush=True)
+
+    for kind in ("activity", "silence", "window-add", "window-close", "window-renamed", "sessions-changed"):
+        watcher.on(kind, report)
+    watcher.start()
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        watcher.stop()
+
+if __name__ == "__main__":
+    main()